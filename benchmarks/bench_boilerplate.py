@@ -0,0 +1,72 @@
+# benchmarks/bench_boilerplate.py
+"""
+計算本機樣板清理在每篇文章省下的 token 數。
+
+用法（於專案根目錄）：
+    python benchmarks/bench_boilerplate.py
+
+依序解析 fixtures/boilerplate/ 中的文章頁面（同一網站的文章依編號順序，模擬多次執行時的學習），比較：
+- 原始：所有 <p> 文字直接串接（舊做法）
+- 清理後：strip_boilerplate 的結果
+分別列出兩種處理方式省下的 token：
+- 逐步處理：有把握的文章跳過 clean_content，省下整個呼叫（提示詞 + 輸入 + 與輸入等長的輸出）
+- 一次處理（USE_COMBINED_PROCESSING，預設）：仍只有一次 process_article 呼叫；有把握時改用不含清理步驟的提示詞，
+  省下清理步驟的提示詞、輸入中的樣板段落，以及回傳的 cleaned_content
+封鎖清單寫在暫存資料夾，不會動到 data/。
+"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.news_source import boilerplate
+from services.news_source.html_parser import make_soup, ARTICLE_STRAINER
+from services.token_budget import count_tokens
+from services.openai_gpt_processing_service import _clean_content_messages, _process_article_messages
+
+FIXTURES_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "boilerplate")
+
+
+def main():
+    boilerplate.BLOCKLIST_FILE = os.path.join(tempfile.mkdtemp(), "boilerplate_blocklist.json")
+    clean_prompt_tokens = count_tokens(_clean_content_messages("")[0]["content"])
+    # 一次處理時，含清理步驟與不含清理步驟的提示詞相差的 token 數
+    clean_step_tokens = (
+        count_tokens(_process_article_messages("", "", [])[0]["content"])
+        - count_tokens(_process_article_messages("", "", [], precleaned=True)[0]["content"])
+    )
+
+    filenames = sorted(os.listdir(FIXTURES_FOLDER), key=lambda name: (name.rsplit("_", 1)[0], int(name.rsplit("_", 1)[1].split(".")[0])))
+    total_raw = total_saved = total_combined_saved = skipped = 0
+    print(f"{'文章':<18} {'原始':>6} {'清理後':>6} {'逐步省下':>8} {'一次處理省下':>10} {'跳過 GPT 清理':>12}")
+    for filename in filenames:
+        source = filename.rsplit("_", 1)[0]
+        with open(os.path.join(FIXTURES_FOLDER, filename), "r", encoding="utf-8") as f:
+            soup = make_soup(f.read(), ARTICLE_STRAINER)
+
+        paragraphs = boilerplate.extract_paragraphs(soup)
+        raw_tokens = count_tokens("\n".join(text for text, _ in paragraphs))
+        content, confident = boilerplate.strip_boilerplate(paragraphs, source)
+        cleaned_tokens = count_tokens(content)
+
+        # 沒把握時仍需 GPT 清理，但輸入與清理後的輸出都變短
+        saved = combined_saved = 2 * (raw_tokens - cleaned_tokens)
+        if confident:
+            # 逐步處理：整個 clean_content 呼叫都省下
+            saved = clean_prompt_tokens + 2 * raw_tokens
+            # 一次處理：輸入變短，且不再回傳與輸入等長的 cleaned_content
+            combined_saved = clean_step_tokens + (raw_tokens - cleaned_tokens) + raw_tokens
+            skipped += 1
+        total_raw += raw_tokens
+        total_saved += saved
+        total_combined_saved += combined_saved
+        print(f"{filename:<18} {raw_tokens:>6} {cleaned_tokens:>6} {saved:>8} {combined_saved:>10} {'是' if confident else '否':>12}")
+
+    count = len(filenames)
+    print(f"\n共 {count} 篇，{skipped} 篇跳過 GPT 清理（原始平均 {total_raw / count:.0f} tokens 輸入）。")
+    print(f"平均每篇省下：逐步處理 {total_saved / count:.0f} tokens，一次處理（預設）{total_combined_saved / count:.0f} tokens。")
+
+
+if __name__ == "__main__":
+    main()
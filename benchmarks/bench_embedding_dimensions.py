@@ -0,0 +1,106 @@
+# benchmarks/bench_embedding_dimensions.py
+"""
+比較不同 Embedding 維度與儲存型別在記憶體、計算速度與去重準確度上的取捨。
+
+用法（於專案根目錄，需要 OPENAI_API_KEY）：
+    python benchmarks/bench_embedding_dimensions.py
+
+以 fixtures/embedding_pairs.json 中標記好的標題配對（same 表示是否為同一則新聞）：
+- 先以模型預設維度取得所有標題的向量（寫入 Embedding 快取，之後重跑不再呼叫 API）
+- text-embedding-3 系列的短向量等同於截取前 N 維再正規化，因此直接由完整向量截取
+- 記憶體：每個向量的位元組數
+- 速度：以 similarity_engine 計算 N×N 相似度矩陣的時間（隨機向量）
+- 準確度：以 SIMILARITY_THRESHOLD 判斷是否為同一則新聞的準確率、精確率與召回率，以及該設定下的最佳閾值
+"""
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from config.config import SIMILARITY_THRESHOLD
+from services import openai_embed_service
+from services.similarity_engine import normalize_matrix, similarity_matrix
+
+PAIRS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "embedding_pairs.json")
+DIMENSIONS = [1536, 1024, 512, 256]
+DTYPES = ["float32", "float16"]
+# 計算速度用的向量數與重複次數
+SPEED_ITEMS = 1000
+SPEED_REPEAT = 5
+
+
+def _reduce(vectors: np.ndarray, dimensions: int, dtype: str) -> np.ndarray:
+    reduced = vectors[:, :dimensions].astype(np.float32)
+    reduced /= np.linalg.norm(reduced, axis=1, keepdims=True)
+    return reduced.astype(dtype)
+
+
+def _pair_similarities(vectors: np.ndarray, pairs, index) -> np.ndarray:
+    matrix = normalize_matrix(vectors)
+    return np.array([float(matrix[index[pair["a"]]] @ matrix[index[pair["b"]]]) for pair in pairs])
+
+
+def _scores(similarities: np.ndarray, labels: np.ndarray, threshold: float):
+    predicted = similarities > threshold
+    true_positive = int(np.sum(predicted & labels))
+    accuracy = float(np.mean(predicted == labels))
+    precision = true_positive / max(1, int(np.sum(predicted)))
+    recall = true_positive / max(1, int(np.sum(labels)))
+    return accuracy, precision, recall
+
+
+def _best_threshold(similarities: np.ndarray, labels: np.ndarray):
+    candidates = np.round(np.arange(0.30, 0.90, 0.01), 2)
+    accuracies = [_scores(similarities, labels, threshold)[0] for threshold in candidates]
+    best = int(np.argmax(accuracies))
+    return float(candidates[best]), accuracies[best]
+
+
+def _speed(dimensions: int, dtype: str) -> float:
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((SPEED_ITEMS, dimensions)).astype(dtype)
+    started = time.perf_counter()
+    for _ in range(SPEED_REPEAT):
+        similarity_matrix(normalize_matrix(vectors))
+    return (time.perf_counter() - started) / SPEED_REPEAT * 1000
+
+
+def main():
+    with open(PAIRS_FILE, "r", encoding="utf-8") as f:
+        pairs = json.load(f)
+    titles = list(dict.fromkeys(title for pair in pairs for title in (pair["a"], pair["b"])))
+    index = {title: position for position, title in enumerate(titles)}
+    labels = np.array([pair["same"] for pair in pairs])
+
+    # 以模型預設維度取得完整向量
+    openai_embed_service.DIMENSIONS = 0
+    embeddings = openai_embed_service.get_text_embeddings(titles)
+    if any(len(embedding) == 0 for embedding in embeddings):
+        print("部分標題無法取得 Embedding，請確認 OPENAI_API_KEY。")
+        return
+    full = np.stack([np.asarray(embedding, dtype=np.float32) for embedding in embeddings])
+    reference = _pair_similarities(full, pairs, index)
+
+    print(f"{len(pairs)} 組配對（{int(labels.sum())} 組相同），閾值 SIMILARITY_THRESHOLD = {SIMILARITY_THRESHOLD}\n")
+    print(f"{'維度':>6} {'型別':>8} {'位元組/向量':>10} {f'{SPEED_ITEMS}x{SPEED_ITEMS} ms':>12} "
+          f"{'準確率':>6} {'精確率':>6} {'召回率':>6} {'最大誤差':>8} {'最佳閾值':>8}")
+    for dimensions in DIMENSIONS:
+        for dtype in DTYPES:
+            vectors = _reduce(full, dimensions, dtype)
+            similarities = _pair_similarities(vectors, pairs, index)
+            accuracy, precision, recall = _scores(similarities, labels, SIMILARITY_THRESHOLD)
+            best_threshold, best_accuracy = _best_threshold(similarities, labels)
+            error = float(np.max(np.abs(similarities - reference)))
+            print(f"{dimensions:>6} {dtype:>8} {vectors[0].nbytes:>10} {_speed(dimensions, dtype):>12.1f} "
+                  f"{accuracy:>6.1%} {precision:>6.1%} {recall:>6.1%} {error:>8.4f} "
+                  f"{best_threshold:>4.2f} ({best_accuracy:.0%})")
+    print("\n作為比較：以 Python list 儲存 1536 維向量約需 "
+          f"{sys.getsizeof([0.0] * 1536) + 1536 * sys.getsizeof(0.1)} 位元組。")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# benchmarks/bench_html_parsing.py
+"""
+比較各種 HTML 解析模式在 Yahoo、4Gamers、巴哈姆特頁面上的速度。
+
+用法（於專案根目錄）：
+    python benchmarks/bench_html_parsing.py [重複次數] [頁面資料夾]
+
+每種模式都會先確認解析結果與「html.parser 完整解析」一致，再計時。
+
+benchmarks/fixtures 中的頁面是模仿各網站標籤結構的合成頁面（填充文字與樣式），
+只能用來確認各模式的擷取結果一致，計時結果不代表實際頁面的速度。
+要比較實際速度，請將各網站的頁面另存成與 CASES 相同的檔名，放在同一個資料夾並以第二個參數指定。
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.news_source import html_parser
+from services.news_source.fetch_article_content import parse_article_html
+from services.news_source.yahoo_news_service import parse_yahoo_homepage
+from services.news_source.four_gamer_news_service import parse_gamer_homepage
+from services.news_source.baha_news_service import parse_baha_homepage, parse_baha_article_html
+
+FIXTURES_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+CASES = [
+    ("yahoo_home.html", parse_yahoo_homepage),
+    ("yahoo_article.html", parse_article_html),
+    ("4gamers_home.html", parse_gamer_homepage),
+    ("4gamers_article.html", parse_article_html),
+    ("baha_home.html", parse_baha_homepage),
+    ("baha_article.html", parse_baha_article_html),
+]
+
+# (名稱, 解析器, 是否只解析需要的標籤)
+MODES = [
+    ("html.parser 完整", "html.parser", False),
+    ("html.parser 限定標籤", "html.parser", True),
+    ("lxml 完整", "lxml", False),
+    ("lxml 限定標籤", "lxml", True),
+]
+
+
+def run_mode(parse, html, parser, targeted):
+    html_parser.HTML_PARSER = parser
+    html_parser.HTML_TARGETED_PARSING = targeted
+    return parse(html)
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    folder = sys.argv[2] if len(sys.argv) > 2 else FIXTURES_FOLDER
+    modes = [mode for mode in MODES if mode[1] != "lxml" or html_parser.LXML_AVAILABLE]
+    if len(modes) < len(MODES):
+        print("未安裝 lxml，略過 lxml 模式。")
+
+    totals = {name: 0.0 for name, _, _ in modes}
+    for filename, parse in CASES:
+        with open(os.path.join(folder, filename), "r", encoding="utf-8") as f:
+            html = f.read()
+
+        baseline = run_mode(parse, html, "html.parser", False)
+        print(f"\n{filename} ({len(html) / 1024:.0f} KB)")
+        base_ms = None
+        for name, parser, targeted in modes:
+            result = run_mode(parse, html, parser, targeted)
+            same = "一致" if result == baseline else "不一致！"
+            seconds = timeit.timeit(lambda: run_mode(parse, html, parser, targeted), number=repeat) / repeat
+            totals[name] += seconds
+            ms = seconds * 1000
+            base_ms = base_ms or ms
+            print(f"  {name:<20} {ms:8.2f} ms  x{base_ms / ms:5.1f}  結果{same}")
+
+    print("\n合計（每組頁面各解析一次）")
+    base_total = totals[modes[0][0]]
+    for name, seconds in totals.items():
+        print(f"  {name:<20} {seconds * 1000:8.2f} ms  x{base_total / seconds:5.1f}")
+
+
+if __name__ == "__main__":
+    main()
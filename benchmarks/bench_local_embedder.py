@@ -0,0 +1,71 @@
+# benchmarks/bench_local_embedder.py
+"""
+校準本機 Embedding（字元 n-gram 雜湊 TF-IDF）的相似度閾值，不需要網路。
+
+用法（於專案根目錄）：
+    python benchmarks/bench_local_embedder.py
+
+以 fixtures/embedding_pairs.json 中標記好的標題配對（same 表示是否為同一則新聞）：
+- 以配對中的標題學習 IDF（實際執行時以每次新抓到的標題學習），IDF 寫在暫存資料夾，不會動到 data/
+- 列出相同 / 不同新聞的相似度分布，以及 LOCAL_SIMILARITY_THRESHOLD 的準確率、精確率與召回率
+- 列出準確率最高的閾值，作為調整 LOCAL_SIMILARITY_THRESHOLD 的參考
+- 每個標題產生向量的平均時間
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from config.config import LOCAL_SIMILARITY_THRESHOLD, LOCAL_EMBEDDING_NGRAMS, LOCAL_EMBEDDING_DIMENSIONS
+from services import local_embedder
+
+PAIRS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "embedding_pairs.json")
+SPEED_REPEAT = 200
+
+
+def _scores(similarities: np.ndarray, labels: np.ndarray, threshold: float):
+    predicted = similarities > threshold
+    true_positive = int(np.sum(predicted & labels))
+    accuracy = float(np.mean(predicted == labels))
+    precision = true_positive / max(1, int(np.sum(predicted)))
+    recall = true_positive / max(1, int(np.sum(labels)))
+    return accuracy, precision, recall
+
+
+def main():
+    local_embedder.DOCUMENT_FREQUENCY_FILE = os.path.join(tempfile.mkdtemp(), "local_embedding_df.npz")
+    with open(PAIRS_FILE, "r", encoding="utf-8") as f:
+        pairs = json.load(f)
+    titles = list(dict.fromkeys(title for pair in pairs for title in (pair["a"], pair["b"])))
+    labels = np.array([pair["same"] for pair in pairs])
+    local_embedder.learn_document_frequencies(titles)
+
+    vectors = dict(zip(titles, local_embedder.embed_local(titles)))
+    similarities = np.array([float(vectors[pair["a"]] @ vectors[pair["b"]]) for pair in pairs])
+    same, different = similarities[labels], similarities[~labels]
+
+    print(f"n-gram {LOCAL_EMBEDDING_NGRAMS}，{LOCAL_EMBEDDING_DIMENSIONS} 維，{len(pairs)} 組配對（{int(labels.sum())} 組相同）\n")
+    print(f"相同新聞相似度：最低 {same.min():.2f}，平均 {same.mean():.2f}")
+    print(f"不同新聞相似度：最高 {different.max():.2f}，平均 {different.mean():.2f}")
+    accuracy, precision, recall = _scores(similarities, labels, LOCAL_SIMILARITY_THRESHOLD)
+    print(f"LOCAL_SIMILARITY_THRESHOLD = {LOCAL_SIMILARITY_THRESHOLD}：準確率 {accuracy:.1%}，精確率 {precision:.1%}，召回率 {recall:.1%}")
+
+    candidates = np.round(np.arange(0.05, 0.90, 0.01), 2)
+    accuracies = [_scores(similarities, labels, threshold)[0] for threshold in candidates]
+    best = int(np.argmax(accuracies))
+    print(f"最佳閾值 {candidates[best]:.2f}：準確率 {accuracies[best]:.1%}")
+
+    started = time.perf_counter()
+    for _ in range(SPEED_REPEAT):
+        local_embedder.embed_local(titles)
+    elapsed = (time.perf_counter() - started) / (SPEED_REPEAT * len(titles)) * 1e6
+    print(f"\n每個標題產生向量平均 {elapsed:.0f} 微秒。")
+
+
+if __name__ == "__main__":
+    main()
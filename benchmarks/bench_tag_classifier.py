@@ -0,0 +1,97 @@
+# benchmarks/bench_tag_classifier.py
+"""
+校準以 Embedding 選擇論壇標籤的閾值（TAG_* 與 LOCAL_TAG_*）。
+
+用法（於專案根目錄）：
+    python benchmarks/bench_tag_classifier.py            # 本機向量，不需要網路
+    python benchmarks/bench_tag_classifier.py --openai   # OpenAI 向量，需要 OPENAI_API_KEY
+
+以 fixtures/tagged_articles.json 中標記好標籤的新聞（內容為人工撰寫的範例，不是實際抓取的新聞）：
+- 列出目前設定下的涵蓋率（不需呼叫 GPT 的比例）、最相似標籤的正確率與選出標籤的精確率
+- 對「選上標籤的閾值」與「有把握的閾值」做網格搜尋，列出精確率達 TARGET_PRECISION 時涵蓋率最高的組合
+本機向量的 IDF 寫在暫存資料夾，不會動到 data/；OpenAI 向量會寫入 Embedding 快取，之後重跑不再呼叫 API。
+"""
+import json
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from config.config import NCBC_FORUM_TAGS, TAG_ARTICLE_TOKEN_BUDGET
+from services import local_embedder
+from services.similarity_engine import normalize_matrix
+from services.tag_classifier import _tag_text, choose_tags, tag_thresholds
+from services.token_budget import trim_to_budget
+
+ARTICLES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "tagged_articles.json")
+# 自動選出的標籤至少要有這個比例是正確的
+TARGET_PRECISION = 0.8
+
+
+def _evaluate(similarities: np.ndarray, labels, tag_names, threshold: float, confident: float):
+    """回傳 (涵蓋率, 最相似標籤正確率, 選出標籤精確率)；後兩者只計算有把握的新聞。"""
+    decided = top_correct = selected_total = selected_correct = 0
+    for row, label in zip(similarities, labels):
+        selected = choose_tags(row, tag_names, threshold, confident)
+        if selected is None:
+            continue
+        decided += 1
+        top_correct += tag_names[int(np.argmax(row))] in label
+        selected_total += len(selected)
+        selected_correct += sum(tag in label for tag in selected)
+    coverage = decided / len(labels)
+    return coverage, top_correct / max(1, decided), selected_correct / max(1, selected_total)
+
+
+def _embed(texts, use_openai: bool) -> np.ndarray:
+    if use_openai:
+        from services.openai_embed_service import get_text_embeddings
+        return normalize_matrix(get_text_embeddings(texts))
+    return normalize_matrix(local_embedder.embed_local(texts))
+
+
+def main():
+    use_openai = "--openai" in sys.argv[1:]
+    local_embedder.DOCUMENT_FREQUENCY_FILE = os.path.join(tempfile.mkdtemp(), "local_embedding_df.npz")
+    with open(ARTICLES_FILE, "r", encoding="utf-8") as f:
+        articles = json.load(f)
+    tag_names = [tag.name for tag in NCBC_FORUM_TAGS]
+    labels = [set(article["tags"]) for article in articles]
+    if not use_openai:
+        # 實際執行時以每次新抓到的標題學習 IDF
+        local_embedder.learn_document_frequencies([article["title"] for article in articles])
+
+    texts = [trim_to_budget(f"{article['title']}\n{article['content']}", TAG_ARTICLE_TOKEN_BUDGET, drop_boilerplate=False) for article in articles]
+    article_matrix = _embed(texts, use_openai)
+    tag_matrix = _embed([_tag_text(name) for name in tag_names], use_openai)
+    similarities = article_matrix @ tag_matrix.T
+
+    print(f"{'OpenAI' if use_openai else '本機'}向量（{article_matrix.shape[1]} 維），{len(articles)} 則新聞，{len(tag_names)} 個標籤\n")
+    best_scores = similarities.max(axis=1)
+    print(f"最相似標籤的相似度：最低 {best_scores.min():.2f}，平均 {best_scores.mean():.2f}，最高 {best_scores.max():.2f}")
+
+    threshold, confident = tag_thresholds(article_matrix.shape[1])
+    coverage, top_accuracy, precision = _evaluate(similarities, labels, tag_names, threshold, confident)
+    print(f"目前設定（選上 {threshold}，有把握 {confident}）：涵蓋率 {coverage:.1%}，最相似標籤正確率 {top_accuracy:.1%}，精確率 {precision:.1%}")
+
+    best = None
+    for confident in np.round(np.arange(0.05, 0.80, 0.01), 2):
+        for threshold in np.round(np.arange(0.05, confident + 0.001, 0.01), 2):
+            coverage, top_accuracy, precision = _evaluate(similarities, labels, tag_names, threshold, confident)
+            if precision >= TARGET_PRECISION and (best is None or coverage > best[0]):
+                best = (coverage, top_accuracy, precision, float(threshold), float(confident))
+    if best is None:
+        print(f"沒有任何閾值組合的精確率達到 {TARGET_PRECISION:.0%}，建議此向量來源一律交給 GPT 選擇。")
+    else:
+        coverage, top_accuracy, precision, threshold, confident = best
+        print(
+            f"精確率達 {TARGET_PRECISION:.0%} 時涵蓋率最高的組合：選上 {threshold:.2f}，有把握 {confident:.2f}"
+            f"（涵蓋率 {coverage:.1%}，最相似標籤正確率 {top_accuracy:.1%}，精確率 {precision:.1%}）"
+        )
+
+
+if __name__ == "__main__":
+    main()
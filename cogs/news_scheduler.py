@@ -5,20 +5,23 @@ import asyncio
 
 from services.forum_post_service import forum_test
 # 從 config.py 取得排程秒數
-from config.config import NEWS_FETCH_INTERVAL
+from config.config import NEWS_FETCH_INTERVAL, BATCH_POLL_INTERVAL
 
 # 從 services 裡匯入新聞處理函式
 from services.news_processer import process_yahoo_news
+from services.openai_batch_service import resume_batches
 
 class NewsSchedulerCog(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
         # 在 Cog 初始化時啟動背景任務
         self.fetch_news_bg_task.start()
+        self.poll_batches_bg_task.start()
 
     def cog_unload(self):
         # 若此 Cog 被卸載，記得要停止背景任務
         self.fetch_news_bg_task.cancel()
+        self.poll_batches_bg_task.cancel()
 
     @tasks.loop(seconds=NEWS_FETCH_INTERVAL)
     async def fetch_news_bg_task(self):
@@ -43,6 +46,21 @@ class NewsSchedulerCog(commands.Cog):
         await self.bot.wait_until_ready()
         print("[NewsSchedulerCog] Bot 已就緒，開始排程抓新聞。")
 
+    @tasks.loop(seconds=BATCH_POLL_INTERVAL)
+    async def poll_batches_bg_task(self):
+        """
+        每隔 BATCH_POLL_INTERVAL 秒，檢查 Batch API 的重寫工作，完成的就發文。
+        Bot 重啟後也會接續先前未完成的工作。
+        """
+        try:
+            await resume_batches(self.bot)
+        except Exception as e:
+            print(f"[NewsSchedulerCog] 檢查 Batch 工作發生錯誤: {e}")
+
+    @poll_batches_bg_task.before_loop
+    async def before_poll_batches(self):
+        await self.bot.wait_until_ready()
+
     # 新增的 Slash Command
     @commands.hybrid_command(
         name="fetchnews",
@@ -1,11 +1,7 @@
 import discord
 from discord.ext import commands, tasks
-import os
-import asyncio
-import random
-from services.openai_gpt_processing_service import generate_discord_status
-from utils.json_utils import load_json
-from config.config import DATA_FOLDER
+from services.status_pool import load_status_pool, next_status
+from config.config import STATUS_ROTATION_INTERVAL
 
 class StatusCog(commands.Cog):
     def __init__(self, bot):
@@ -13,18 +9,15 @@ class StatusCog(commands.Cog):
 
     @commands.Cog.listener()
     async def on_ready(self):
-        self.change_status.start()
+        if not self.change_status.is_running():
+            self.change_status.start()
 
-    @tasks.loop(minutes=60)  # Change status every 60 minutes
+    @tasks.loop(seconds=STATUS_ROTATION_INTERVAL)  # Change status every STATUS_ROTATION_INTERVAL seconds
     async def change_status(self):
-        news_memory_file = os.path.join(DATA_FOLDER, "news_memory.json")
-        news_memory = await asyncio.to_thread(load_json, news_memory_file)
-        if not isinstance(news_memory, list):
-            news_memory = []
-
-        # Get a random news title
-        random_news_title = random.choice(news_memory)["title"]
-        new_status = generate_discord_status(random_news_title)
+        # 狀態在每次新聞處理後預先產生，這裡只從記憶體中輪流取出
+        new_status = await next_status()
+        if new_status is None:
+            return
         
         # Use Gaming activity type if "正在玩" is in the new_status, otherwise use Custom activity type
         if "正在玩" in new_status:
@@ -37,6 +30,7 @@ class StatusCog(commands.Cog):
     @change_status.before_loop
     async def before_change_status(self):
         await self.bot.wait_until_ready()
+        await load_status_pool()
 
 async def setup(bot):
     await bot.add_cog(StatusCog(bot))
\ No newline at end of file
@@ -10,15 +10,162 @@ VERSION = "1.3.0"
 NEWS_FETCH_INTERVAL = 7200
 # 單位：天，代表新聞記憶保留期限
 NEWS_MEMORY = 2
+# 新聞處理管線：各階段的並行數與佇列大小
+# 佇列滿時上游階段會暫停（背壓），避免一次堆積過多待處理新聞
+PIPELINE_QUEUE_SIZE = 20
+# 清理內文、產生標題的並行數
+PIPELINE_CLEAN_CONCURRENCY = 4
+# 重寫內文、產生評論的並行數
+PIPELINE_REWRITE_CONCURRENCY = 4
+# 在清理內文與產生標題之前，先以原始標題向量與內文指紋（MinHash）合併同一則新聞（GPT 每則只呼叫一次）
+PIPELINE_EARLY_DEDUPE = True
+# 發文階段一次最多處理的新聞數
+PIPELINE_POST_BATCH_SIZE = 10
+# 每則新聞以一次結構化輸出（JSON Schema）的 GPT 呼叫，同時產生清理後內文、新標題、新內文、評論與標籤
+# 關閉或呼叫失敗時，改用逐步呼叫（清理、標題、內文、評論、標籤各一次）
+USE_COMBINED_PROCESSING = True
+# 以 OpenAI Batch API 產生新內文與評論（較便宜、不佔用即時速率限制，但最久可能延遲 24 小時才發文）
+USE_BATCH_REWRITE = False
+# 檢查 Batch 工作是否完成的間隔（秒）
+BATCH_POLL_INTERVAL = 300
 # OpenAI API Key
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")  # 確保在 .env 檔案中設定
+# OpenAI API 網址；留空使用官方網址，測試時可指向本機的替代服務
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None
+# GPT 模型（token 計算也依此模型的編碼）
+GPT_MODEL = "gpt-4o-mini"
+# 文章內文的 token 上限：抓取時依段落裁切到此長度（先移除明顯的樣板段落）
+ARTICLE_TOKEN_BUDGET = 800
+# 單次 GPT 呼叫中新聞內文的 token 上限（合併多則新聞後的內文也不會超過）
+PROMPT_CONTENT_TOKEN_BUDGET = 2400
+# OpenAI 連線池：最大連線數與保持 keep-alive 的連線數（GPT 與 Embedding 共用）
+OPENAI_MAX_CONNECTIONS = 20
+OPENAI_KEEPALIVE_CONNECTIONS = 10
+# OpenAI 單一請求逾時（秒）
+OPENAI_TIMEOUT = 60
+# 非同步 OpenAI 請求的同時進行數上限；實際並行數依速率限制自動調整（AIMD），最低 OPENAI_MIN_CONCURRENCY
+OPENAI_CONCURRENCY = 8
+OPENAI_MIN_CONCURRENCY = 1
+# 速率限制標頭剩餘額度低於此比例時，不再提高並行數
+OPENAI_RATE_HEADROOM = 0.1
+# 同步 OpenAI 請求遇到 429 / 5xx / 連線錯誤時的重試次數（由 openai 套件處理）
+OPENAI_MAX_RETRIES = 3
+# 非同步請求重試的指數退避基準秒數與上限
+OPENAI_BACKOFF_BASE = 1.0
+OPENAI_MAX_BACKOFF = 60.0
+# 連續失敗幾次後熔斷，以及熔斷後暫停的秒數（試探仍失敗時加倍）
+OPENAI_CIRCUIT_FAILURES = 5
+OPENAI_CIRCUIT_COOLDOWN = 60
+# 單一請求最多等待（含重試與熔斷）的秒數，超過就放棄該則新聞，下次執行再處理
+OPENAI_MAX_WAIT = 900
+# Embedding 向量維度：text-embedding-3 系列可要求較短的向量（記憶體與計算量較少，準確度略降）
+# None 使用模型預設維度（text-embedding-3-small 為 1536），SIMILARITY_THRESHOLD 與 SEMANTIC_INDEX_THRESHOLD 是以預設維度設定的
+# 改用較短的向量前，請先以 python benchmarks/bench_embedding_dimensions.py 量測，並依結果重新校準上述閾值
+EMBEDDING_DIMENSIONS = None
+# 向量在記憶體中的型別："float32" 或 "float16"（再省一半記憶體，相似度誤差約 1e-3）
+EMBEDDING_DTYPE = "float32"
+# Embedding 來源："openai"（OpenAI API）或 "local"（本機字元 n-gram 雜湊 TF-IDF，不需網路、不需費用）
+EMBEDDING_BACKEND = "openai"
+# 使用 OpenAI 時，API 無法使用或部分文字失敗，改以本機向量繼續去重
+EMBEDDING_FALLBACK_LOCAL = True
+# 本機向量的維度（雜湊 bucket 數）與使用的字元 n-gram 長度
+LOCAL_EMBEDDING_DIMENSIONS = 4096
+LOCAL_EMBEDDING_NGRAMS = (1, 2)
+# 本機向量的相似度分布與 OpenAI 不同，另外設定閾值（以 benchmarks/bench_local_embedder.py 校準：
+# 0.20 時準確率 95%、精確率 91%、召回率 100%；0.25 時三者皆為 90%）
+LOCAL_SIMILARITY_THRESHOLD = 0.20
+LOCAL_SEMANTIC_INDEX_THRESHOLD = 0.6
+# Embedding 批次請求：每次最多送出的文字數與總 token 數，以及單一文字的 token 上限
+EMBEDDING_BATCH_SIZE = 256
+EMBEDDING_BATCH_MAX_TOKENS = 100000
+EMBEDDING_MAX_INPUT_TOKENS = 6000
 # 相似度閾值，用於比較向量相似度（僅於此設定）
 # 預設值：0.55
 SIMILARITY_THRESHOLD = 0.55
+# 跨次執行的語意去重：新聞標題與近 NEWS_MEMORY 天內處理過的標題相似度大於此值時，不再送進 GPT
+# 比 SIMILARITY_THRESHOLD 嚴格，只略過幾乎相同的新聞；較不相似的仍會在發文時併入既有貼文
+SEMANTIC_INDEX_THRESHOLD = 0.8
+# 語意索引的搜尋方式："numpy"（暴力搜尋）或 "hnswlib"（近似最近鄰，需另外安裝 hnswlib，未安裝時退回 numpy）
+SEMANTIC_INDEX_BACKEND = "numpy"
+# 使用 hnswlib 時，索引項目數達到此值才改用近似搜尋
+SEMANTIC_INDEX_ANN_MIN_SIZE = 5000
+# 內文指紋（MinHash）：以連續幾個字元為一個 shingle，以及指紋長度與 LSH 分段數
+# 分段數 16、每段 4 個值時，Jaccard 相似度約 0.5 以上的內文才會成為比較對象
+CONTENT_SHINGLE_SIZE = 5
+MINHASH_PERMUTATIONS = 64
+MINHASH_BANDS = 16
+# 內文 Jaccard 相似度大於此值視為同一篇稿件：同一次執行中直接合併，與近 NEWS_MEMORY 天處理過的新聞相同則略過
+CONTENT_FINGERPRINT_THRESHOLD = 0.8
 # 資料檔案夾路徑
 DATA_FOLDER = "data"
 # 論壇頻道設定檔案路徑
 FORUM_CHANNELS_FILE = os.path.join(DATA_FOLDER, "forum_channels.json")
+# 單位：秒，StatusCog 更換 Discord 狀態的間隔
+STATUS_ROTATION_INTERVAL = 3600
+# 狀態池的目標數量：兩次新聞處理之間會用到的狀態數（預設 7200 / 3600 = 2）
+# 每次新聞處理完後，只有未使用的狀態少於此數量時才補足，不會產生用不到的狀態
+STATUS_POOL_SIZE = max(1, -(-NEWS_FETCH_INTERVAL // STATUS_ROTATION_INTERVAL))
+# GPT 輸出快取（SQLite），以 (函式, 模型, 提示詞雜湊, 輸入雜湊) 為鍵
+GPT_CACHE_FILE = os.path.join(DATA_FOLDER, "gpt_cache.sqlite3")
+# GPT 快取項目保留期限（秒）與總容量上限（位元組，以回覆內容大小計算）
+GPT_CACHE_MAX_AGE = 7 * 24 * 60 * 60
+GPT_CACHE_MAX_BYTES = 50 * 1024 * 1024
+# Embedding 快取（SQLite），以 (模型, 維度, 文字雜湊) 為鍵，向量以 float32 儲存
+EMBEDDING_CACHE_FILE = os.path.join(DATA_FOLDER, "embedding_cache.sqlite3")
+# 多久沒用到的向量就淘汰（秒）：比新聞記憶與論壇貼文的回溯天數多保留一天
+EMBEDDING_CACHE_MAX_AGE = (NEWS_MEMORY + 1) * 24 * 60 * 60
+# 快取筆數上限，超過時淘汰最久沒用到的項目
+EMBEDDING_CACHE_MAX_ENTRIES = 20000
+
+# 爬蟲 HTTP 設定
+# 共用連線池大小（每個主機保留的 keep-alive 連線數）
+HTTP_POOL_SIZE = 16
+# 同時抓取文章的最大執行緒數
+HTTP_MAX_WORKERS = 12
+# 單一主機同時連線數上限
+HTTP_PER_HOST_LIMIT = 4
+# 單一請求逾時（秒）
+HTTP_TIMEOUT = 10
+# 一批文章抓取的總期限（秒），逾時未完成者視為抓取失敗
+HTTP_FETCH_DEADLINE = 60
+# 每個主機的請求速率（每秒請求數）與可累積的突發請求數（token bucket）
+HTTP_RATE_PER_HOST = 4.0
+HTTP_BURST_PER_HOST = 8
+# 遇到逾時、連線錯誤、429 或 5xx 時的重試次數
+HTTP_MAX_RETRIES = 3
+# 重試的指數退避基準秒數與上限（實際等待時間會加上隨機抖動）
+HTTP_BACKOFF_BASE = 1.0
+HTTP_MAX_BACKOFF = 30.0
+# HTTP 快取檔案（保存 ETag / Last-Modified 與解析結果）
+HTTP_CACHE_FILE = os.path.join(DATA_FOLDER, "http_cache.json")
+# HTTP 快取總容量上限（位元組，以解析結果的 JSON 大小計算）
+HTTP_CACHE_MAX_BYTES = 20 * 1024 * 1024
+# HTTP 快取項目保留期限（秒），超過即淘汰
+HTTP_CACHE_MAX_AGE = 3 * 24 * 60 * 60
+# 單一新聞來源的抓取期限（秒），逾時的來源本次視為失敗，不影響其他來源
+NEWS_SOURCE_TIMEOUT = 120
+# RSS/Atom 新聞來源：來源名稱 -> Feed 網址
+NEWS_FEEDS = {
+    "yahoo_rss": "https://tw.news.yahoo.com/rss/",
+    "google_news_rss": "https://news.google.com/rss?hl=zh-TW&gl=TW&ceid=TW:zh-Hant",
+}
+# 使用 RSS 模式：啟用 NEWS_FEEDS 並停用 Yahoo 首頁爬蟲
+USE_FEED_SOURCES = False
+# Feed 內文少於此字數時，改抓文章頁面的 HTML
+FEED_MIN_BODY_CHARS = 80
+# 本機預先清理文章內文（不呼叫 GPT）
+# 連結文字佔段落比例超過此值的段落視為導覽/分享連結並移除
+BOILERPLATE_MAX_LINK_DENSITY = 0.5
+# 少於此字數且沒有句末標點的段落（分享按鈕、圖說、小標）視為樣板並移除
+BOILERPLATE_MIN_CHARS = 10
+# 同一網站有此數量以上的文章出現相同段落時，將該段落加入該網站的封鎖清單（如重複的頁尾）
+BOILERPLATE_LEARN_MIN_ARTICLES = 3
+# 清理後內文至少要有此字數，且沒有難以判斷的段落，才跳過 GPT 的 clean_content
+BOILERPLATE_MIN_CONTENT_CHARS = 100
+# HTML 解析器："auto"（有安裝 lxml 就用 lxml，否則 html.parser）、"lxml" 或 "html.parser"
+HTML_PARSER = "auto"
+# 只解析需要的標籤（SoupStrainer），略過頁面其他部分以節省 CPU
+HTML_TARGETED_PARSING = True
 
 # 論壇頻道設定
 NCBC_DISCRIPTION = ("歡迎來到NCBC新聞臺！"
@@ -51,6 +198,41 @@ NCBC_FORUM_TAGS = [
                 discord.ForumTag(name="投票"),
                 discord.ForumTag(name="娛樂新聞"),
             ]
+# 標籤說明：以 Embedding 自動選擇標籤時，會比對新聞與「標籤名稱：說明」的相似度
+NCBC_TAG_DESCRIPTIONS = {
+    "公告": "NCBC 新聞臺本身的公告、規則與版本更新",
+    "運動新聞": "職棒、籃球、足球、網球、奧運等體育賽事、球員與球隊消息",
+    "電玩遊戲": "電子遊戲、手機遊戲、遊戲主機、電競賽事與遊戲公司消息",
+    "校園生活": "學校、學生、教師、升學考試、大學與教育政策",
+    "時事討論": "社會事件、交通事故、犯罪、災害等近期發生的新聞事件",
+    "科技動態": "半導體、AI、手機、網路、軟體與科技公司的新產品與發展",
+    "政治討論": "政府、立法院、選舉、政黨、外交與兩岸關係",
+    "經濟分析": "股市、匯率、利率、物價、房市、企業財報與產業經濟",
+    "健康資訊": "醫療、疾病、疫苗、食品安全、飲食與健康保健",
+    "環保話題": "氣候變遷、污染、能源、回收、生態保育與環境政策",
+    "文化藝術": "電影、音樂、展覽、文學、歷史古蹟與傳統文化",
+    "星座運勢": "星座、運勢、占卜與命理",
+    "資源分享": "免費資源、優惠活動、實用工具與生活資訊",
+    "深入分析": "對議題背景、原因與影響的深入分析報導",
+    "評論與見解": "評論、社論、專家觀點與意見",
+    "未來趨勢": "未來發展、產業趨勢、新興技術與長期預測",
+    "迷因與趣味": "網路迷因、趣聞、奇聞軼事與搞笑話題",
+    "氣象天氣": "天氣預報、颱風、豪雨、寒流、地震與氣象署資訊",
+    "投票": "投票、民調與意見調查",
+    "娛樂新聞": "藝人、明星、綜藝節目、戲劇、演唱會與八卦",
+}
+# 以 Embedding 選擇標籤：相似度達 TAG_SIMILARITY_THRESHOLD 的標籤會被選上（最多 TAG_MAX_COUNT 個）
+# 最相似的標籤低於 TAG_CONFIDENT_SIMILARITY 時視為沒把握，改由 GPT 選擇
+# OpenAI 向量的閾值尚未以實際資料校準，調整前請以 python benchmarks/bench_tag_classifier.py --openai 量測
+TAG_SIMILARITY_THRESHOLD = 0.35
+TAG_CONFIDENT_SIMILARITY = 0.4
+# 本機向量的相似度分布不同（最相似標籤通常只有 0.1～0.3），另設閾值；以 python benchmarks/bench_tag_classifier.py 校準
+# 範例資料上約 40% 的新聞不需呼叫 GPT，選出的標籤約 89% 正確
+LOCAL_TAG_SIMILARITY_THRESHOLD = 0.10
+LOCAL_TAG_CONFIDENT_SIMILARITY = 0.12
+TAG_MAX_COUNT = 3
+# 比對標籤時，新聞標題加內文的 token 上限（與清理內文用的 ARTICLE_TOKEN_BUDGET 無關）
+TAG_ARTICLE_TOKEN_BUDGET = 300
 
 # 評論員prompt和index
 COMMENTATOR_PROMPT = [
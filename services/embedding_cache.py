@@ -0,0 +1,171 @@
+# services/embedding_cache.py
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from config.config import EMBEDDING_CACHE_FILE, EMBEDDING_CACHE_MAX_AGE, EMBEDDING_CACHE_MAX_ENTRIES
+
+# 每寫入幾筆就檢查一次是否需要淘汰
+EVICT_EVERY = 200
+
+_lock = threading.Lock()
+_conn: Optional[sqlite3.Connection] = None
+_disabled = False
+_puts_since_evict = 0
+_stats = {"hits": 0, "misses": 0}
+
+
+def text_hash(text: str) -> str:
+    """文字內容的雜湊，作為快取鍵的一部分。"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _connect() -> Optional[sqlite3.Connection]:
+    global _conn, _disabled
+    if _conn is not None or _disabled:
+        return _conn
+    try:
+        os.makedirs(os.path.dirname(EMBEDDING_CACHE_FILE) or ".", exist_ok=True)
+        conn = sqlite3.connect(EMBEDDING_CACHE_FILE, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS embedding_cache ("
+            " model TEXT NOT NULL,"
+            " dimensions INTEGER NOT NULL,"
+            " text_hash TEXT NOT NULL,"
+            " vector BLOB NOT NULL,"
+            " last_used REAL NOT NULL,"
+            " PRIMARY KEY (model, dimensions, text_hash))"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_embedding_cache_last_used ON embedding_cache(last_used)")
+        conn.commit()
+        _conn = conn
+        _evict(time.time())
+    except Exception as e:
+        print(f"[embedding_cache] 無法開啟快取 {EMBEDDING_CACHE_FILE}，本次不使用快取: {e}")
+        _disabled = True
+    return _conn
+
+
+def _evict(now: float):
+    """淘汰太久沒用到的向量，並在筆數超過上限時依最後使用時間淘汰最舊的項目。"""
+    _conn.execute("DELETE FROM embedding_cache WHERE last_used < ?", (now - EMBEDDING_CACHE_MAX_AGE,))
+    count = _conn.execute("SELECT COUNT(*) FROM embedding_cache").fetchone()[0]
+    if count > EMBEDDING_CACHE_MAX_ENTRIES:
+        _conn.execute(
+            "DELETE FROM embedding_cache WHERE rowid IN"
+            " (SELECT rowid FROM embedding_cache ORDER BY last_used LIMIT ?)",
+            (count - EMBEDDING_CACHE_MAX_ENTRIES,),
+        )
+    _conn.commit()
+
+
+def get_many(model: str, dimensions: int, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+    """
+    批次查詢快取，命中的項目會更新最後使用時間。
+
+    Args:
+        model (str): Embedding 模型名稱。
+        dimensions (int): 向量維度（0 代表模型預設維度）。
+        texts (Sequence[str]): 要查詢的文字。
+
+    Returns:
+        List[Optional[np.ndarray]]: 與 texts 順序相同的 float32 向量；未命中時為 None。
+    """
+    results: List[Optional[np.ndarray]] = [None] * len(texts)
+    if not texts:
+        return results
+    with _lock:
+        conn = _connect()
+        if conn is None:
+            return results
+        now = time.time()
+        hashes = [text_hash(text) for text in texts]
+        found: Dict[str, bytes] = {}
+        try:
+            unique = list(dict.fromkeys(hashes))
+            # SQLite 單一查詢的參數數量有上限，分批查詢
+            for start in range(0, len(unique), 500):
+                chunk = unique[start:start + 500]
+                rows = conn.execute(
+                    "SELECT text_hash, vector FROM embedding_cache"
+                    f" WHERE model = ? AND dimensions = ? AND text_hash IN ({','.join('?' * len(chunk))})"
+                    " AND last_used >= ?",
+                    (model, dimensions, *chunk, now - EMBEDDING_CACHE_MAX_AGE),
+                ).fetchall()
+                found.update(rows)
+            if found:
+                conn.executemany(
+                    "UPDATE embedding_cache SET last_used = ? WHERE model = ? AND dimensions = ? AND text_hash = ?",
+                    [(now, model, dimensions, key) for key in found],
+                )
+                conn.commit()
+        except Exception as e:
+            print(f"[embedding_cache] 讀取快取發生錯誤: {e}")
+            return results
+        hits = sum(1 for key in hashes if key in found)
+        _stats["hits"] += hits
+        _stats["misses"] += len(texts) - hits
+
+    for index, key in enumerate(hashes):
+        if key in found:
+            results[index] = np.frombuffer(found[key], dtype=np.float32)
+    return results
+
+
+def put_many(model: str, dimensions: int, texts: Sequence[str], vectors: Sequence):
+    """
+    批次寫入快取；空向量（產生失敗）不寫入。
+
+    Args:
+        model (str): Embedding 模型名稱。
+        dimensions (int): 向量維度（0 代表模型預設維度）。
+        texts (Sequence[str]): 文字。
+        vectors (Sequence): 與 texts 對應的向量。
+    """
+    global _puts_since_evict
+    rows = []
+    now = time.time()
+    for text, vector in zip(texts, vectors):
+        array = np.asarray(vector, dtype=np.float32)
+        if array.size:
+            rows.append((model, dimensions, text_hash(text), array.tobytes(), now))
+    if not rows:
+        return
+    with _lock:
+        conn = _connect()
+        if conn is None:
+            return
+        try:
+            conn.executemany("INSERT OR REPLACE INTO embedding_cache VALUES (?, ?, ?, ?, ?)", rows)
+            conn.commit()
+            _puts_since_evict += len(rows)
+            if _puts_since_evict >= EVICT_EVERY:
+                _puts_since_evict = 0
+                _evict(now)
+        except Exception as e:
+            print(f"[embedding_cache] 寫入快取發生錯誤: {e}")
+
+
+def get_embedding_cache_stats() -> Dict[str, int]:
+    """
+    取得 Embedding 快取的統計數據。
+
+    Returns:
+        Dict[str, int]: 包含 hits、misses 與 entries 的字典。
+    """
+    with _lock:
+        conn = _connect()
+        entries = conn.execute("SELECT COUNT(*) FROM embedding_cache").fetchone()[0] if conn is not None else 0
+        return {**_stats, "entries": entries}
+
+
+def print_embedding_cache_stats():
+    """印出 Embedding 快取的統計數據。"""
+    stats = get_embedding_cache_stats()
+    print(f"[embedding_cache] 命中 {stats['hits']} / 未命中 {stats['misses']}，目前共 {stats['entries']} 筆向量。")
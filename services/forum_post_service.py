@@ -1,14 +1,15 @@
 # services/forum_post_service.py
 import os
 import json
-from typing import List, Dict
+from typing import List, Dict, Optional
 import discord
 import asyncio
 from datetime import datetime, timedelta, timezone
 
 from config.config import NEWS_MEMORY,DATA_FOLDER, FORUM_CHANNELS_FILE
-from services.openai_embed_service import get_text_embedding, compare_embeddings
-from services.openai_gpt_processing_service import determine_tags
+from services.openai_embed_service import get_text_embeddings_async, align_embeddings
+from services.similarity_engine import match
+from services.tag_classifier import select_tags
 
 # 定義東八區的時區
 tz_utc_plus_8 = timezone(timedelta(hours=8))
@@ -41,6 +42,27 @@ def load_forum_channels() -> List[int]:
             print(f"讀取論壇頻道檔案時發生錯誤: {e}")
             return []
 
+async def get_forum_tag_names(bot) -> List[str]:
+    """
+    取得所有論壇頻道可用標籤名稱的聯集，供一次處理新聞時選擇標籤。
+    
+    Args:
+        bot (discord.Bot): Discord Bot 實例。
+    
+    Returns:
+        List[str]: 標籤名稱列表。
+    """
+    channel_ids = await asyncio.to_thread(load_forum_channels)
+    tag_names = []
+    for channel_id in channel_ids:
+        channel = bot.get_channel(channel_id)
+        if channel is None:
+            continue
+        for tag in channel.available_tags:
+            if tag.name not in tag_names:
+                tag_names.append(tag.name)
+    return tag_names
+
 async def fetch_recent_posts(bot, channel_id: int, days: int = NEWS_MEMORY) -> List[discord.Message]:
     """
     從指定的 Discord 頻道抓取過去指定天數內的所有貼文。
@@ -74,7 +96,56 @@ async def fetch_recent_posts(bot, channel_id: int, days: int = NEWS_MEMORY) -> L
     print(f"已抓取頻道 {channel_id} 過去 {days} 天內的 {len(posts)} 則貼文。")
     return posts
 
-async def process_forum_posts(all_news, bot, days: int = NEWS_MEMORY):
+def _remove_forum_channel(channel_id: int):
+    """刪除 forum_channels.json 中已不存在的頻道。"""
+    try:
+        with open(FORUM_CHANNELS_FILE, "r+", encoding="utf-8") as f:
+            data = json.load(f)
+            for guild_id, channels in data.items():
+                if channel_id in channels:
+                    channels.remove(channel_id)
+                    break
+            f.seek(0)
+            f.truncate()
+            json.dump(data, f, ensure_ascii=False, indent=4)
+        print(f"已刪除 forum_channels.json 中的頻道 ID: {channel_id}")
+    except Exception as e:
+        print(f"刪除 forum_channels.json 中的頻道 ID 時發生錯誤: {e}")
+
+async def load_forum_history(bot, days: int = NEWS_MEMORY) -> Dict[int, Dict]:
+    """
+    抓取所有論壇頻道過去指定天數的貼文，並產生貼文標題的 Embedding。
+    同一次執行分批發文時只需呼叫一次，再傳給每次的 process_forum_posts。
+    
+    Args:
+        bot (discord.Bot): Discord Bot 實例。
+        days (int, optional): 多少天內的貼文。預設為 NEWS_MEMORY 天。
+    
+    Returns:
+        Dict[int, Dict]: 頻道 ID -> {"channel": 頻道, "posts": 貼文列表, "titles": 貼文標題, "embeddings": 貼文標題向量}。
+    """
+    channel_ids = await asyncio.to_thread(load_forum_channels)
+    history = {}
+    for channel_id in channel_ids:
+        channel = bot.get_channel(channel_id)
+        if channel is None:
+            print(f"無法找到頻道 ID: {channel_id}")
+            await asyncio.to_thread(_remove_forum_channel, channel_id)
+            continue
+
+        posts = await fetch_recent_posts(bot, channel_id, days)
+        titles = [post.name if post.name else "no title" for post in posts]
+        # 同一頻道的貼文標題以一次請求產生 Embedding
+        # OpenAI 無法使用時會丟出 OpenAIUnavailableError，避免以空向量判斷而重複發文
+        history[channel_id] = {
+            "channel": channel,
+            "posts": posts,
+            "titles": titles,
+            "embeddings": await get_text_embeddings_async(titles),
+        }
+    return history
+
+async def process_forum_posts(all_news, bot, days: int = NEWS_MEMORY, history: Optional[Dict[int, Dict]] = None, posted: Optional[List[Dict]] = None):
     """
     處理所有論壇頻道的貼文。
     包含：
@@ -87,65 +158,66 @@ async def process_forum_posts(all_news, bot, days: int = NEWS_MEMORY):
     Args:
         bot (discord.Bot): Discord Bot 實例。
         days (int, optional): 多少天內的貼文。預設為 5 天。
+        history (Optional[Dict[int, Dict]], optional): load_forum_history 的結果；省略時重新抓取。
+            新發的貼文與更新後的標題會寫回 history，同一次執行的後續批次也能比對到。
+        posted (Optional[List[Dict]], optional): 每則新聞開始寫入 Discord（更新標題或建立貼文）後就加入此列表。
+            中途失敗時，呼叫端只需重新處理不在列表中的新聞，已出現在論壇的新聞不會重複發文。
     """
-    channel_ids = await asyncio.to_thread(load_forum_channels)
-    if not channel_ids:
+    if history is None:
+        history = await load_forum_history(bot, days)
+    if not history:
         print("沒有找到任何論壇頻道需要處理。")
         return
-    
 
-    for channel_id in channel_ids:
-        channel = bot.get_channel(channel_id)
-        if channel is None:
-            print(f"無法找到頻道 ID: {channel_id}")
-            # 刪除 forum_channels.json 中的該頻道
-            try:
-                with open(FORUM_CHANNELS_FILE, "r+", encoding="utf-8") as f:
-                    data = json.load(f)
-                    for guild_id, channels in data.items():
-                        if channel_id in channels:
-                            channels.remove(channel_id)
-                            break
-                    f.seek(0)
-                    f.truncate()
-                    json.dump(data, f, ensure_ascii=False, indent=4)
-                print(f"已刪除 forum_channels.json 中的頻道 ID: {channel_id}")
-            except Exception as e:
-                print(f"刪除 forum_channels.json 中的頻道 ID 時發生錯誤: {e}")
-            continue
+    # 從 Batch 工作恢復的新聞沒有保存標題向量，重新取得（通常會命中 Embedding 快取）
+    missing = [news for news in all_news if "embed_title" not in news]
+    if missing:
+        for news, embedding in zip(missing, await get_text_embeddings_async([news["title"] for news in missing])):
+            news["embed_title"] = embedding
 
-        posts = await fetch_recent_posts(bot, channel_id, days)
-        
-        for post in posts:
-            # 假設貼文的標題和內容在訊息的 embed 中
-            original_title = post.name if post.name else "no title"
-            embed_title = await asyncio.to_thread(get_text_embedding, original_title)
-
-            similar_news = []
-            for news in all_news:
-                # compare_embeddings already applies the SIMILARITY_THRESHOLD and returns a boolean
-                is_similar = await asyncio.to_thread(compare_embeddings, embed_title, news["embed_title"])
-                if is_similar:
-                    similar_news.append(news)
-            for news in similar_news:
-                all_news.remove(news)
+    for channel_id, state in history.items():
+        channel = state["channel"]
+        posts = state["posts"]
+
+        # 以一次矩陣乘法比較所有貼文與新聞的標題；每則新聞只併入第一個相似的貼文
+        # 部分向量來自本機備援時，整組改用本機向量比較
+        aligned = align_embeddings(state["titles"] + [news["title"] for news in all_news], state["embeddings"] + [news["embed_title"] for news in all_news])
+        matches = match(aligned[:len(posts)], aligned[len(posts):])
+        claimed = set()
+        for post_index, (post, news_indices) in enumerate(zip(posts, matches)):
+            similar_news = [all_news[index] for index in sorted(news_indices) if index not in claimed]
+            claimed.update(news_indices)
 
             if len(similar_news) > 0:
                 for news in similar_news:
                     await post.edit(name=news["title"])
+                    if posted is not None:
+                        posted.append(news)
+                    state["titles"][post_index] = news["title"]
+                    state["embeddings"][post_index] = news["embed_title"]
                     await post.send(news['comment'])
                     await post.send(news['published'])
                     for image in news.get('images', []):
                         await post.send(image)
                     # 合併內容與原文連結為同一則訊息，用換行分隔
                     await post.send(news['content'] + "\n原文：" + news['link'])
+        all_news[:] = [news for index, news in enumerate(all_news) if index not in claimed]
         
         for news in all_news:
             available_tags = channel.available_tags
-            tag_names = await asyncio.to_thread(determine_tags, available_tags, news['content'])
+            if "tags" in news:
+                # 一次處理時已選好標籤
+                tag_names = news["tags"]
+            else:
+                tag_names = await select_tags(available_tags, news['title'], news['content'])
             forum_tags = [tag for tag in available_tags if tag.name in tag_names]
             thread = await channel.create_thread(name=news["title"], content=news['comment'] + "\n" + news.get('images',[' '])[0], applied_tags=forum_tags, auto_archive_duration=60*24)  # 1 day
             thread = thread.thread
+            if posted is not None:
+                posted.append(news)
+            posts.append(thread)
+            state["titles"].append(news["title"])
+            state["embeddings"].append(news["embed_title"])
             await thread.send(news['published'])
             for index, image in enumerate(news.get('images', [])):
                 if index != 0:
@@ -0,0 +1,192 @@
+# services/gpt_cache.py
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from config.config import GPT_CACHE_FILE, GPT_CACHE_MAX_AGE, GPT_CACHE_MAX_BYTES
+
+# 每寫入幾筆就檢查一次是否需要淘汰
+EVICT_EVERY = 50
+
+_lock = threading.Lock()
+_conn: Optional[sqlite3.Connection] = None
+_disabled = False
+_puts_since_evict = 0
+# 命中項目的最後使用時間先記在記憶體，下次寫入或淘汰時再一起寫回，命中時不必每次 commit
+_touched: Dict[str, float] = {}
+_stats = {"hits": 0, "misses": 0, "saved_tokens": 0}
+
+
+def _hash(data: Any) -> str:
+    return hashlib.sha256(json.dumps(data, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def make_key(function: str, model: str, messages: List[dict], options: Optional[dict] = None) -> str:
+    """
+    以 (函式, 模型, 提示詞雜湊, 輸入雜湊) 組成快取鍵。
+    developer 訊息與呼叫參數（如 response_format）視為提示詞，其餘訊息視為輸入。
+
+    Args:
+        function (str): 產生此輸出的函式名稱。
+        model (str): 模型名稱。
+        messages (List[dict]): 送出的訊息列表。
+        options (Optional[dict], optional): 其他呼叫參數。
+
+    Returns:
+        str: 快取鍵。
+    """
+    prompt = [m for m in messages if m["role"] == "developer"]
+    inputs = [m for m in messages if m["role"] != "developer"]
+    prompt_hash = _hash({"prompt": prompt, "options": options or {}})[:16]
+    input_hash = _hash(inputs)
+    return f"{function}:{model}:{prompt_hash}:{input_hash}"
+
+
+def _connect() -> Optional[sqlite3.Connection]:
+    global _conn, _disabled
+    if _conn is not None or _disabled:
+        return _conn
+    try:
+        os.makedirs(os.path.dirname(GPT_CACHE_FILE) or ".", exist_ok=True)
+        conn = sqlite3.connect(GPT_CACHE_FILE, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS gpt_cache ("
+            " key TEXT PRIMARY KEY,"
+            " function TEXT NOT NULL,"
+            " model TEXT NOT NULL,"
+            " response TEXT NOT NULL,"
+            " tokens INTEGER NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_gpt_cache_last_used ON gpt_cache(last_used)")
+        conn.commit()
+        _conn = conn
+        _evict(time.time())
+    except Exception as e:
+        print(f"[gpt_cache] 無法開啟快取 {GPT_CACHE_FILE}，本次不使用快取: {e}")
+        _disabled = True
+    return _conn
+
+
+def _flush_touched():
+    """將累積的最後使用時間寫回資料庫（不 commit，由呼叫端 commit）。"""
+    if _touched:
+        _conn.executemany("UPDATE gpt_cache SET last_used = ? WHERE key = ?", [(ts, key) for key, ts in _touched.items()])
+        _touched.clear()
+
+
+def _evict(now: float):
+    """淘汰過期項目，並在總容量超過上限時依最後使用時間淘汰最舊的項目。"""
+    _flush_touched()
+    _conn.execute("DELETE FROM gpt_cache WHERE created_at < ?", (now - GPT_CACHE_MAX_AGE,))
+    total = _conn.execute("SELECT COALESCE(SUM(size), 0) FROM gpt_cache").fetchone()[0]
+    if total > GPT_CACHE_MAX_BYTES:
+        rows = _conn.execute("SELECT key, size FROM gpt_cache ORDER BY last_used").fetchall()
+        stale = []
+        for key, size in rows:
+            if total <= GPT_CACHE_MAX_BYTES:
+                break
+            stale.append((key,))
+            total -= size
+        _conn.executemany("DELETE FROM gpt_cache WHERE key = ?", stale)
+    _conn.commit()
+
+
+def get(key: str) -> Optional[str]:
+    """
+    查詢快取。
+
+    Args:
+        key (str): make_key 產生的快取鍵。
+
+    Returns:
+        Optional[str]: 快取的回覆內容；未命中或已過期時回傳 None。
+    """
+    with _lock:
+        conn = _connect()
+        if conn is None:
+            return None
+        now = time.time()
+        try:
+            row = conn.execute(
+                "SELECT response, tokens FROM gpt_cache WHERE key = ? AND created_at >= ?",
+                (key, now - GPT_CACHE_MAX_AGE),
+            ).fetchone()
+            if row is None:
+                _stats["misses"] += 1
+                return None
+            _touched[key] = now
+        except Exception as e:
+            print(f"[gpt_cache] 讀取快取發生錯誤: {e}")
+            return None
+        _stats["hits"] += 1
+        _stats["saved_tokens"] += row[1]
+        return row[0]
+
+
+def put(key: str, function: str, model: str, response: str, tokens: int = 0):
+    """
+    寫入快取。
+
+    Args:
+        key (str): make_key 產生的快取鍵。
+        function (str): 產生此輸出的函式名稱。
+        model (str): 模型名稱。
+        response (str): 回覆內容。
+        tokens (int, optional): 此次呼叫使用的 token 數，用於統計命中時節省的 token。
+    """
+    global _puts_since_evict
+    with _lock:
+        conn = _connect()
+        if conn is None:
+            return
+        now = time.time()
+        try:
+            _flush_touched()
+            conn.execute(
+                "INSERT OR REPLACE INTO gpt_cache VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, function, model, response, tokens, len(response.encode("utf-8")), now, now),
+            )
+            conn.commit()
+            _puts_since_evict += 1
+            if _puts_since_evict >= EVICT_EVERY:
+                _puts_since_evict = 0
+                _evict(now)
+        except Exception as e:
+            print(f"[gpt_cache] 寫入快取發生錯誤: {e}")
+
+
+def get_gpt_cache_stats() -> Dict[str, Any]:
+    """
+    取得 GPT 快取的統計數據。
+
+    Returns:
+        Dict[str, Any]: 包含 hits、misses、saved_tokens 與 entries 的字典。
+    """
+    with _lock:
+        conn = _connect()
+        entries = 0
+        if conn is not None:
+            try:
+                _flush_touched()
+                conn.commit()
+            except Exception as e:
+                print(f"[gpt_cache] 寫入最後使用時間發生錯誤: {e}")
+            entries = conn.execute("SELECT COUNT(*) FROM gpt_cache").fetchone()[0]
+        return {**_stats, "entries": entries}
+
+
+def print_gpt_cache_stats():
+    """印出 GPT 快取的統計數據。"""
+    stats = get_gpt_cache_stats()
+    print(
+        f"[gpt_cache] 命中 {stats['hits']} / 未命中 {stats['misses']}，"
+        f"節省 {stats['saved_tokens']} tokens，目前共 {stats['entries']} 筆快取。"
+    )
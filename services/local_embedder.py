@@ -0,0 +1,137 @@
+# services/local_embedder.py
+import os
+import re
+import threading
+import unicodedata
+import zlib
+from typing import Iterable, List, Sequence
+
+import numpy as np
+
+from config.config import DATA_FOLDER, EMBEDDING_DIMENSIONS, LOCAL_EMBEDDING_DIMENSIONS, LOCAL_EMBEDDING_NGRAMS
+
+# 各 bucket 的文件頻率（出現過該 n-gram 的標題數），用於計算 IDF
+DOCUMENT_FREQUENCY_FILE = os.path.join(DATA_FOLDER, "local_embedding_df.npz")
+# 文件數超過此值時，所有計數減半，讓較新的標題佔較高比重
+MAX_DOCUMENTS = 50000
+
+MODEL_KEY = f"local-ngram:{LOCAL_EMBEDDING_DIMENSIONS}"
+
+_NON_WORD_RE = re.compile(r"[\W_]+", re.UNICODE)
+
+_lock = threading.Lock()
+_loaded = False
+_documents = 0
+_document_frequency = np.zeros(LOCAL_EMBEDDING_DIMENSIONS, dtype=np.float32)
+
+
+def vector_matches_model(model: str, width: int) -> bool:
+    """
+    向量維度是否符合產生它的模型。OpenAI 無法使用時改用的本機向量維度不同，不能以 OpenAI 模型的名義保存或比較。
+
+    Args:
+        model (str): 模型識別字串（get_model_key 或 MODEL_KEY）。
+        width (int): 向量維度。
+
+    Returns:
+        bool: 本機模型時為 LOCAL_EMBEDDING_DIMENSIONS 維；OpenAI 模型時不是本機維度，且有設定 EMBEDDING_DIMENSIONS 時與其相同。
+    """
+    if model == MODEL_KEY:
+        return width == LOCAL_EMBEDDING_DIMENSIONS
+    if width == LOCAL_EMBEDDING_DIMENSIONS:
+        return False
+    return not EMBEDDING_DIMENSIONS or width == EMBEDDING_DIMENSIONS
+
+
+def _ngrams(text: str) -> List[str]:
+    """以字元 n-gram 切分文字；忽略全形/半形、大小寫與標點差異，n-gram 不跨越標點或空白。"""
+    normalized = _NON_WORD_RE.sub(" ", unicodedata.normalize("NFKC", text).lower())
+    grams = []
+    for segment in normalized.split():
+        for n in LOCAL_EMBEDDING_NGRAMS:
+            grams.extend(segment[start:start + n] for start in range(len(segment) - n + 1))
+    return grams
+
+
+def _hash_counts(text: str) -> dict:
+    """將 n-gram 雜湊到固定數量的 bucket，並以雜湊值的另一個位元決定正負號，減少碰撞造成的偏差。"""
+    counts = {}
+    for gram in _ngrams(text):
+        digest = zlib.crc32(gram.encode("utf-8"))
+        bucket = digest % LOCAL_EMBEDDING_DIMENSIONS
+        sign = 1.0 if digest & 0x80000000 else -1.0
+        count, _ = counts.get(bucket, (0, sign))
+        counts[bucket] = (count + 1, sign)
+    return counts
+
+
+def _ensure_loaded():
+    global _loaded, _documents, _document_frequency
+    if _loaded:
+        return
+    _loaded = True
+    if not os.path.exists(DOCUMENT_FREQUENCY_FILE):
+        return
+    try:
+        with np.load(DOCUMENT_FREQUENCY_FILE) as data:
+            frequency = data["document_frequency"].astype(np.float32)
+            if frequency.shape == _document_frequency.shape:
+                _document_frequency = frequency
+                _documents = int(data["documents"])
+    except Exception as e:
+        print(f"[local_embedder] 讀取 {DOCUMENT_FREQUENCY_FILE} 發生錯誤: {e}")
+
+
+def learn_document_frequencies(texts: Iterable[str]):
+    """
+    以新抓到的新聞標題更新各 bucket 的文件頻率並寫回檔案，讓常見的字詞（如「新聞」「今天」）權重較低。
+    同一則新聞只應學習一次（例如只在新聞第一次被抓到時呼叫）。
+
+    Args:
+        texts (Iterable[str]): 新聞標題。
+    """
+    global _documents, _document_frequency
+    texts = [text for text in texts if text]
+    if not texts:
+        return
+    with _lock:
+        _ensure_loaded()
+        for text in texts:
+            _document_frequency[list(_hash_counts(text))] += 1
+        _documents += len(texts)
+        if _documents > MAX_DOCUMENTS:
+            _document_frequency *= 0.5
+            _documents //= 2
+        try:
+            os.makedirs(os.path.dirname(DOCUMENT_FREQUENCY_FILE) or ".", exist_ok=True)
+            np.savez(DOCUMENT_FREQUENCY_FILE, documents=np.array(_documents), document_frequency=_document_frequency)
+        except Exception as e:
+            print(f"[local_embedder] 寫入 {DOCUMENT_FREQUENCY_FILE} 發生錯誤: {e}")
+
+
+def embed_local(texts: Sequence[str]) -> List[np.ndarray]:
+    """
+    以字元 n-gram 雜湊 TF-IDF 將文字轉成向量，不需要網路，適合比對中文新聞標題。
+
+    Args:
+        texts (Sequence[str]): 要轉換的文字。
+
+    Returns:
+        List[np.ndarray]: 與 texts 順序相同的 float32 單位向量（LOCAL_EMBEDDING_DIMENSIONS 維）；空白文字對應到空陣列。
+    """
+    with _lock:
+        _ensure_loaded()
+        idf = np.log((_documents + 1) / (_document_frequency + 1)) + 1
+
+    vectors = []
+    for text in texts:
+        counts = _hash_counts(text or "")
+        if not counts:
+            vectors.append(np.zeros(0, dtype=np.float32))
+            continue
+        vector = np.zeros(LOCAL_EMBEDDING_DIMENSIONS, dtype=np.float32)
+        buckets = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+        values = np.array([(1 + np.log(count)) * sign for count, sign in counts.values()], dtype=np.float32)
+        vector[buckets] = values * idf[buckets]
+        vectors.append(vector / np.linalg.norm(vector))
+    return vectors
@@ -1,27 +1,207 @@
 import os
 import json
-from typing import List, Dict
+from typing import List, Dict, Optional
 from services.news_service import get_latest_news
 from utils.json_utils import load_json, save_json
 from datetime import datetime, timedelta
-from config.config import NEWS_MEMORY
-from services.openai_gpt_processing_service import clean_content, generate_new_title, generate_new_content, generate_summary_as_critic
-from services.forum_post_service import process_forum_posts
+from config.config import (
+    NEWS_MEMORY,
+    PIPELINE_QUEUE_SIZE,
+    PIPELINE_CLEAN_CONCURRENCY,
+    PIPELINE_REWRITE_CONCURRENCY,
+    PIPELINE_POST_BATCH_SIZE,
+    USE_COMBINED_PROCESSING,
+    USE_BATCH_REWRITE,
+    PIPELINE_EARLY_DEDUPE,
+    EMBEDDING_BATCH_SIZE,
+)
+from services.openai_gpt_processing_service import (
+    clean_content_async,
+    generate_new_title_async,
+    generate_new_content_async,
+    generate_summary_as_critic_async,
+    process_article_async,
+)
+from services.forum_post_service import process_forum_posts, get_forum_tag_names, load_forum_history
 import asyncio
-from services.openai_embed_service import get_text_embedding, compare_embeddings
+import threading
+from services.openai_embed_service import get_text_embeddings_async, get_model_key, align_embeddings
+from services.local_embedder import learn_document_frequencies
+from services.similarity_engine import cluster
+from services.news_source.seen_index import seen_index
+from services.news_source.feed_news_service import forget_feed_items
+from services.news_source.content_fingerprint import content_index, fingerprint, similar_pairs
+from services.semantic_index import semantic_index
+from services.gpt_cache import print_gpt_cache_stats
+from services.embedding_cache import print_embedding_cache_stats
+from services.openai_batch_service import submit_rewrite_batch, rewrite_now
+from services.openai_rate_control import rate_controller, OpenAIUnavailableError
+from services.status_pool import refresh_status_pool
 
 DATA_FOLDER = "data"
 TEMP_NEWS_FILE = os.path.join(DATA_FOLDER, "temp_news.json")
 YAHOO_NEWS_URL = "https://tw.news.yahoo.com"  # Yahoo奇摩新聞首頁
 
+# 佇列結束標記
+_DONE = object()
+
+### 這裡的程式碼需要修改，應該要使用try，然後嘗試不同格式的解析方式，如果全部不行則寫入目前時間 ###
+def parse_published_date(date_str):
+    date_str = date_str.replace("下午", "PM").replace("上午", "AM")
+    formats = ["%Y年%m月%d日 %p%I:%M", "%Y-%m-%d %H:%M:%S", "%Y/%m/%d %H:%M:%S"]
+    for fmt in formats:
+        try:
+            return datetime.strptime(date_str, fmt)
+        except ValueError:
+            continue
+    # If all formats fail, return current time
+    return datetime.now()
+
+def _with_members(news: Dict, members: Dict[int, List[Dict]]) -> List[Dict]:
+    """回傳新聞本身與所有被合併進去的新聞（含多層合併）。"""
+    result = [news]
+    for member in members.get(id(news), []):
+        result.extend(_with_members(member, members))
+    return result
+
+def _forget_news(news_memory_file: str, dropped: List[Dict], original_keys: Dict[int, Dict], members: Dict[int, List[Dict]]):
+    """將未發文的新聞（含被合併進去的新聞）從 news_memory、已處理索引與 Feed 的 GUID 記錄移除，下次執行時會重新抓取。"""
+    forget = list(dropped) + [
+        original_keys[id(item)] for news in dropped for item in _with_members(news, members) if id(item) in original_keys
+    ]
+    links = {link for news in forget for link in news["link"].split("\n") if link}
+    news_memory = load_json(news_memory_file)
+    if isinstance(news_memory, list):
+        kept = [news for news in news_memory if not links.intersection(news["link"].split("\n"))]
+        save_json(news_memory_file, kept)
+    seen_index.forget(forget)
+    forget_feed_items(links)
+    print(f"[news_processer] {len(dropped)} 則新聞未發文，下次執行時重新處理。")
+
+async def _run_stage(name: str, in_queue: asyncio.Queue, out_queue: asyncio.Queue, handle, concurrency: int, dropped: list):
+    """
+    以 concurrency 個 worker 消化 in_queue，將 handle(item) 的結果放入 out_queue。
+    handle 回傳 None 代表該則新聞不再往下游傳遞（例如被合併）。
+    OpenAI 無法使用或處理失敗的新聞放入 dropped，不以未處理的內容發文，下次執行時重新處理。
+    收到結束標記後，所有 worker 結束，再把結束標記傳給下游。
+    """
+    async def worker():
+        while True:
+            item = await in_queue.get()
+            if item is _DONE:
+                # 讓同一階段的其他 worker 也能收到結束標記
+                await in_queue.put(_DONE)
+                return
+            try:
+                result = await handle(item)
+            except OpenAIUnavailableError as e:
+                print(f"[{name}] OpenAI API 無法使用，本次不處理: {item.get('title')}, 錯誤: {e}")
+                dropped.append(item)
+                continue
+            except Exception as e:
+                print(f"[{name}] 處理新聞時發生錯誤，本次不處理: {item.get('title')}, 錯誤: {e}")
+                dropped.append(item)
+                continue
+            if result is not None:
+                await out_queue.put(result)
+
+    await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    await out_queue.put(_DONE)
+
+async def _run_batch_stage(name: str, in_queue: asyncio.Queue, out_queue: asyncio.Queue, handle_batch, batch_size: int, dropped: list):
+    """
+    以單一 worker 消化 in_queue：每次取出目前已在佇列中的新聞（最多 batch_size 則），
+    交給 handle_batch(items) 一次處理，再將回傳列表中的新聞依序放入 out_queue。
+    handle_batch 整批失敗時，該批新聞都不往下游傳遞，並放入 dropped。
+    """
+    finished = False
+    while not finished:
+        batch = []
+        item = await in_queue.get()
+        while item is not _DONE:
+            batch.append(item)
+            if len(batch) >= batch_size or in_queue.empty():
+                break
+            item = await in_queue.get()
+        finished = item is _DONE
+        if not batch:
+            continue
+        try:
+            results = await handle_batch(batch)
+        except OpenAIUnavailableError as e:
+            print(f"[{name}] OpenAI API 無法使用，本批 {len(batch)} 則新聞不處理: {e}")
+            dropped.extend(batch)
+            continue
+        except Exception as e:
+            print(f"[{name}] 處理新聞時發生錯誤，本批 {len(batch)} 則新聞不處理: {e}")
+            dropped.extend(batch)
+            continue
+        for result in results:
+            await out_queue.put(result)
+    await out_queue.put(_DONE)
+
+def _merge_news(news: Dict, item: Dict):
+    """將 item 合併進 news：標題、內文、連結以換行串接，圖片合併。"""
+    news["title"] += "\n" + item["title"]
+    news["content"] += "\n" + item["content"]
+    news["link"] += "\n" + item["link"]
+    news["images"].extend(item["images"])
+    # 兩則都已在本機清理乾淨時，合併後才能跳過 GPT 清理
+    if "precleaned" in news or "precleaned" in item:
+        news["precleaned"] = news.get("precleaned", False) and item.get("precleaned", False)
+    # 合併後內文改變，一次產生的新內文與評論不再適用，改在重寫階段重新產生
+    news.pop("new_content", None)
+    news.pop("comment", None)
+    if "tags" in news and "tags" in item:
+        news["tags"] = list(dict.fromkeys(news["tags"] + item["tags"]))
+    else:
+        news.pop("tags", None)
+
+def _merge_duplicates(open_news: List[Dict], items: List[Dict], embeddings: List, signatures: Optional[List] = None, members: Optional[Dict[int, List[Dict]]] = None) -> List[Dict]:
+    """
+    將本批新聞與仍可合併的新聞一起以一次矩陣乘法分群，同一群的新聞合併成一則。
+    群組內有 open_news 時併入其中最早的一則，否則以本批最早的一則為主；open_news 都已送往下游，彼此不再合併。
+
+    Args:
+        open_news (List[Dict]): 先前通過、尚未進入下一個階段的新聞。
+        items (List[Dict]): 本批新聞。
+        embeddings (List): open_news + items 的標題向量。
+        signatures (Optional[List], optional): open_news + items 的內文 MinHash 指紋；內文幾乎相同的新聞也會合併。
+        members (Optional[Dict[int, List[Dict]]], optional): 記錄合併關係（id(主新聞) -> 被合併的新聞），未發文時用來取消每則新聞的已處理標記。
+
+    Returns:
+        List[Dict]: 本批中沒有被合併、要繼續往下游傳遞的新聞。
+    """
+    candidates = open_news + items
+    # 部分向量來自本機備援時，整組改用本機向量比較
+    embeddings = align_embeddings([news["title"] for news in candidates], embeddings)
+    results = []
+    pairs = similar_pairs(signatures) if signatures is not None else None
+    for group in cluster(embeddings, pairs=pairs):
+        head = candidates[group[0]]
+        for index in group[1:]:
+            if index >= len(open_news):
+                _merge_news(head, candidates[index])
+                if members is not None:
+                    members.setdefault(id(head), []).append(candidates[index])
+        if group[0] >= len(open_news):
+            results.append(head)
+    return results
+
 async def process_yahoo_news(bot):
     """
     抓取 Yahoo奇摩新聞並進行後續處理。
-    包含：
-    - 抓取新聞標題與連結
-    - 抓取每則新聞的內文
-    - 儲存結果到 JSON 檔案
-    - 返回處理後的新聞資料清單
+    各階段以 asyncio.Queue 串接，每個階段有各自的並行數，佇列滿時上游會暫停（背壓）：
+    - 抓取：各來源完成時就把新聞送進管線，並更新 news_memory
+    - 語意檢查：以原始標題的 Embedding 與內文指紋（MinHash/LSH）比對近幾天處理過的新聞，幾乎相同的新聞直接略過，不呼叫 GPT
+    - 預先去重（PIPELINE_EARLY_DEDUPE）：以原始標題向量與內文指紋合併同一則新聞，之後的 GPT 呼叫每則只需一次
+    - 清理：清理內文（本機預先清理有把握時略過 GPT）、產生新標題（USE_COMBINED_PROCESSING 時一次產生所有欄位）
+    - 去重：取出佇列中已清理的新聞，以一次請求產生標題 Embedding，與本次已通過的新聞比較，相似且尚未開始重寫的直接合併
+    - 重寫：產生新內文與評論（已一次產生者直接通過）；USE_BATCH_REWRITE 時改送 Batch API，結果由排程稍後發文
+    - 發文：把已完成的新聞分批發到論壇
+    OpenAI 暫時無法使用時，各階段會等待 API 恢復；等待逾時的新聞不發文，並取消已處理標記，下次執行再處理。
+    第一則新聞不需要等其他新聞跑完所有階段就能發出。
+    每則新聞的格式：
     [
         {
             "title": "標題",
@@ -32,72 +212,247 @@ async def process_yahoo_news(bot):
         },
     ]
     """
-    all_news = await asyncio.to_thread(get_latest_news)
+    loop = asyncio.get_running_loop()
+    fetched_queue = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    recalled_queue = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    cleaned_queue = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    rewrite_queue = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    post_queue = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+
     # Load existing news memory
     news_memory_file = os.path.join(DATA_FOLDER, "news_memory.json")
     news_memory = await asyncio.to_thread(load_json, news_memory_file)
     if not isinstance(news_memory, list):
         news_memory = []
-    # Filter out news that are already in memory
-    filtered_news = [news for news in all_news if news["title"] not in {n["title"] for n in news_memory}]
-    # Update news memory with new news
-    news_memory.extend(filtered_news)
-    # Update all_news to only include filtered news
-    all_news = filtered_news
-
-    # Remove news older than retention period from memory
-    # Define the retention period (5 days)
-    retention_period = timedelta(days=NEWS_MEMORY)
-    current_time = datetime.now()
-
-    ### 這裡的程式碼需要修改，應該要使用try，然後嘗試不同格式的解析方式，如果全部不行則寫入目前時間 ###
-    def parse_published_date(date_str):
-        date_str = date_str.replace("下午", "PM").replace("上午", "AM")
-        formats = ["%Y年%m月%d日 %p%I:%M", "%Y-%m-%d %H:%M:%S", "%Y/%m/%d %H:%M:%S"]
-        for fmt in formats:
-            try:
-                return datetime.strptime(date_str, fmt)
-            except ValueError:
+    memory_titles = {n["title"] for n in news_memory}
+    tag_names = await get_forum_tag_names(bot) if USE_COMBINED_PROCESSING else []
+    new_news = []
+    # OpenAI 無法使用而未發文的新聞，以及每則新聞抓取時的原始標題與連結
+    dropped = []
+    original_keys = {}
+    # 合併關係：id(主新聞) -> 被合併進去的新聞
+    members = {}
+
+    # 管線中止後，抓取執行緒不再送出新聞
+    stopped = threading.Event()
+
+    def on_source_done(source_name: str, news_list: List[Dict]):
+        # 在抓取執行緒中呼叫：過濾掉記憶中已有的新聞，其餘立即送進管線
+        for news in news_list:
+            if stopped.is_set():
+                return
+            if news["title"] in memory_titles:
                 continue
-        # If all formats fail, return current time
-        return datetime.now()
-    
-    news_memory = [news for news in news_memory if parse_published_date(news["published"]) >= current_time - retention_period]
-    # Save the filtered news memory
-    await asyncio.to_thread(save_json, news_memory_file, news_memory)
-
-
-    # Clean the news content
-    print("Clean news content...")
-    for item in all_news:
-        item['content'] = await asyncio.to_thread(clean_content, item['content'])
-        item['title'] = await asyncio.to_thread(generate_new_title, item['title'], item['content'])
-        print()
-    
-    for news in all_news:
-        news["embed_title"] = await asyncio.to_thread(get_text_embedding, news["title"])
-    merged_news = []
-    if len(all_news) >= 2:
-        for i, news in enumerate(all_news):
-            if news in merged_news:
+            memory_titles.add(news["title"])
+            # 管線會就地改寫標題、內文並合併新聞，news_memory 與已處理索引要記錄抓取時的原始內容
+            new_news.append({**news, "images": list(news["images"])})
+            original_keys[id(news)] = {"title": news["title"], "link": news["link"]}
+            # 佇列滿時阻塞抓取執行緒，形成背壓
+            asyncio.run_coroutine_threadsafe(fetched_queue.put(news), loop).result()
+
+    async def fetch_stage():
+        try:
+            await asyncio.to_thread(get_latest_news, on_source_done)
+        finally:
+            await fetched_queue.put(_DONE)
+
+        # Update news memory with new news
+        news_memory.extend(new_news)
+        # 記錄到共用的已處理索引，之後各來源在抓內文前就會略過
+        await asyncio.to_thread(seen_index.mark, new_news)
+
+        # Remove news older than retention period from memory
+        retention_period = timedelta(days=NEWS_MEMORY)
+        current_time = datetime.now()
+        kept_memory = [news for news in news_memory if parse_published_date(news["published"]) >= current_time - retention_period]
+        # 標題向量與預先清理標記不寫入 JSON
+        kept_memory = [{key: value for key, value in news.items() if key not in ("embed_title", "precleaned")} for news in kept_memory]
+        # Save the filtered news memory
+        await asyncio.to_thread(save_json, news_memory_file, kept_memory)
+        await asyncio.to_thread(seen_index.prune)
+        await asyncio.to_thread(semantic_index.prune)
+        await asyncio.to_thread(content_index.prune)
+
+    # 通過語意索引與內文指紋檢查的新聞：(新聞, 原始標題, 標題向量, 內文指紋)，執行結束後加入索引
+    model_key = get_model_key()
+    recalled = []
+    # 以原始標題分群時，尚未開始清理（還能合併）的新聞，以及各新聞原始標題的向量與內文指紋
+    pending_news = []
+    clean_started = set()
+    raw_embeddings = {}
+    raw_signatures = {}
+
+    def fingerprint_and_find(contents):
+        signatures = [fingerprint(content) for content in contents]
+        return signatures, [content_index.find(signature) for signature in signatures]
+
+    async def skip_remembered(items):
+        # 以原始標題與內文指紋，與近 NEWS_MEMORY 天處理過的新聞比對，幾乎相同的新聞不再呼叫 GPT
+        titles = [item["title"] for item in items]
+        # 新抓到的標題用於更新本機向量的 IDF
+        await asyncio.to_thread(learn_document_frequencies, titles)
+        signatures, content_matches = await asyncio.to_thread(fingerprint_and_find, [item["content"] for item in items])
+        embeddings = await get_text_embeddings_async(titles)
+        matches = await asyncio.to_thread(semantic_index.search, model_key, embeddings)
+        results = []
+        for item, title, embedding, match, signature, content_match in zip(items, titles, embeddings, matches, signatures, content_matches):
+            if match is not None:
+                print(f"[recall] 與先前處理過的新聞幾乎相同，略過: {title}")
                 continue
-            for j in range(i + 1, len(all_news)):
-                other_news = all_news[j]
-                if other_news not in merged_news:
-                    similarity = await asyncio.to_thread(compare_embeddings, news['embed_title'], other_news["embed_title"])
-                    if similarity:
-                        news["title"] += "\n" + other_news["title"]
-                        news["content"] += "\n" + other_news["content"]
-                        news["link"] += "\n" + other_news["link"]
-                        news["images"].extend(other_news["images"])
-                        merged_news.append(other_news)
-    all_news = [news for news in all_news if news not in merged_news]
-
-    # Process the news content
-    print("Process news content...")
-    for item in all_news:
-        item['content'] = await asyncio.to_thread(generate_new_content, item['content'])
-        item['comment'] = await asyncio.to_thread(generate_summary_as_critic, item['title'], item['content'])
-        print()
-
-    await process_forum_posts(all_news, bot)
+            if content_match is not None:
+                print(f"[recall] 內文與先前處理過的新聞幾乎相同（{content_match}），略過: {title}")
+                continue
+            recalled.append((item, title, embedding, signature))
+            raw_embeddings[id(item)] = embedding
+            raw_signatures[id(item)] = signature
+            results.append(item)
+        if not PIPELINE_EARLY_DEDUPE:
+            return results
+
+        # 在呼叫 GPT 之前，先以原始標題與內文指紋合併同一則新聞，清理與產生標題每則只需呼叫一次
+        open_news = [news for news in pending_news if id(news) not in clean_started]
+        candidates = open_news + results
+        results = _merge_duplicates(
+            open_news,
+            results,
+            [raw_embeddings[id(news)] for news in candidates],
+            [raw_signatures[id(news)] for news in candidates],
+            members,
+        )
+        pending_news[:] = open_news + results
+        return results
+
+    async def clean(item):
+        clean_started.add(id(item))
+        # 本機規則已有把握清理乾淨的內文，不再呼叫 GPT 清理（一次處理時也不需回傳清理後內文）
+        precleaned = item.pop('precleaned', False)
+        if USE_COMBINED_PROCESSING:
+            result = await process_article_async(item['title'], item['content'], tag_names, precleaned)
+            if result is not None:
+                # content 維持清理後內文，方便去重時合併；新內文在重寫階段才替換
+                item['content'] = result['cleaned_content']
+                item['title'] = result['title']
+                item['new_content'] = result['content']
+                item['comment'] = result['comment']
+                item['tags'] = result['tags']
+                return item
+        if not precleaned:
+            item['content'] = await clean_content_async(item['content'])
+        item['title'] = await generate_new_title_async(item['title'], item['content'])
+        return item
+
+    # 本次已通過去重的新聞，以及已開始重寫（不能再合併進去）的新聞
+    accepted_news = []
+    rewrite_started = set()
+    # 要送到 Batch API 的新聞
+    batch_items = []
+
+    async def embed_and_dedupe(items):
+        # 一次請求產生整批標題的 Embedding
+        embeddings = await get_text_embeddings_async([item["title"] for item in items])
+        for item, embedding in zip(items, embeddings):
+            item["embed_title"] = embedding
+        # 以下沒有 await，在事件迴圈中不會被其他階段打斷
+        # 尚未開始重寫的已通過新聞仍可合併
+        open_news = [news for news in accepted_news if id(news) not in rewrite_started]
+        results = _merge_duplicates(open_news, items, [news["embed_title"] for news in open_news + items], members=members)
+        accepted_news.extend(results)
+        return results
+
+    async def rewrite(item):
+        rewrite_started.add(id(item))
+        if 'new_content' in item:
+            item['content'] = item.pop('new_content')
+            return item
+        if USE_BATCH_REWRITE:
+            batch_items.append(item)
+            return None
+        item['content'] = await generate_new_content_async(item['content'])
+        item['comment'] = await generate_summary_as_critic_async(item['title'], item['content'])
+        return item
+
+    # 論壇貼文與標題向量在第一次發文時抓取一次，之後各批次共用
+    forum_history = None
+
+    async def post_news(name: str, items: List[Dict]):
+        # 發文中途失敗時，只有尚未出現在論壇的新聞放入 dropped，已發出的新聞不會在下次執行重複發文
+        nonlocal forum_history
+        posted = []
+        try:
+            if forum_history is None:
+                forum_history = await load_forum_history(bot)
+            await process_forum_posts(list(items), bot, history=forum_history, posted=posted)
+            return
+        except OpenAIUnavailableError as e:
+            error = f"OpenAI API 無法使用: {e}"
+        except Exception as e:
+            error = f"發文時發生錯誤: {e}"
+        posted_ids = {id(news) for news in posted}
+        unposted = [news for news in items if id(news) not in posted_ids]
+        print(f"[{name}] {error}，{len(posted)} 則已發出，其餘 {len(unposted)} 則下次重新處理。")
+        dropped.extend(unposted)
+
+    async def post_stage():
+        finished = False
+        while not finished:
+            batch = []
+            item = await post_queue.get()
+            # 取出目前已完成的新聞，一起發文
+            while item is not _DONE:
+                batch.append(item)
+                if len(batch) >= PIPELINE_POST_BATCH_SIZE or post_queue.empty():
+                    break
+                item = await post_queue.get()
+            finished = item is _DONE
+            if batch:
+                await post_news("post", batch)
+
+    stages = [
+        asyncio.create_task(fetch_stage()),
+        asyncio.create_task(_run_batch_stage("recall", fetched_queue, recalled_queue, skip_remembered, EMBEDDING_BATCH_SIZE, dropped)),
+        asyncio.create_task(_run_stage("clean", recalled_queue, cleaned_queue, clean, PIPELINE_CLEAN_CONCURRENCY, dropped)),
+        asyncio.create_task(_run_batch_stage("dedupe", cleaned_queue, rewrite_queue, embed_and_dedupe, EMBEDDING_BATCH_SIZE, dropped)),
+        asyncio.create_task(_run_stage("rewrite", rewrite_queue, post_queue, rewrite, PIPELINE_REWRITE_CONCURRENCY, dropped)),
+        asyncio.create_task(post_stage()),
+    ]
+    try:
+        await asyncio.gather(*stages)
+    finally:
+        # 任一階段發生未預期的錯誤時，取消其他階段，避免留下無人等待的工作
+        stopped.set()
+        for stage in stages:
+            stage.cancel()
+        await asyncio.gather(*stages, return_exceptions=True)
+        # 讓卡在佇列已滿的抓取執行緒能夠結束
+        while not fetched_queue.empty():
+            fetched_queue.get_nowait()
+    if batch_items:
+        # Batch 無法使用時改為即時重寫後直接發文
+        rewritten = []
+        try:
+            if not await submit_rewrite_batch(batch_items):
+                await rewrite_now(batch_items)
+                rewritten = batch_items
+        except OpenAIUnavailableError as e:
+            print(f"[rewrite] OpenAI API 無法使用，{len(batch_items)} 則新聞不發文: {e}")
+            dropped.extend(batch_items)
+        except Exception as e:
+            print(f"[rewrite] 建立 Batch 工作或即時重寫時發生錯誤，{len(batch_items)} 則新聞下次重新處理: {e}")
+            dropped.extend(batch_items)
+        if rewritten:
+            await post_news("rewrite", rewritten)
+
+    if dropped:
+        await asyncio.to_thread(_forget_news, news_memory_file, dropped, original_keys, members)
+
+    # 未發文的新聞（含被合併進去的新聞）下次會重新處理，不產生狀態，也不加入語意索引
+    dropped_ids = {id(item) for news in dropped for item in _with_members(news, members)}
+    # 以本次的新聞預先產生 Discord 狀態，StatusCog 之後只從記憶體中取用
+    await refresh_status_pool([news["title"] for news in accepted_news if id(news) not in dropped_ids])
+    indexed = [entry for entry in recalled if id(entry[0]) not in dropped_ids]
+    if indexed:
+        await asyncio.to_thread(semantic_index.add, model_key, [title for _, title, _, _ in indexed], [embedding for _, _, embedding, _ in indexed])
+        await asyncio.to_thread(content_index.add, [(original_keys[id(item)]["link"], signature) for item, _, _, signature in indexed])
+    await asyncio.to_thread(print_gpt_cache_stats)
+    await asyncio.to_thread(print_embedding_cache_stats)
+    print(f"[news_processer] OpenAI 請求統計: {rate_controller.get_stats()}")
@@ -1,11 +1,134 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
 
+from config.config import DATA_FOLDER, NEWS_SOURCE_TIMEOUT, NEWS_FEEDS, USE_FEED_SOURCES
+from utils.json_utils import save_json
 from services.news_source.yahoo_news_service import fetch_yahoo_news
 from services.news_source.baha_news_service import fetch_baha_news
 from services.news_source.four_gamer_news_service import fetch_gamer_news
+from services.news_source.feed_news_service import make_feed_source
+from services.news_source.http_client import get_host_stats
 
-def get_latest_news():
-    news = fetch_yahoo_news()
-    # news.extend(fetch_baha_news()) # 版權問題，暫不使用
-    news.extend(fetch_gamer_news())
-    return news
+TEMP_NEWS_FILE = os.path.join(DATA_FOLDER, "temp_news.json")
+
+@dataclass
+class NewsSource:
+    """
+    新聞來源的註冊資訊。
+
+    Attributes:
+        name (str): 來源名稱（用於日誌與統計）。
+        fetch (Callable[[], Optional[List[dict]]]): 抓取函式，失敗時可回傳 None。
+        enabled (bool): 是否啟用。
+        timeout (float): 該來源的抓取期限（秒）。
+    """
+    name: str
+    fetch: Callable[[], Optional[List[dict]]]
+    enabled: bool = True
+    timeout: float = NEWS_SOURCE_TIMEOUT
+
+NEWS_SOURCES: Dict[str, NewsSource] = {}
+
+# 最近一次抓取時各來源的統計：{"來源": {"count": 數量, "seconds": 秒數, "error": 錯誤訊息或 None}}
+last_fetch_stats: Dict[str, dict] = {}
+
+def register_source(name: str, fetch: Callable[[], Optional[List[dict]]], enabled: bool = True, timeout: float = NEWS_SOURCE_TIMEOUT) -> NewsSource:
+    """
+    註冊一個新聞來源。同名來源會被覆蓋。
+
+    Args:
+        name (str): 來源名稱。
+        fetch (Callable[[], Optional[List[dict]]]): 抓取函式。
+        enabled (bool, optional): 是否啟用。預設為 True。
+        timeout (float, optional): 抓取期限（秒）。預設為 config 中的 NEWS_SOURCE_TIMEOUT。
+
+    Returns:
+        NewsSource: 註冊後的來源。
+    """
+    source = NewsSource(name=name, fetch=fetch, enabled=enabled, timeout=timeout)
+    NEWS_SOURCES[name] = source
+    return source
+
+register_source("yahoo", fetch_yahoo_news, enabled=not USE_FEED_SOURCES)
+register_source("baha", fetch_baha_news, enabled=False)  # 版權問題，暫不使用
+register_source("4gamers", fetch_gamer_news)
+# RSS 模式：以 Feed 取代 Yahoo 首頁爬蟲
+for feed_name, feed_url in NEWS_FEEDS.items():
+    register_source(feed_name, make_feed_source(feed_url), enabled=USE_FEED_SOURCES)
+
+def _run_source(source: NewsSource) -> dict:
+    started = time.perf_counter()
+    try:
+        news = source.fetch()
+        error = None if news is not None else "來源回傳 None"
+    except Exception as e:
+        news, error = None, str(e)
+    return {"news": news or [], "seconds": time.perf_counter() - started, "error": error}
 
+def get_latest_news(on_source_done: Optional[Callable[[str, List[dict]], None]] = None) -> List[dict]:
+    """
+    同時執行所有已啟用的新聞來源，並依註冊順序合併結果。
+    單一來源失敗（例外、回傳 None）或逾時，只會讓該來源本次沒有新聞，不影響其他來源。
+    各來源的數量與耗時記錄在 last_fetch_stats。
+
+    Args:
+        on_source_done (Optional[Callable[[str, List[dict]], None]], optional):
+            每個來源完成時立即呼叫（依完成順序），參數為來源名稱與該來源的新聞。
+
+    Returns:
+        List[dict]: 所有來源的新聞列表。
+    """
+    sources = [source for source in NEWS_SOURCES.values() if source.enabled]
+    if not sources:
+        return []
+
+    started = time.perf_counter()
+    executor = ThreadPoolExecutor(max_workers=len(sources))
+    pending = {executor.submit(_run_source, source): source for source in sources}
+
+    results = {}
+    stats = {}
+    while pending:
+        elapsed = time.perf_counter() - started
+        # 已超過期限的來源視為逾時
+        for future, source in list(pending.items()):
+            if elapsed >= source.timeout:
+                stats[source.name] = {"count": 0, "seconds": source.timeout, "error": "timeout"}
+                del pending[future]
+        if not pending:
+            break
+
+        next_deadline = min(source.timeout for source in pending.values()) - elapsed
+        done, _ = wait(pending, timeout=next_deadline, return_when=FIRST_COMPLETED)
+        for future in done:
+            source = pending.pop(future)
+            result = future.result()
+            results[source.name] = result["news"]
+            stats[source.name] = {"count": len(result["news"]), "seconds": result["seconds"], "error": result["error"]}
+            if on_source_done and result["news"]:
+                on_source_done(source.name, result["news"])
+    # 逾時的來源仍在背景執行緒中，不等待其結束
+    executor.shutdown(wait=False)
+
+    news = []
+    for source in sources:
+        news.extend(results.get(source.name, []))
+
+    last_fetch_stats.clear()
+    last_fetch_stats.update(stats)
+    for source in sources:
+        stat = stats[source.name]
+        status = "成功" if stat["error"] is None else f"失敗（{stat['error']}）"
+        print(f"[news_service] {source.name}: {status}，{stat['count']} 則，耗時 {stat['seconds']:.2f} 秒")
+    for host, stat in get_host_stats().items():
+        print(
+            f"[news_service] {host}: {stat['requests']:.0f} 次請求，成功率 {stat['success_rate']:.0%}，"
+            f"重試 {stat['retries']:.0f} 次，平均延遲 {stat['avg_latency']:.2f} 秒"
+        )
+
+    os.makedirs(DATA_FOLDER, exist_ok=True)
+    save_json(TEMP_NEWS_FILE, news)
+    return news
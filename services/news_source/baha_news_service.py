@@ -1,50 +1,81 @@
 import os
 import json
 from typing import Dict
-import requests
-from bs4 import BeautifulSoup
-from services.news_source.fetch_article_content import fetch_article_content
+from bs4 import SoupStrainer
+from services.news_source.http_client import fetch_all
+from services.news_source.http_cache import cached_get, flush_http_cache
+from services.news_source.html_parser import make_soup
+from services.news_source.seen_index import filter_unseen
+from services.token_budget import trim_to_budget
 
 DATA_FOLDER = "data"
-TEMP_NEWS_FILE = os.path.join(DATA_FOLDER, "temp_news.json")
 
 BAHA_NEWS_URL = "https://gnn.gamer.com.tw/"  # 巴哈姆特新聞首頁
 
+# 首頁只需要新聞列表區塊
+HOMEPAGE_STRAINER = SoupStrainer("div", class_="GN-lbox2B")
+
+def _is_article_tag(name, attrs) -> bool:
+    if name == "script":
+        return attrs.get("type") == "application/ld+json"
+    if name == "div":
+        return bool({"GN-lbox3B", "GN-lbox3C"} & set(attrs.get("class", "").split()))
+    return False
+
+# 文章頁只需要 JSON-LD、內文與圖片區塊
+ARTICLE_STRAINER = SoupStrainer(_is_article_tag)
+
+def parse_baha_homepage(html: str) -> list:
+    """
+    解析 巴哈姆特新聞首頁，取出新聞標題與連結。
+
+    Args:
+        html (str): 首頁 HTML。
+
+    Returns:
+        list: [[標題, 連結], ...]
+    """
+    soup = make_soup(html, HOMEPAGE_STRAINER)
+    entries = []
+    for news_item in soup.select("div.GN-lbox2B"):
+        title_tag = news_item.select_one("h1.GN-lbox2D a")
+        if not title_tag:
+            continue
+        title = title_tag.get_text(strip=True)
+        link = title_tag["href"].strip()
+        if not link.startswith("https://"):
+            link = "https:" + link
+        entries.append([title, link])
+    return entries
+
 def fetch_baha_news():
     """
-    1) 從 巴哈姆特新聞首頁抓取 HTML
+    1) 從 巴哈姆特新聞首頁抓取 HTML（未變更時直接使用快取的解析結果）
     2) 解析新聞標題與連結
-    3) 針對每個連結，再進一步嘗試抓內文
-    4) 最後將結果輸出到 data/temp_news.json
+    3) 針對所有連結，以共用連線池並行抓取內文
+    4) 回傳新聞列表（由 news_service 統一輸出到 data/temp_news.json）
     """
 
     all_news = []
 
-    # 1) 取得 巴哈姆特新聞首頁的 HTML
+    # 1)、2) 取得並解析 巴哈姆特新聞首頁
     try:
-        resp = requests.get(BAHA_NEWS_URL, timeout=10, headers={
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"
-        })
-        resp.raise_for_status()
+        news_items, _ = cached_get(BAHA_NEWS_URL, parse_baha_homepage)
     except Exception as e:
         print(f"無法取得 巴哈姆特新聞首頁: {e}")
         return
 
-    # 2) 解析 HTML，找出新聞列表
-    soup = BeautifulSoup(resp.text, "html.parser")
-    news_items = soup.select("div.GN-lbox2B")
+    # 已處理過的新聞（連結或標題相同）不再抓取
+    candidates = filter_unseen(news_items)
 
-    for news_item in news_items:
-        title_tag = news_item.select_one("h1.GN-lbox2D a")
-        if not title_tag:
-            continue
-        title = title_tag.get_text(strip=True)
-        link = title_tag["href"].strip()
-        if not link.startswith("https://"):
-            link = "https:" + link
+    # 3) 並行抓取內文
+    articles = fetch_all(
+        [link for _, link in candidates],
+        fetch_article_content,
+        lambda url: {"published": "", "content": "", "images": []},
+    )
 
-        # 3) 嘗試抓取內文
-        article_data = fetch_article_content(link)
+    for (title, link), article_data in zip(candidates, articles):
         if article_data["content"] == "":
             continue
         published_time = article_data["published"]
@@ -59,33 +90,21 @@ def fetch_baha_news():
             "images": images
         }
         all_news.append(news_item)
+    flush_http_cache()
 
-    # 4) 輸出 JSON
-    os.makedirs(DATA_FOLDER, exist_ok=True)
-    with open(TEMP_NEWS_FILE, "w", encoding="utf-8") as f:
-        json.dump(all_news, f, ensure_ascii=False, indent=2)
     return all_news
 
-def fetch_article_content(url: str) -> Dict[str, str]:
+def parse_baha_article_html(html: str) -> Dict[str, str]:
     """
-    從指定的 URL 抓取新聞內文、發佈時間和圖片。
-    
+    從 巴哈姆特新聞文章頁面的 HTML 解析出內文、發佈時間和圖片。
+
     Args:
-        url (str): 新聞文章的 URL。
-    
+        html (str): 文章頁面的 HTML。
+
     Returns:
         Dict[str, str]: 包含內文、發佈時間和圖片的字典。
     """
-    try:
-        resp = requests.get(url, timeout=10, headers={
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"
-        })
-        resp.raise_for_status()
-    except Exception as e:
-        print(f"無法取得文章內容: {e}")
-        return {"published": "", "content": "", "images": []}
-
-    soup = BeautifulSoup(resp.text, "html.parser")
+    soup = make_soup(html, ARTICLE_STRAINER)
 
     # Extract the JSON-LD script
     json_ld_script = soup.find("script", type="application/ld+json")
@@ -110,5 +129,23 @@ def fetch_article_content(url: str) -> Dict[str, str]:
             img_url = "https:" + img_url
         images.append(img_url)
 
-    return {"published": published_time, "content": content_text, "images": images}
+    return {"published": published_time, "content": trim_to_budget(content_text), "images": images}
+
+def fetch_article_content(url: str) -> Dict[str, str]:
+    """
+    從指定的 URL 抓取新聞內文、發佈時間和圖片。
+    頁面未變更（HTTP 304）時直接使用快取的解析結果。
+    
+    Args:
+        url (str): 新聞文章的 URL。
+    
+    Returns:
+        Dict[str, str]: 包含內文、發佈時間和圖片的字典。
+    """
+    try:
+        article, _ = cached_get(url, parse_baha_article_html)
+    except Exception as e:
+        print(f"無法取得文章內容: {e}")
+        return {"published": "", "content": "", "images": []}
 
+    return article
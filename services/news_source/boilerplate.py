@@ -0,0 +1,151 @@
+# services/news_source/boilerplate.py
+import hashlib
+import os
+import re
+import threading
+import time
+import unicodedata
+from typing import Dict, List, Optional, Tuple
+
+from config.config import (
+    DATA_FOLDER,
+    BOILERPLATE_MAX_LINK_DENSITY,
+    BOILERPLATE_MIN_CHARS,
+    BOILERPLATE_LEARN_MIN_ARTICLES,
+    BOILERPLATE_MIN_CONTENT_CHARS,
+)
+from utils.json_utils import load_json, save_json
+from services.token_budget import is_boilerplate
+
+BLOCKLIST_FILE = os.path.join(DATA_FOLDER, "boilerplate_blocklist.json")
+# 只有較短的段落才可能是重複的頁尾，長段落不列入學習
+MAX_LEARN_CHARS = 200
+# 封鎖清單項目多久沒出現就淘汰（秒）；只出現過一次的項目較快淘汰
+BLOCKLIST_MAX_AGE = 30 * 24 * 60 * 60
+SINGLE_SEEN_MAX_AGE = 3 * 24 * 60 * 60
+# 連結比例在此值與 BOILERPLATE_MAX_LINK_DENSITY 之間的段落保留，但視為難以判斷
+AMBIGUOUS_LINK_DENSITY = 0.2
+# 中等長度、沒有句末標點的段落視為難以判斷
+AMBIGUOUS_MAX_CHARS = 30
+
+_SENTENCE_END_RE = re.compile(r"[。！？!?；;」』…]")
+_SPACE_RE = re.compile(r"\s+")
+
+_lock = threading.Lock()
+_loaded = False
+_dirty = False
+# 來源網站 -> {段落雜湊: {"articles": 出現的文章數, "last_seen": 時間戳}}
+_blocklists: Dict[str, Dict[str, dict]] = {}
+
+
+def _paragraph_key(text: str) -> str:
+    normalized = _SPACE_RE.sub("", unicodedata.normalize("NFKC", text))
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:16]
+
+
+def _ensure_loaded():
+    global _loaded, _blocklists
+    if _loaded:
+        return
+    data = load_json(BLOCKLIST_FILE, default_data={})
+    _blocklists = data if isinstance(data, dict) else {}
+    _loaded = True
+
+
+def extract_paragraphs(soup) -> List[Tuple[str, float]]:
+    """
+    取出頁面中所有 <p> 的文字與連結比例（連結文字字數 / 段落字數）。
+
+    Args:
+        soup (BeautifulSoup): 已解析的頁面。
+
+    Returns:
+        List[Tuple[str, float]]: (段落文字, 連結比例) 的列表。
+    """
+    paragraphs = []
+    for p in soup.find_all("p"):
+        text = p.get_text(strip=True)
+        if not text:
+            continue
+        link_chars = sum(len(a.get_text(strip=True)) for a in p.find_all("a"))
+        paragraphs.append((text, min(1.0, link_chars / len(text))))
+    return paragraphs
+
+
+def _learn(source: str, paragraphs: List[Tuple[str, float]]):
+    """記錄這篇文章出現的短段落；同一網站多篇文章都出現的段落會被加入封鎖清單。"""
+    global _dirty
+    now = time.time()
+    keys = {_paragraph_key(text) for text, _ in paragraphs if len(text) <= MAX_LEARN_CHARS}
+    blocklist = _blocklists.setdefault(source, {})
+    for key in keys:
+        entry = blocklist.setdefault(key, {"articles": 0, "last_seen": now})
+        entry["articles"] += 1
+        entry["last_seen"] = now
+    _dirty = True
+
+
+def _is_blocked(source: Optional[str], text: str) -> bool:
+    if not source or len(text) > MAX_LEARN_CHARS:
+        return False
+    entry = _blocklists.get(source, {}).get(_paragraph_key(text))
+    return entry is not None and entry["articles"] >= BOILERPLATE_LEARN_MIN_ARTICLES
+
+
+def strip_boilerplate(paragraphs: List[Tuple[str, float]], source: Optional[str] = None) -> Tuple[str, bool]:
+    """
+    以本機規則移除文章中的樣板段落，不呼叫 GPT：
+    - 連結比例過高的段落（導覽、相關新聞、分享連結）
+    - 延伸閱讀、訂閱、版權宣告、圖片來源等明顯樣板
+    - 過短且沒有句末標點的段落（分享按鈕、圖說）
+    - 該網站多篇文章都出現過的段落（從先前的文章學習）
+
+    Args:
+        paragraphs (List[Tuple[str, float]]): extract_paragraphs 的結果。
+        source (Optional[str], optional): 來源網站（主機名稱），用於學習與套用封鎖清單。
+
+    Returns:
+        Tuple[str, bool]: (清理後的內文, 是否有把握不需要再以 GPT 清理)。
+    """
+    with _lock:
+        _ensure_loaded()
+        blocked = [_is_blocked(source, text) for text, _ in paragraphs]
+        if source:
+            _learn(source, paragraphs)
+
+    kept = []
+    ambiguous = 0
+    for (text, link_density), is_blocked in zip(paragraphs, blocked):
+        has_sentence_end = bool(_SENTENCE_END_RE.search(text))
+        if is_blocked or link_density > BOILERPLATE_MAX_LINK_DENSITY or is_boilerplate(text):
+            continue
+        if len(text) < BOILERPLATE_MIN_CHARS and not has_sentence_end:
+            continue
+        if link_density > AMBIGUOUS_LINK_DENSITY or (len(text) < AMBIGUOUS_MAX_CHARS and not has_sentence_end):
+            ambiguous += 1
+        kept.append(text)
+
+    content = "\n".join(kept)
+    confident = ambiguous == 0 and len(content) >= BOILERPLATE_MIN_CONTENT_CHARS
+    return content, confident
+
+
+def flush_boilerplate_blocklist():
+    """淘汰過舊的項目，並將各網站的封鎖清單寫回 data/ 下的檔案。"""
+    global _dirty
+    with _lock:
+        if not _loaded or not _dirty:
+            return
+        now = time.time()
+        for source in list(_blocklists):
+            blocklist = _blocklists[source]
+            for key in list(blocklist):
+                entry = blocklist[key]
+                max_age = SINGLE_SEEN_MAX_AGE if entry["articles"] <= 1 else BLOCKLIST_MAX_AGE
+                if now - entry["last_seen"] > max_age:
+                    del blocklist[key]
+            if not blocklist:
+                del _blocklists[source]
+        os.makedirs(DATA_FOLDER, exist_ok=True)
+        save_json(BLOCKLIST_FILE, _blocklists)
+        _dirty = False
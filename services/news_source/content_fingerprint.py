@@ -0,0 +1,227 @@
+# services/news_source/content_fingerprint.py
+import os
+import re
+import threading
+import time
+import unicodedata
+import zlib
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from config.config import (
+    DATA_FOLDER,
+    NEWS_MEMORY,
+    CONTENT_SHINGLE_SIZE,
+    MINHASH_PERMUTATIONS,
+    MINHASH_BANDS,
+    CONTENT_FINGERPRINT_THRESHOLD,
+)
+from utils.json_utils import load_json, save_json
+from services.news_source.seen_index import canonicalize_url
+
+# 與 news_memory.json 放在同一個資料夾
+CONTENT_FINGERPRINT_FILE = os.path.join(DATA_FOLDER, "content_fingerprints.json")
+# 正規化後內文短於此字數時不計算指紋，避免空內文或只有一兩句的內文被誤判為相同
+MIN_CONTENT_CHARS = 80
+
+_PUNCTUATION_RE = re.compile(r"[\W_]+", re.UNICODE)
+# MinHash 的雜湊函式：(a * x + b) mod P，P 為 Mersenne 質數 2^61 - 1，x 為 shingle 的 crc32（< 2^32）
+# a、b 隨機取自 [0, P)，才是一組 universal hash；乘法拆成 32 位元的兩半計算，uint64 不會溢位
+_PRIME = np.uint64((1 << 61) - 1)
+_LOW_32 = np.uint64((1 << 32) - 1)
+_LOW_29 = np.uint64((1 << 29) - 1)
+_rng = np.random.default_rng(20240101)
+_A = _rng.integers(1, (1 << 61) - 1, size=MINHASH_PERMUTATIONS, dtype=np.uint64)
+_B = _rng.integers(0, (1 << 61) - 1, size=MINHASH_PERMUTATIONS, dtype=np.uint64)
+_A_HIGH = (_A >> np.uint64(32))[:, None]
+_A_LOW = (_A & _LOW_32)[:, None]
+# 雜湊函式改變後，舊的指紋無法比較
+HASH_VERSION = 2
+_ROWS = MINHASH_PERMUTATIONS // MINHASH_BANDS
+
+
+def fingerprint(content: str) -> Optional[np.ndarray]:
+    """
+    計算內文的 MinHash 指紋：以連續 CONTENT_SHINGLE_SIZE 個字元為一個 shingle，
+    兩篇內文指紋相同位置相等的比例，即為 shingle 集合 Jaccard 相似度的估計值。
+    忽略全形/半形、大小寫、空白與標點差異。
+
+    Args:
+        content (str): 新聞內文。
+
+    Returns:
+        Optional[np.ndarray]: MINHASH_PERMUTATIONS 個雜湊值（uint64，小於 2^61 - 1）組成的指紋；內文過短時回傳 None。
+    """
+    normalized = _PUNCTUATION_RE.sub("", unicodedata.normalize("NFKC", content or "").lower())
+    if len(normalized) < MIN_CONTENT_CHARS:
+        return None
+    shingles = {normalized[start:start + CONTENT_SHINGLE_SIZE] for start in range(len(normalized) - CONTENT_SHINGLE_SIZE + 1)}
+    hashes = np.fromiter((zlib.crc32(shingle.encode("utf-8")) for shingle in shingles), dtype=np.uint64, count=len(shingles))
+    return _universal_hash(hashes[None, :]).min(axis=1)
+
+
+def _mod_prime(values: np.ndarray) -> np.ndarray:
+    """對小於 2^64 的值取 mod 2^61 - 1（2^61 ≡ 1）。"""
+    values = (values & _PRIME) + (values >> np.uint64(61))
+    return np.where(values >= _PRIME, values - _PRIME, values)
+
+
+def _universal_hash(x: np.ndarray) -> np.ndarray:
+    """
+    對每組 (a, b) 計算 (a * x + b) mod P。
+    a = a_high * 2^32 + a_low：a_low * x < 2^64；a_high * x < 2^61，再乘上 2^32 時利用 2^61 ≡ 1 拆成兩半，每一步都不會溢位。
+    """
+    low = _mod_prime(_A_LOW * x)
+    high = _A_HIGH * x
+    high = _mod_prime((high >> np.uint64(29)) + ((high & _LOW_29) << np.uint64(32)))
+    return _mod_prime(low + high + _B[:, None])
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """兩個指紋估計的 Jaccard 相似度。"""
+    return float(np.mean(a == b))
+
+
+def _band_keys(signature: np.ndarray) -> List[str]:
+    """LSH：將指紋切成 MINHASH_BANDS 段，任一段完全相同的內文才需要比較。"""
+    return [
+        f"{band}:{zlib.crc32(signature[band * _ROWS:(band + 1) * _ROWS].tobytes()):08x}"
+        for band in range(MINHASH_BANDS)
+    ]
+
+
+def similar_pairs(signatures: Sequence[Optional[np.ndarray]], threshold: float = CONTENT_FINGERPRINT_THRESHOLD) -> List[Tuple[int, int]]:
+    """
+    找出一批內文中相似度大於閾值的配對。
+
+    Args:
+        signatures (Sequence[Optional[np.ndarray]]): fingerprint 的結果；None 表示沒有指紋。
+        threshold (float, optional): Jaccard 相似度閾值。預設為 config 中的 CONTENT_FINGERPRINT_THRESHOLD。
+
+    Returns:
+        List[Tuple[int, int]]: (較小索引, 較大索引) 的列表。
+    """
+    buckets: Dict[str, List[int]] = {}
+    for index, signature in enumerate(signatures):
+        if signature is not None:
+            for key in _band_keys(signature):
+                buckets.setdefault(key, []).append(index)
+    candidates = {(a, b) for members in buckets.values() for i, a in enumerate(members) for b in members[i + 1:]}
+    return sorted(pair for pair in candidates if similarity(signatures[pair[0]], signatures[pair[1]]) > threshold)
+
+
+class ContentFingerprintIndex:
+    """
+    跨次執行的內文指紋索引，以 LSH 分段雜湊為鍵，可在 O(1) 時間找出內文幾乎相同的新聞（例如不同標題的同一篇通訊社稿件）。
+    索引常駐記憶體，並寫入 news_memory.json 旁的 JSON 檔；超過 NEWS_MEMORY 天的項目會被淘汰。
+    """
+
+    def __init__(self, filepath: str = CONTENT_FINGERPRINT_FILE, retention_days: int = NEWS_MEMORY):
+        self.filepath = filepath
+        self.retention = retention_days * 24 * 60 * 60
+        self._lock = threading.Lock()
+        self._loaded = False
+        # 正規化 URL -> (指紋, 時間戳)
+        self._docs: Dict[str, Tuple[np.ndarray, float]] = {}
+        # LSH 分段鍵 -> 正規化 URL 集合
+        self._buckets: Dict[str, Set[str]] = {}
+
+    def _add(self, key: str, signature: np.ndarray, ts: float):
+        self._remove(key)
+        self._docs[key] = (signature, ts)
+        for band_key in _band_keys(signature):
+            self._buckets.setdefault(band_key, set()).add(key)
+
+    def _remove(self, key: str):
+        entry = self._docs.pop(key, None)
+        if entry is None:
+            return
+        for band_key in _band_keys(entry[0]):
+            bucket = self._buckets.get(band_key)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band_key]
+
+    def _load(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        data = load_json(self.filepath, default_data={})
+        if not isinstance(data, dict) or data.get("version") != HASH_VERSION:
+            # 舊版雜湊函式產生的指紋無法比較，重新累積
+            return
+        docs = data.get("docs", {})
+        cutoff = time.time() - self.retention
+        for key, entry in docs.items():
+            try:
+                signature = np.array([int(value) for value in entry["signature"]], dtype=np.uint64)
+            except (KeyError, TypeError, ValueError):
+                continue
+            # 設定改變（排列數不同）後舊指紋無法比較
+            if entry.get("ts", 0) >= cutoff and signature.size == MINHASH_PERMUTATIONS:
+                self._add(key, signature, entry["ts"])
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.filepath) or ".", exist_ok=True)
+        docs = {key: {"signature": signature.tolist(), "ts": ts} for key, (signature, ts) in self._docs.items()}
+        save_json(self.filepath, {"version": HASH_VERSION, "docs": docs})
+
+    def find(self, signature: Optional[np.ndarray], threshold: float = CONTENT_FINGERPRINT_THRESHOLD) -> Optional[str]:
+        """
+        查詢內文幾乎相同的已處理新聞。
+
+        Args:
+            signature (Optional[np.ndarray]): fingerprint 的結果。
+            threshold (float, optional): Jaccard 相似度閾值。預設為 config 中的 CONTENT_FINGERPRINT_THRESHOLD。
+
+        Returns:
+            Optional[str]: 最相似新聞的正規化 URL；沒有相似新聞或沒有指紋時回傳 None。
+        """
+        if signature is None:
+            return None
+        with self._lock:
+            self._load()
+            candidates = set()
+            for band_key in _band_keys(signature):
+                candidates.update(self._buckets.get(band_key, ()))
+            best, best_score = None, threshold
+            for key in candidates:
+                score = similarity(signature, self._docs[key][0])
+                if score > best_score:
+                    best, best_score = key, score
+            return best
+
+    def add(self, entries: Iterable[Tuple[str, Optional[np.ndarray]]]):
+        """
+        加入已處理新聞的內文指紋並寫入檔案；沒有指紋的新聞略過。
+
+        Args:
+            entries (Iterable[Tuple[str, Optional[np.ndarray]]]): (新聞連結, 指紋) 的列表。
+        """
+        now = time.time()
+        with self._lock:
+            self._load()
+            added = False
+            for link, signature in entries:
+                if signature is not None and link:
+                    self._add(canonicalize_url(link), signature, now)
+                    added = True
+            if added:
+                self._save()
+
+    def prune(self):
+        """淘汰超過保留期限的項目，並寫回檔案。"""
+        cutoff = time.time() - self.retention
+        with self._lock:
+            self._load()
+            stale = [key for key, (_, ts) in self._docs.items() if ts < cutoff]
+            for key in stale:
+                self._remove(key)
+            if stale:
+                self._save()
+
+
+# 所有新聞來源共用的索引
+content_index = ContentFingerprintIndex()
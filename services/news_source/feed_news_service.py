@@ -0,0 +1,230 @@
+import os
+import calendar
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Iterable, List, Optional
+
+import feedparser
+
+from config.config import DATA_FOLDER, NEWS_MEMORY, FEED_MIN_BODY_CHARS
+from utils.json_utils import load_json, save_json
+from services.news_source.fetch_article_content import fetch_article_contents
+from services.news_source.html_parser import make_soup
+from services.news_source.http_client import http_get
+from services.news_source.seen_index import filter_unseen
+from services.token_budget import trim_to_budget
+
+FEED_STATE_FILE = os.path.join(DATA_FOLDER, "feed_state.json")
+# 每個 Feed 保留的 GUID 數量上限
+MAX_FEED_GUIDS = 500
+
+tz_utc_plus_8 = timezone(timedelta(hours=8))
+_state_lock = threading.Lock()
+
+
+def _load_feed_state(feed_url: str) -> dict:
+    with _state_lock:
+        state = load_json(FEED_STATE_FILE, default_data={})
+    return state.get(feed_url, {}) if isinstance(state, dict) else {}
+
+
+def _save_feed_state(feed_url: str, feed_state: dict):
+    with _state_lock:
+        state = load_json(FEED_STATE_FILE, default_data={})
+        if not isinstance(state, dict):
+            state = {}
+        state[feed_url] = feed_state
+        os.makedirs(DATA_FOLDER, exist_ok=True)
+        save_json(FEED_STATE_FILE, state)
+
+
+def forget_feed_items(links: Iterable[str]):
+    """
+    取消新聞的 GUID 記錄（例如未發文、下次要重新處理的新聞），下次輪詢時會再次取得這些項目。
+    受影響的 Feed 同時清除 ETag / Last-Modified / 更新時間，避免因 Feed 未變更而略過。
+
+    Args:
+        links (Iterable[str]): 新聞抓取時的連結。
+    """
+    links = set(links)
+    with _state_lock:
+        state = load_json(FEED_STATE_FILE, default_data={})
+        if not isinstance(state, dict):
+            return
+        changed = False
+        for feed_state in state.values():
+            guid_links = feed_state.get("links", {})
+            forget = {guid_links.pop(link) for link in links if link in guid_links}
+            if not forget:
+                continue
+            feed_state["guids"] = [guid for guid in feed_state.get("guids", []) if guid not in forget]
+            feed_state.update({"etag": None, "modified": None, "feed_updated": None})
+            changed = True
+        if changed:
+            save_json(FEED_STATE_FILE, state)
+
+
+def _entry_timestamp(entry) -> Optional[float]:
+    parsed = entry.get("updated_parsed") or entry.get("published_parsed")
+    return calendar.timegm(parsed) if parsed else None
+
+
+def _format_published(timestamp: Optional[float]) -> str:
+    if timestamp is None:
+        return "no time"
+    dt = datetime.fromtimestamp(timestamp, tz_utc_plus_8)
+    return dt.strftime("%Y年%m月%d日 %p%I:%M").replace("AM", "上午").replace("PM", "下午")
+
+
+def _entry_body(entry) -> str:
+    """取出 Feed 項目的內文（content 優先，其次 summary），並移除 HTML 標籤。"""
+    html = ""
+    if entry.get("content"):
+        html = entry["content"][0].get("value", "")
+    if not html:
+        html = entry.get("summary", "")
+    if not html:
+        return ""
+    return make_soup(html).get_text("\n", strip=True)
+
+
+def _entry_images(entry) -> List[str]:
+    images = []
+    for media in entry.get("media_content", []) + entry.get("media_thumbnail", []):
+        if media.get("url"):
+            images.append(media["url"])
+    for enclosure in entry.get("enclosures", []):
+        if enclosure.get("type", "").startswith("image/") and enclosure.get("href"):
+            images.append(enclosure["href"])
+    return images
+
+
+def _resolve_link(link: str) -> str:
+    """Google News 的連結是轉址用的編碼網址，嘗試解碼成原始新聞網址。"""
+    if "news.google.com" not in link:
+        return link
+    try:
+        from googlenewsdecoder import gnewsdecoder
+        result = gnewsdecoder(link)
+        if result.get("status"):
+            return result["decoded_url"]
+    except Exception as e:
+        print(f"[feed_news_service] 無法解碼 Google News 連結: {link}, 錯誤: {e}")
+    return link
+
+
+def fetch_feed_news(feed_url: str) -> Optional[List[dict]]:
+    """
+    1) 以條件式 GET 抓取 RSS/Atom Feed（ETag / Last-Modified），未變更就直接結束
+    2) 以 GUID 與更新時間過濾已處理過的項目
+    3) Feed 內文太短時，才抓取文章頁面的 HTML
+    4) 回傳與其他來源相同格式的新聞列表
+
+    Args:
+        feed_url (str): Feed 網址。
+
+    Returns:
+        Optional[List[dict]]: 新聞列表；Feed 無法取得時回傳 None。
+    """
+    feed_state = _load_feed_state(feed_url)
+
+    # 1) 取得 Feed
+    headers = {}
+    if feed_state.get("etag"):
+        headers["If-None-Match"] = feed_state["etag"]
+    if feed_state.get("modified"):
+        headers["If-Modified-Since"] = feed_state["modified"]
+    try:
+        resp = http_get(feed_url, headers=headers)
+        if resp.status_code == 304:
+            print(f"[feed_news_service] Feed 未變更: {feed_url}")
+            return []
+        resp.raise_for_status()
+    except Exception as e:
+        print(f"無法取得 Feed: {feed_url}, 錯誤: {e}")
+        return None
+
+    feed = feedparser.parse(resp.content)
+    feed_updated = feed.feed.get("updated") or feed.feed.get("published")
+    if feed_updated and feed_updated == feed_state.get("feed_updated"):
+        print(f"[feed_news_service] Feed 更新時間未變: {feed_url}")
+        return []
+
+    # 2) 過濾已處理過的項目
+    seen_guids = set(feed_state.get("guids", []))
+    cutoff = time.time() - NEWS_MEMORY * 24 * 60 * 60
+    entries = []
+    for entry in feed.entries:
+        guid = entry.get("id") or entry.get("link")
+        timestamp = _entry_timestamp(entry)
+        if not guid or guid in seen_guids:
+            continue
+        if timestamp is not None and timestamp < cutoff:
+            continue
+        title = entry.get("title", "").strip()
+        link = entry.get("link", "").strip()
+        if title and link:
+            entries.append((guid, timestamp, title, link, entry))
+
+    unseen = set(filter_unseen([(title, link) for _, _, title, link, _ in entries]))
+    # 已處理過的項目直接記下 GUID，下次不再檢查
+    done_guids = [guid for guid, _, title, link, _ in entries if (title, link) not in unseen]
+    entries = [item for item in entries if (item[2], item[3]) in unseen]
+
+    # 3) Feed 沒有內文的項目，才去抓文章頁面
+    items = []
+    need_html = []
+    for guid, timestamp, title, link, entry in entries:
+        body = _entry_body(entry)
+        item = {
+            "title": title,
+            "link": link,
+            "published": _format_published(timestamp),
+            "content": trim_to_budget(body),
+            "images": _entry_images(entry),
+        }
+        if len(body) < FEED_MIN_BODY_CHARS:
+            item["link"] = _resolve_link(link)
+            need_html.append(item)
+        items.append((guid, item))
+
+    articles = fetch_article_contents([item["link"] for item in need_html])
+    for item, article_data in zip(need_html, articles):
+        if article_data["content"]:
+            item["content"] = article_data["content"]
+            item["precleaned"] = article_data.get("precleaned", False)
+        if not item["images"]:
+            item["images"] = article_data["images"]
+
+    # 抓不到內文的項目不記錄 GUID，下次輪詢時再試
+    all_news = [item for _, item in items if item["content"]]
+    done_guids.extend(guid for guid, item in items if item["content"])
+
+    # 4) 更新 Feed 狀態；有項目失敗時不保存驗證資訊，下次才會重新取得完整 Feed
+    complete = all(item["content"] for _, item in items)
+    guids = (feed_state.get("guids", []) + done_guids)[-MAX_FEED_GUIDS:]
+    # 送進管線的新聞記錄連結 -> GUID，未發文時由 forget_feed_items 取消
+    guid_links = {**feed_state.get("links", {}), **{item["link"]: guid for guid, item in items if item["content"]}}
+    kept_guids = set(guids)
+    _save_feed_state(feed_url, {
+        "etag": resp.headers.get("ETag") if complete else None,
+        "modified": resp.headers.get("Last-Modified") if complete else None,
+        "feed_updated": feed_updated if complete else None,
+        "guids": guids,
+        "links": {link: guid for link, guid in guid_links.items() if guid in kept_guids},
+    })
+    return all_news
+
+
+def make_feed_source(feed_url: str) -> Callable[[], Optional[List[dict]]]:
+    """
+    建立可註冊到 news_service 的 Feed 抓取函式。
+
+    Args:
+        feed_url (str): Feed 網址。
+
+    Returns:
+        Callable[[], Optional[List[dict]]]: 無參數的抓取函式。
+    """
+    return lambda: fetch_feed_news(feed_url)
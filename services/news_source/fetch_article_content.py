@@ -1,62 +1,96 @@
 import os
 import json
-import requests
-from bs4 import BeautifulSoup
+from functools import partial
+from typing import List, Optional
 from datetime import datetime
+from urllib.parse import urlsplit
+from services.news_source.http_client import fetch_all
+from services.news_source.http_cache import cached_get
+from services.news_source.html_parser import make_soup, ARTICLE_STRAINER
+from services.news_source.boilerplate import extract_paragraphs, strip_boilerplate, flush_boilerplate_blocklist
+from services.token_budget import trim_to_budget
+
+def _empty_article(url: str = "") -> dict:
+    return {
+        "published": "無發布時間",
+        "content": "",
+        "images": [],
+        "precleaned": False
+    }
+
+def parse_article_html(html: str, source: Optional[str] = None) -> dict:
+    """
+    從文章頁面的 HTML 解析出內文、發佈時間和圖片。
+    內文會先以本機規則移除樣板段落（見 boilerplate.strip_boilerplate）。
+
+    Args:
+        html (str): 文章頁面的 HTML。
+        source (Optional[str], optional): 來源網站（主機名稱），用於學習各網站重複出現的段落。
+
+    Returns:
+        dict: 包含 'published', 'content', 'images' 與 'precleaned'（是否已不需要 GPT 清理）的字典。
+    """
+    soup = make_soup(html, ARTICLE_STRAINER)
+
+    # 簡單示範：抓 <p> 文字 (實際要視該新聞頁的 HTML 結構)
+    content_text, precleaned = strip_boilerplate(extract_paragraphs(soup), source)
+
+    # 嘗試抓取時間
+    time_tag = soup.find("time", class_="caas-attr-meta-time")
+    published_time = time_tag.get_text(strip=True) if time_tag else "no time"
+    if published_time == "no time":
+        time_tag = soup.find("time")
+        published_time = time_tag["datetime"] if time_tag else "no time"
+    if published_time != "no time":
+        try:
+            dt = datetime.strptime(published_time, "%Y-%m-%dT%H:%M:%SZ")
+            published_time = dt.strftime("%Y年%m月%d日 %p%I:%M").replace("AM", "上午").replace("PM", "下午")
+        except ValueError:
+            pass
+
+    # 嘗試抓取圖片
+    images = []
+    meta_tags = soup.find_all("meta", {"property": "og:image"})
+    for meta in meta_tags:
+        image_url = meta.get("content")
+        if image_url and not image_url.endswith(".ico"):
+            images.append(image_url)
+
+    # 依段落裁切到 ARTICLE_TOKEN_BUDGET 個 token 內，避免過長
+    return {
+        "published": published_time,
+        "content": trim_to_budget(content_text),
+        "images": images,
+        "precleaned": precleaned
+    }
 
 def fetch_article_content(url: str) -> dict:
     """
     給定新聞連結，嘗試以 requests + BeautifulSoup 爬取內文與圖片。
+    頁面未變更（HTTP 304）時直接使用快取的解析結果。
     回傳一個包含 'published', 'content' 與 'images' 的字典 (如抓不到則給預設值)。
     """
     try:
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                          "AppleWebKit/537.36 (KHTML, like Gecko) "
-                          "Chrome/89.0.4389.82 Safari/537.36"
-        }
-        resp = requests.get(url, timeout=10, headers=headers, allow_redirects=True)
-        resp.raise_for_status()
-        soup = BeautifulSoup(resp.text, "html.parser")
-
-        # 簡單示範：抓 <p> 文字 (實際要視該新聞頁的 HTML 結構)
-        paragraphs = soup.find_all("p")
-        content_text = "\n".join(p.get_text(strip=True) for p in paragraphs)
-
-        # 嘗試抓取時間
-        time_tag = soup.find("time", class_="caas-attr-meta-time")
-        published_time = time_tag.get_text(strip=True) if time_tag else "no time"
-        if published_time == "no time":
-            time_tag = soup.find("time")
-            published_time = time_tag["datetime"] if time_tag else "no time"
-        if published_time != "no time":
-            try:
-                dt = datetime.strptime(published_time, "%Y-%m-%dT%H:%M:%SZ")
-                published_time = dt.strftime("%Y年%m月%d日 %p%I:%M").replace("AM", "上午").replace("PM", "下午")
-            except ValueError:
-                pass
-        
-
-        # 嘗試抓取圖片
-        images = []
-        meta_tags = soup.find_all("meta", {"property": "og:image"})
-        for meta in meta_tags:
-            image_url = meta.get("content")
-            if image_url and not image_url.endswith(".ico"):
-                images.append(image_url)
-
-        print(f"抓取內文成功: {url}")
-        # 只取前 1000 字，避免過長
-        return {
-            "published": published_time,
-            "content": content_text[:1000],
-            "images": images
-        }
+        parse = partial(parse_article_html, source=urlsplit(url).netloc.lower())
+        article, not_modified = cached_get(url, parse)
+        print(f"抓取內文成功{'（未變更，使用快取）' if not_modified else ''}: {url}")
+        return article
 
     except Exception as e:
         print(f"抓取內文失敗: {url}, 錯誤: {e}")
-        return {
-            "published": "無發布時間",
-            "content": "",
-            "images": []
-        }
\ No newline at end of file
+        return _empty_article(url)
+
+def fetch_article_contents(urls: List[str]) -> List[dict]:
+    """
+    以共用連線池並行抓取多篇文章，結果依 urls 順序回傳。
+    整批抓取時間取決於最慢的一篇，而非所有文章的總和。
+
+    Args:
+        urls (List[str]): 新聞文章的 URL 列表。
+
+    Returns:
+        List[dict]: 與 urls 順序相同、格式同 fetch_article_content 的結果。
+    """
+    articles = fetch_all(urls, fetch_article_content, _empty_article)
+    flush_boilerplate_blocklist()
+    return articles
@@ -1,62 +1,61 @@
-import os
-import json
 from typing import Dict
-import requests
-from bs4 import BeautifulSoup
-from services.news_source.fetch_article_content import fetch_article_content
+from bs4 import SoupStrainer
+from services.news_source.fetch_article_content import fetch_article_contents
+from services.news_source.http_cache import cached_get, flush_http_cache
+from services.news_source.html_parser import make_soup
+from services.news_source.seen_index import filter_unseen
 
 DATA_FOLDER = "data"
-TEMP_NEWS_FILE = os.path.join(DATA_FOLDER, "temp_news.json")
 
 GAMER_NEWS_URL = "https://www.4gamers.com.tw/news"  # 4Gamers新聞首頁
 
+# 新聞標題都在 <h4> 裡，其他部分不需要解析
+HOMEPAGE_STRAINER = SoupStrainer("h4")
+
+def parse_gamer_homepage(html: str) -> list:
+    """
+    解析 4Gamers新聞首頁，取出新聞標題與連結。
+
+    Args:
+        html (str): 首頁 HTML。
+
+    Returns:
+        list: [[標題, 連結], ...]
+    """
+    soup = make_soup(html, HOMEPAGE_STRAINER)
+    entries = []
+    for news_item in soup.select("h4 a"):
+        title = news_item.get_text(strip=True)
+        link = news_item["href"].strip()
+        if not link.startswith("https://"):
+            link = "https://www.4gamers.com.tw" + link
+        entries.append([title, link])
+    return entries
+
 def fetch_gamer_news():
     """
-    1) 從 4Gamers新聞首頁抓取 HTML
+    1) 從 4Gamers新聞首頁抓取 HTML（未變更時直接使用快取的解析結果）
     2) 解析新聞標題與連結
-    3) 針對每個連結，再進一步嘗試抓內文
-    4) 最後將結果輸出到 data/temp_news.json
+    3) 針對所有連結，以共用連線池並行抓取內文
+    4) 回傳新聞列表（由 news_service 統一輸出到 data/temp_news.json）
     """
 
     all_news = []
 
-    # 1) 取得 4Gamers新聞首頁的 HTML
+    # 1)、2) 取得並解析 4Gamers新聞首頁
     try:
-        resp = requests.get(GAMER_NEWS_URL, timeout=10, headers={
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"
-        })
-        resp.raise_for_status()
+        news_items, _ = cached_get(GAMER_NEWS_URL, parse_gamer_homepage)
     except Exception as e:
         print(f"無法取得 4Gamers新聞首頁: {e}")
         return
 
-    # 2) 解析 HTML，找出新聞列表
-    soup = BeautifulSoup(resp.text, "html.parser")
-    news_items = soup.select("div h4 a")
-    # Load existing news memory
-    news_memory_file = os.path.join(DATA_FOLDER, "news_memory.json")
-    try:
-        with open(news_memory_file, "r", encoding="utf-8") as f:
-            news_memory = json.load(f)
-    except FileNotFoundError:
-        news_memory = []
-
-    if not isinstance(news_memory, list):
-        news_memory = []
+    # 已處理過的新聞（連結或標題相同）不再抓取
+    candidates = filter_unseen(news_items)
 
-    existing_titles = {news["title"] for news in news_memory}
+    # 3) 並行抓取內文
+    articles = fetch_article_contents([link for _, link in candidates])
 
-    for news_item in news_items:
-        title = news_item.get_text(strip=True)
-        # Filter out news that are already in memory
-        if title in existing_titles:
-            continue
-        link = news_item["href"].strip()
-        if not link.startswith("https://"):
-            link = "https://www.4gamers.com.tw" + link
-
-        # 3) 嘗試抓取內文
-        article_data = fetch_article_content(link)
+    for (title, link), article_data in zip(candidates, articles):
         if article_data["content"] == "":
             continue
         published_time = article_data["published"]
@@ -68,13 +67,10 @@ def fetch_gamer_news():
             "link": link,
             "published": published_time,
             "content": content_text,
-            "images": images
+            "images": images,
+            "precleaned": article_data.get("precleaned", False)
         }
         all_news.append(news_item)
+    flush_http_cache()
 
-    # 4) 輸出 JSON
-    os.makedirs(DATA_FOLDER, exist_ok=True)
-    with open(TEMP_NEWS_FILE, "w", encoding="utf-8") as f:
-        json.dump(all_news, f, ensure_ascii=False, indent=2)
     return all_news
-
@@ -0,0 +1,59 @@
+# services/news_source/html_parser.py
+from typing import Optional
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+from config.config import HTML_PARSER, HTML_TARGETED_PARSING
+
+try:
+    import lxml  # noqa: F401
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+
+def resolve_parser(parser: Optional[str] = None) -> str:
+    """
+    決定 BeautifulSoup 使用的解析器。
+    "auto" 時優先使用 lxml（C 實作，速度快很多），未安裝則退回 html.parser。
+
+    Args:
+        parser (Optional[str], optional): "auto"、"lxml" 或 "html.parser"。預設為 config 中的 HTML_PARSER。
+
+    Returns:
+        str: 實際使用的解析器名稱。
+    """
+    parser = parser or HTML_PARSER
+    if parser == "auto":
+        return "lxml" if LXML_AVAILABLE else "html.parser"
+    if parser == "lxml" and not LXML_AVAILABLE:
+        return "html.parser"
+    return parser
+
+
+def make_soup(html: str, parse_only: Optional[SoupStrainer] = None, parser: Optional[str] = None) -> BeautifulSoup:
+    """
+    建立 BeautifulSoup 物件。
+    啟用 HTML_TARGETED_PARSING 時，只保留 parse_only 指定的標籤，其餘部分不建立節點。
+
+    Args:
+        html (str): 要解析的 HTML。
+        parse_only (Optional[SoupStrainer], optional): 只解析符合的標籤。
+        parser (Optional[str], optional): 解析器，見 resolve_parser。
+
+    Returns:
+        BeautifulSoup: 解析結果。
+    """
+    if not HTML_TARGETED_PARSING:
+        parse_only = None
+    return BeautifulSoup(html, resolve_parser(parser), parse_only=parse_only)
+
+
+def _is_article_tag(name, attrs) -> bool:
+    if name in ("p", "time"):
+        return True
+    return name == "meta" and attrs.get("property") == "og:image"
+
+
+# 一般新聞文章頁只需要 <p> 內文、<time> 與 og:image
+ARTICLE_STRAINER = SoupStrainer(_is_article_tag)
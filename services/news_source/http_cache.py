@@ -0,0 +1,142 @@
+# services/news_source/http_cache.py
+import copy
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Tuple
+
+from config.config import HTTP_CACHE_FILE, HTTP_CACHE_MAX_BYTES, HTTP_CACHE_MAX_AGE
+from services.news_source.http_client import http_get
+from services.news_source.seen_index import seen_index
+from utils.json_utils import load_json, save_json
+
+_lock = threading.Lock()
+_entries: Dict[str, Dict[str, Any]] = {}
+_stats = {"hits": 0, "misses": 0, "bytes_saved": 0, "parse_seconds_saved": 0.0}
+_loaded = False
+_dirty = False
+
+
+def _ensure_loaded():
+    global _loaded, _entries
+    if _loaded:
+        return
+    data = load_json(HTTP_CACHE_FILE, default_data={})
+    _entries = data.get("entries", {}) if isinstance(data, dict) else {}
+    _loaded = True
+
+
+def _evict(now: float):
+    """淘汰過期項目，並在總容量超過上限時依最後使用時間淘汰最舊的項目。"""
+    for url in [url for url, entry in _entries.items() if now - entry["validated_at"] > HTTP_CACHE_MAX_AGE]:
+        del _entries[url]
+
+    total = sum(entry["size"] for entry in _entries.values())
+    if total <= HTTP_CACHE_MAX_BYTES:
+        return
+    for url in sorted(_entries, key=lambda u: _entries[u]["validated_at"]):
+        total -= _entries[url]["size"]
+        del _entries[url]
+        if total <= HTTP_CACHE_MAX_BYTES:
+            break
+
+
+def cached_get(url: str, parse: Callable[[str], Any]) -> Tuple[Any, bool]:
+    """
+    以條件式 GET 抓取 URL，並快取解析後的結果。
+    - 若先前回應帶有 ETag / Last-Modified，會送出 If-None-Match / If-Modified-Since
+    - 伺服器回應 304 時直接回傳快取的解析結果，完全不經過 BeautifulSoup
+    - 其他情況下以 parse 解析回應內容，並在伺服器提供驗證標頭時存入快取
+
+    Args:
+        url (str): 目標 URL。
+        parse (Callable[[str], Any]): 將 HTML 轉為可序列化成 JSON 的結果的函式。
+
+    Returns:
+        Tuple[Any, bool]: (解析結果, 是否為 304 快取命中)。
+
+    Raises:
+        requests.RequestException: 請求失敗或非 2xx/304 回應時。
+    """
+    global _dirty
+    with _lock:
+        _ensure_loaded()
+        entry = _entries.get(url)
+
+    headers = {}
+    if entry:
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+    resp = http_get(url, headers=headers)
+    if resp.history:
+        seen_index.record_redirect(url, resp.url)
+
+    if resp.status_code == 304 and entry:
+        with _lock:
+            entry["validated_at"] = time.time()
+            _stats["hits"] += 1
+            _stats["bytes_saved"] += entry.get("body_size", 0)
+            _stats["parse_seconds_saved"] += entry.get("parse_seconds", 0.0)
+            _dirty = True
+        return copy.deepcopy(entry["parsed"]), True
+
+    resp.raise_for_status()
+    started = time.perf_counter()
+    parsed = parse(resp.text)
+    parse_seconds = time.perf_counter() - started
+
+    etag = resp.headers.get("ETag")
+    last_modified = resp.headers.get("Last-Modified")
+    with _lock:
+        _stats["misses"] += 1
+        if etag or last_modified:
+            now = time.time()
+            _entries[url] = {
+                "etag": etag,
+                "last_modified": last_modified,
+                "validated_at": now,
+                "body_size": len(resp.content),
+                "parse_seconds": parse_seconds,
+                "size": len(json.dumps(parsed, ensure_ascii=False).encode("utf-8")),
+                "parsed": copy.deepcopy(parsed),
+            }
+            _evict(now)
+            _dirty = True
+        elif url in _entries:
+            # 伺服器不再提供驗證標頭，舊的快取已無法使用
+            del _entries[url]
+            _dirty = True
+    return parsed, False
+
+
+def get_cache_stats() -> Dict[str, Any]:
+    """
+    取得 HTTP 快取的統計數據。
+
+    Returns:
+        Dict[str, Any]: 包含 hits、misses、bytes_saved、parse_seconds_saved 與 entries 的字典。
+    """
+    with _lock:
+        return {**_stats, "entries": len(_entries)}
+
+
+def flush_http_cache():
+    """將 HTTP 快取寫回 data/ 下的快取檔，並印出本次統計。"""
+    global _dirty
+    with _lock:
+        if not _loaded or not _dirty:
+            return
+        _evict(time.time())
+        os.makedirs(os.path.dirname(HTTP_CACHE_FILE), exist_ok=True)
+        save_json(HTTP_CACHE_FILE, {"entries": _entries})
+        _dirty = False
+        stats = {**_stats, "entries": len(_entries)}
+    print(
+        f"[http_cache] 命中 {stats['hits']} / 未命中 {stats['misses']}，"
+        f"節省 {stats['bytes_saved'] / 1024:.1f} KB 下載與 {stats['parse_seconds_saved']:.2f} 秒解析，"
+        f"目前共 {stats['entries']} 筆快取。"
+    )
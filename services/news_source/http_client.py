@@ -0,0 +1,270 @@
+# services/news_source/http_client.py
+import email.utils
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, TypeVar
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config.config import (
+    HTTP_POOL_SIZE,
+    HTTP_MAX_WORKERS,
+    HTTP_PER_HOST_LIMIT,
+    HTTP_TIMEOUT,
+    HTTP_FETCH_DEADLINE,
+    HTTP_RATE_PER_HOST,
+    HTTP_BURST_PER_HOST,
+    HTTP_MAX_RETRIES,
+    HTTP_BACKOFF_BASE,
+    HTTP_MAX_BACKOFF,
+)
+
+T = TypeVar("T")
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+                  "AppleWebKit/537.36 (KHTML, like Gecko) "
+                  "Chrome/89.0.4389.82 Safari/537.36"
+}
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+_host_semaphores: Dict[str, threading.BoundedSemaphore] = {}
+_host_lock = threading.Lock()
+
+# 可重試的狀態碼
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """
+    Token bucket 限流器：每秒補充 rate 個 token，最多累積 burst 個。
+    每個請求取用一個 token，沒有 token 時等待。
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        # 伺服器要求暫停（Retry-After）時，在此時間點之前不發出請求
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                wait_seconds = max(0.0, self._paused_until - now)
+                if wait_seconds == 0 and self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                if wait_seconds == 0:
+                    wait_seconds = (1 - self._tokens) / self.rate
+            time.sleep(wait_seconds)
+
+    def pause(self, seconds: float):
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+_host_buckets: Dict[str, TokenBucket] = {}
+# 每個主機的統計：requests、successes、failures、retries、latency（成功請求的總耗時）
+_host_stats: Dict[str, Dict[str, float]] = {}
+
+
+def get_session() -> requests.Session:
+    """
+    取得所有新聞來源共用的 requests.Session。
+    Session 內建 keep-alive 連線池，同一主機的請求可重複使用 TCP/TLS 連線。
+
+    Returns:
+        requests.Session: 共用的 Session。
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers.update(DEFAULT_HEADERS)
+            _session = session
+        return _session
+
+
+def _host(url: str) -> str:
+    return urlsplit(url).netloc.lower()
+
+
+def _host_bucket(host: str) -> TokenBucket:
+    with _host_lock:
+        if host not in _host_buckets:
+            _host_buckets[host] = TokenBucket(HTTP_RATE_PER_HOST, HTTP_BURST_PER_HOST)
+            _host_stats[host] = {"requests": 0, "successes": 0, "failures": 0, "retries": 0, "latency": 0.0}
+        return _host_buckets[host]
+
+
+def _record(host: str, key: str, latency: float = 0.0):
+    with _host_lock:
+        stats = _host_stats[host]
+        stats[key] += 1
+        stats["latency"] += latency
+
+
+def _retry_after_seconds(resp: requests.Response) -> Optional[float]:
+    """解析 Retry-After 標頭（秒數或 HTTP 日期）。"""
+    value = resp.headers.get("Retry-After")
+    if not value:
+        return None
+    if value.strip().isdigit():
+        return float(value)
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _backoff_seconds(attempt: int) -> float:
+    """第 attempt 次重試前的等待秒數：指數退避加上隨機抖動。"""
+    delay = min(HTTP_MAX_BACKOFF, HTTP_BACKOFF_BASE * (2 ** attempt))
+    return delay * random.uniform(0.5, 1.0)
+
+
+def http_get(url: str, timeout: float = HTTP_TIMEOUT, **kwargs) -> requests.Response:
+    """
+    透過共用 Session 發出 GET 請求。
+    - 每個主機以 token bucket 限制請求速率（HTTP_RATE_PER_HOST / HTTP_BURST_PER_HOST）
+    - 逾時、連線錯誤、429 與 5xx 會以指數退避加抖動重試，最多 HTTP_MAX_RETRIES 次
+    - 回應帶有 Retry-After 時，依其指示暫停該主機的所有請求
+
+    Args:
+        url (str): 目標 URL。
+        timeout (float, optional): 逾時秒數。預設為 config 中的 HTTP_TIMEOUT。
+
+    Returns:
+        requests.Response: 回應物件（重試用盡時為最後一次的回應）。
+
+    Raises:
+        requests.RequestException: 重試用盡仍無法連線時。
+    """
+    kwargs.setdefault("allow_redirects", True)
+    host = _host(url)
+    bucket = _host_bucket(host)
+
+    for attempt in range(HTTP_MAX_RETRIES + 1):
+        bucket.acquire()
+        _record(host, "requests")
+        started = time.monotonic()
+        try:
+            resp = get_session().get(url, timeout=timeout, **kwargs)
+        except (requests.Timeout, requests.ConnectionError) as e:
+            if attempt == HTTP_MAX_RETRIES:
+                _record(host, "failures")
+                raise
+            delay = _backoff_seconds(attempt)
+            print(f"[http_client] {host} 連線失敗（{type(e).__name__}），{delay:.1f} 秒後重試: {url}")
+        else:
+            if resp.status_code not in RETRY_STATUS_CODES:
+                _record(host, "successes", time.monotonic() - started)
+                return resp
+            if attempt == HTTP_MAX_RETRIES:
+                _record(host, "failures")
+                return resp
+            retry_after = _retry_after_seconds(resp)
+            if retry_after is not None:
+                delay = min(HTTP_MAX_BACKOFF, retry_after)
+                bucket.pause(delay)
+            else:
+                delay = _backoff_seconds(attempt)
+            print(f"[http_client] {host} 回應 {resp.status_code}，{delay:.1f} 秒後重試: {url}")
+        _record(host, "retries")
+        time.sleep(delay)
+
+
+def get_host_stats() -> Dict[str, Dict[str, float]]:
+    """
+    取得每個主機的請求統計。
+
+    Returns:
+        Dict[str, Dict[str, float]]: {主機: {"requests", "successes", "failures", "retries",
+            "success_rate", "avg_latency"}}
+    """
+    with _host_lock:
+        result = {}
+        for host, stats in _host_stats.items():
+            finished = stats["successes"] + stats["failures"]
+            result[host] = {
+                **stats,
+                "success_rate": stats["successes"] / finished if finished else 0.0,
+                "avg_latency": stats["latency"] / stats["successes"] if stats["successes"] else 0.0,
+            }
+        return result
+
+
+def _host_semaphore(url: str) -> threading.BoundedSemaphore:
+    host = _host(url)
+    with _host_lock:
+        if host not in _host_semaphores:
+            _host_semaphores[host] = threading.BoundedSemaphore(HTTP_PER_HOST_LIMIT)
+        return _host_semaphores[host]
+
+
+def fetch_all(
+    urls: List[str],
+    fetch_one: Callable[[str], T],
+    default: Callable[[str], T],
+    max_workers: int = HTTP_MAX_WORKERS,
+    deadline: float = HTTP_FETCH_DEADLINE,
+) -> List[T]:
+    """
+    以有界並行的方式對多個 URL 執行 fetch_one，並依輸入順序回傳結果。
+    - 全部來源共用同一組「每主機」連線上限（HTTP_PER_HOST_LIMIT）
+    - 整批超過 deadline 秒仍未完成者，以 default(url) 取代
+    - fetch_one 拋出例外時，同樣以 default(url) 取代
+
+    Args:
+        urls (List[str]): 要抓取的 URL 列表。
+        fetch_one (Callable[[str], T]): 抓取單一 URL 的函式。
+        default (Callable[[str], T]): 失敗或逾時時的預設結果。
+        max_workers (int, optional): 最大執行緒數。
+        deadline (float, optional): 整批抓取的總期限（秒）。
+
+    Returns:
+        List[T]: 與 urls 順序相同的結果列表。
+    """
+    if not urls:
+        return []
+
+    start = time.monotonic()
+
+    def worker(url: str) -> T:
+        with _host_semaphore(url):
+            # 排隊等待期間已超過期限，就不再發出請求
+            if time.monotonic() - start >= deadline:
+                return default(url)
+            return fetch_one(url)
+
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(urls))))
+    futures = [executor.submit(worker, url) for url in urls]
+    done, not_done = wait(futures, timeout=deadline)
+    if not_done:
+        print(f"[http_client] {len(not_done)} 個請求超過 {deadline} 秒期限，視為抓取失敗。")
+    executor.shutdown(wait=False, cancel_futures=True)
+
+    results = []
+    for url, future in zip(urls, futures):
+        if future in done and future.exception() is None:
+            results.append(future.result())
+        else:
+            if future in done:
+                print(f"[http_client] 抓取失敗: {url}, 錯誤: {future.exception()}")
+            results.append(default(url))
+    return results
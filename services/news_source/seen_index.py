@@ -0,0 +1,298 @@
+# services/news_source/seen_index.py
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+from typing import Dict, Iterable, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from config.config import DATA_FOLDER, NEWS_MEMORY
+from utils.json_utils import load_json
+
+SEEN_INDEX_FILE = os.path.join(DATA_FOLDER, "seen_index.jsonl")
+NEWS_MEMORY_FILE = os.path.join(DATA_FOLDER, "news_memory.json")
+
+# 已知的追蹤用查詢參數，與文章內容無關
+# ref、src 這類通用名稱在部分網站是實際的內容或路由參數，不列入，避免不同文章被當成同一篇
+TRACKING_PARAMS = {
+    "fbclid", "gclid", "yclid", "dclid", "igshid", "mc_cid", "mc_eid",
+    "ref_src", "soc_src", "soc_trk", "ncid", "_ga", "_gl",
+    "guccounter", "guce_referrer", "guce_referrer_sig", "ocid", "cmpid",
+}
+TRACKING_PREFIXES = ("utm_",)
+
+_PUNCTUATION_RE = re.compile(r"[\W_]+", re.UNICODE)
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    將 URL 正規化，讓同一篇文章的不同連結對應到同一個鍵。
+    - scheme 與主機名稱轉小寫，移除預設 port 與 #fragment
+    - 移除追蹤參數（utm_*、fbclid 等），其餘參數依名稱排序
+    - 移除路徑結尾的斜線
+
+    Args:
+        url (str): 原始 URL。
+
+    Returns:
+        str: 正規化後的 URL。
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower() or "https"
+    host = (parts.hostname or "").lower()
+    if parts.port and not ((scheme == "https" and parts.port == 443) or (scheme == "http" and parts.port == 80)):
+        host = f"{host}:{parts.port}"
+    path = parts.path.rstrip("/") or "/"
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)
+    )
+    return urlunsplit((scheme, host, path, urlencode(query), ""))
+
+
+def title_hash(title: str) -> str:
+    """
+    計算標題的雜湊值；忽略全形/半形、大小寫、空白與標點差異。
+
+    Args:
+        title (str): 新聞標題。
+
+    Returns:
+        str: 標題雜湊值。
+    """
+    normalized = _PUNCTUATION_RE.sub("", unicodedata.normalize("NFKC", title).lower())
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:16]
+
+
+class SeenIndex:
+    """
+    已處理新聞的索引，以正規化 URL 與標題雜湊為鍵。
+    索引常駐記憶體，每次異動都以 JSON Lines 附加寫入檔案；超過 NEWS_MEMORY 天的項目會被淘汰。
+    """
+
+    def __init__(self, filepath: str = SEEN_INDEX_FILE, retention_days: int = NEWS_MEMORY):
+        self.filepath = filepath
+        self.retention = retention_days * 24 * 60 * 60
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._urls: Dict[str, float] = {}
+        self._titles: Dict[str, float] = {}
+        # 轉址前的正規化 URL -> 轉址後的正規化 URL
+        self._aliases: Dict[str, str] = {}
+        self._alias_ts: Dict[str, float] = {}
+
+    def _tables(self):
+        return {"url": self._urls, "title": self._titles}
+
+    def _load(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        if not os.path.exists(self.filepath):
+            self._bootstrap_from_memory()
+            return
+
+        now = time.time()
+        lines = 0
+        try:
+            with open(self.filepath, "r", encoding="utf-8") as f:
+                for line in f:
+                    lines += 1
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    if now - record.get("ts", 0) > self.retention:
+                        continue
+                    if record["type"] == "alias":
+                        self._aliases[record["key"]] = record["value"]
+                        self._alias_ts[record["key"]] = record["ts"]
+                    else:
+                        self._tables()[record["type"]][record["key"]] = record["ts"]
+        except Exception as e:
+            print(f"[seen_index] 讀取 {self.filepath} 發生錯誤: {e}")
+            return
+
+        live = len(self._urls) + len(self._titles) + len(self._aliases)
+        if lines > 2 * live + 100:
+            self._compact()
+
+    def _bootstrap_from_memory(self):
+        """第一次使用時，從 news_memory.json 匯入既有的新聞，避免重複抓取。"""
+        news_memory = load_json(NEWS_MEMORY_FILE, default_data=[])
+        if not isinstance(news_memory, list):
+            return
+        now = time.time()
+        for news in news_memory:
+            for link in str(news.get("link", "")).split("\n"):
+                if link:
+                    self._urls[canonicalize_url(link)] = now
+            for title in str(news.get("title", "")).split("\n"):
+                if title:
+                    self._titles[title_hash(title)] = now
+        self._compact()
+
+    def _compact(self):
+        """以目前仍有效的項目重寫索引檔。"""
+        try:
+            os.makedirs(os.path.dirname(self.filepath) or ".", exist_ok=True)
+            with open(self.filepath, "w", encoding="utf-8") as f:
+                for record_type, table in self._tables().items():
+                    for key, ts in table.items():
+                        f.write(json.dumps({"type": record_type, "key": key, "ts": ts}, ensure_ascii=False) + "\n")
+                for key, value in self._aliases.items():
+                    record = {"type": "alias", "key": key, "value": value, "ts": self._alias_ts[key]}
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        except Exception as e:
+            print(f"[seen_index] 寫入 {self.filepath} 發生錯誤: {e}")
+
+    def _append(self, records):
+        try:
+            os.makedirs(os.path.dirname(self.filepath) or ".", exist_ok=True)
+            with open(self.filepath, "a", encoding="utf-8") as f:
+                for record in records:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        except Exception as e:
+            print(f"[seen_index] 寫入 {self.filepath} 發生錯誤: {e}")
+
+    def _resolve(self, url: str) -> str:
+        canonical = canonicalize_url(url)
+        return self._aliases.get(canonical, canonical)
+
+    def resolve(self, url: str) -> str:
+        """
+        取得 URL 的正規化鍵（已知的轉址會對應到最終網址）。
+
+        Args:
+            url (str): 原始 URL。
+
+        Returns:
+            str: 正規化後的 URL。
+        """
+        with self._lock:
+            self._load()
+            return self._resolve(url)
+
+    def is_seen(self, url: Optional[str] = None, title: Optional[str] = None) -> bool:
+        """
+        檢查新聞是否已經處理過（URL 或標題任一符合即視為已處理）。
+
+        Args:
+            url (Optional[str], optional): 新聞連結。
+            title (Optional[str], optional): 新聞標題。
+
+        Returns:
+            bool: 已處理過回傳 True。
+        """
+        with self._lock:
+            self._load()
+            if url and self._resolve(url) in self._urls:
+                return True
+            return bool(title) and title_hash(title) in self._titles
+
+    def mark(self, news_items: Iterable[dict]):
+        """
+        將新聞標記為已處理，並附加寫入索引檔。
+        合併過的新聞（以換行分隔的多個 link / title）會逐一標記。
+
+        Args:
+            news_items (Iterable[dict]): 含 'link' 與 'title' 的新聞列表。
+        """
+        now = time.time()
+        records = []
+        with self._lock:
+            self._load()
+            for news in news_items:
+                for link in str(news.get("link", "")).split("\n"):
+                    if link:
+                        key = self._resolve(link)
+                        self._urls[key] = now
+                        records.append({"type": "url", "key": key, "ts": now})
+                for title in str(news.get("title", "")).split("\n"):
+                    if title:
+                        key = title_hash(title)
+                        self._titles[key] = now
+                        records.append({"type": "title", "key": key, "ts": now})
+            self._append(records)
+
+    def forget(self, news_items: Iterable[dict]):
+        """
+        取消新聞的已處理標記（例如 OpenAI 無法使用而未發文），下次執行時會重新抓取。
+
+        Args:
+            news_items (Iterable[dict]): 含 'link' 與 'title' 的新聞列表。
+        """
+        with self._lock:
+            self._load()
+            for news in news_items:
+                for link in str(news.get("link", "")).split("\n"):
+                    if link:
+                        self._urls.pop(self._resolve(link), None)
+                for title in str(news.get("title", "")).split("\n"):
+                    if title:
+                        self._titles.pop(title_hash(title), None)
+            self._compact()
+
+    def record_redirect(self, url: str, final_url: str):
+        """
+        記錄轉址關係，之後遇到原始 URL 時會以最終網址判斷是否處理過。
+
+        Args:
+            url (str): 原始 URL。
+            final_url (str): 轉址後的 URL。
+        """
+        source, target = canonicalize_url(url), canonicalize_url(final_url)
+        if source == target:
+            return
+        with self._lock:
+            self._load()
+            if self._aliases.get(source) == target:
+                return
+            now = time.time()
+            self._aliases[source] = target
+            self._alias_ts[source] = now
+            self._append([{"type": "alias", "key": source, "value": target, "ts": now}])
+
+    def prune(self):
+        """淘汰超過保留期限的項目，並重寫索引檔。"""
+        cutoff = time.time() - self.retention
+        with self._lock:
+            self._load()
+            for table in self._tables().values():
+                for key in [key for key, ts in table.items() if ts < cutoff]:
+                    del table[key]
+            for key in [key for key, ts in self._alias_ts.items() if ts < cutoff]:
+                del self._aliases[key]
+                del self._alias_ts[key]
+            self._compact()
+
+
+# 所有新聞來源共用的索引
+seen_index = SeenIndex()
+
+
+def filter_unseen(candidates: Iterable) -> list:
+    """
+    在抓取內文之前，過濾掉已處理過的新聞，以及同一批中重複的連結/標題。
+
+    Args:
+        candidates (Iterable): (標題, 連結) 的列表。
+
+    Returns:
+        list: 尚未處理過的 (標題, 連結) 列表，保持原順序。
+    """
+    unseen = []
+    batch_urls = set()
+    batch_titles = set()
+    for title, link in candidates:
+        url_key = seen_index.resolve(link)
+        title_key = title_hash(title)
+        if url_key in batch_urls or title_key in batch_titles or seen_index.is_seen(link, title):
+            continue
+        batch_urls.add(url_key)
+        batch_titles.add(title_key)
+        unseen.append((title, link))
+    return unseen
@@ -1,109 +1,99 @@
-import os
-import json
-import requests
-from bs4 import BeautifulSoup
-from services.news_source.fetch_article_content import fetch_article_content
+from bs4 import SoupStrainer
+from services.news_source.fetch_article_content import fetch_article_contents
+from services.news_source.http_cache import cached_get, flush_http_cache
+from services.news_source.html_parser import make_soup
+from services.news_source.seen_index import filter_unseen
 
 DATA_FOLDER = "data"
-TEMP_NEWS_FILE = os.path.join(DATA_FOLDER, "temp_news.json")
 
 YAHOO_NEWS_URL = "https://tw.news.yahoo.com"  # Yahoo奇摩新聞首頁
 
-def fetch_yahoo_news():
-    """
-    1) 從 Yahoo奇摩新聞首頁抓取 HTML
-    2) 解析新聞標題與連結
-    3) 針對每個連結，再進一步嘗試抓內文
-    4) 最後將結果輸出到 data/temp_news.json
-    """
-
-    all_news = []
-
-    # 1) 取得 Yahoo 新聞首頁的 HTML
-    try:
-        resp = requests.get(YAHOO_NEWS_URL, timeout=10, headers={
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"
-        })
-        resp.raise_for_status()
-    except Exception as e:
-        print(f"無法取得 Yahoo新聞首頁: {e}")
-        return
+# 首頁的新聞都在 <li> 裡，其他部分不需要解析
+HOMEPAGE_STRAINER = SoupStrainer("li")
 
-    # 2) 解析 HTML，找出新聞列表
-    soup = BeautifulSoup(resp.text, "html.parser")
-    hot_tags = soup.select("li._yb_1y70zwh._yb_su6olx a")
-    # Load existing news memory
-    news_memory_file = os.path.join(DATA_FOLDER, "news_memory.json")
-    try:
-        with open(news_memory_file, "r", encoding="utf-8") as f:
-            news_memory = json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        news_memory = []
+def parse_yahoo_homepage(html: str) -> dict:
+    """
+    解析 Yahoo奇摩新聞首頁，取出熱門新聞與列表新聞的標題與連結。
 
-    if not isinstance(news_memory, list):
-        news_memory = []
+    Args:
+        html (str): 首頁 HTML。
 
-    # Extract titles from news memory for filtering
-    existing_titles = {news["title"] for news in news_memory}
+    Returns:
+        dict: {"hot": [[標題, 連結], ...], "li": [[標題, 連結], ...]}
+    """
+    soup = make_soup(html, HOMEPAGE_STRAINER)
 
-    for a_tag in hot_tags:
+    hot = []
+    for a_tag in soup.select("li._yb_1y70zwh._yb_su6olx a"):
         title_div = a_tag.find("div", class_="_yb_3cjtcc")
         title = title_div.get_text(strip=True) if title_div else None
-        if not title or title in existing_titles:
+        if not title:
             continue
         link = a_tag["href"].strip()
         if link.startswith("/"):
             link = YAHOO_NEWS_URL + link
-        hot_data = fetch_article_content(link)
-        if hot_data["content"] == "":
-            continue
-        all_news.append({
-            "title": title,
-            "link": link,
-            "published": hot_data["published"],
-            "content": hot_data["content"],
-            "images": hot_data["images"]
-        })
+        hot.append([title, link])
 
     # 這裡根據你提供的原始碼，新聞似乎出現在 <li class="Pos(r) Lh(1.5) H(24px) Mb(8px)"> 裡
     # 你可視需要擴大/縮小範圍，或使用其他選擇器
     li_tags = soup.select("li.Pos\\(r\\).Lh\\(1\\.5\\).H\\(24px\\).Mb\\(8px\\)")
 
-    # 3) 逐一擷取 <a> 標籤內的標題、連結
+    # 逐一擷取 <a> 標籤內的標題、連結
+    listed = []
     for li in li_tags:
         a_tag = li.find("a", href=True)
         if not a_tag:
             continue
 
         title = a_tag.get_text(strip=True)
-        
-        if not title or title in existing_titles:
+        if not title:
             continue
-        
+
         link = a_tag["href"].strip()
 
         # 若連結是相對路徑，補上 https://tw.news.yahoo.com
         if link.startswith("/"):
             link = YAHOO_NEWS_URL + link
+        listed.append([title, link])
+
+    return {"hot": hot, "li": listed}
+
+def fetch_yahoo_news():
+    """
+    1) 從 Yahoo奇摩新聞首頁抓取 HTML（未變更時直接使用快取的解析結果）
+    2) 解析新聞標題與連結
+    3) 針對所有連結，以共用連線池並行抓取內文
+    4) 回傳新聞列表（由 news_service 統一輸出到 data/temp_news.json）
+    """
+
+    all_news = []
+
+    # 1)、2) 取得並解析 Yahoo 新聞首頁
+    try:
+        homepage, _ = cached_get(YAHOO_NEWS_URL, parse_yahoo_homepage)
+    except Exception as e:
+        print(f"無法取得 Yahoo新聞首頁: {e}")
+        return
+
+    # 已處理過的新聞（連結或標題相同）與熱門/列表間重複的新聞不再抓取
+    candidates = filter_unseen(homepage["hot"] + homepage["li"])
+    hot_links = {link for _, link in homepage["hot"]}
 
-        # 嘗試抓取內文（只呼叫一次）
-        article_data = fetch_article_content(link)
-        published_time = article_data["published"]
-        content_text = article_data["content"]
-        images = article_data["images"]
+    # 3) 一次並行抓取所有內文（每個連結只呼叫一次）
+    articles = fetch_article_contents([link for _, link in candidates])
 
-        news_item = {
+    for (title, link), article_data in zip(candidates, articles):
+        # 熱門新聞：抓不到內文的會被略過
+        if link in hot_links and article_data["content"] == "":
+            continue
+        all_news.append({
             "title": title,
             "link": link,
-            "published": published_time,
-            "content": content_text,
-            "images": images
-        }
-        all_news.append(news_item)
-
-    # 4) 輸出 JSON
-    os.makedirs(DATA_FOLDER, exist_ok=True)
-    with open(TEMP_NEWS_FILE, "w", encoding="utf-8") as f:
-        json.dump(all_news, f, ensure_ascii=False, indent=2)
-    return all_news
+            "published": article_data["published"],
+            "content": article_data["content"],
+            "images": article_data["images"],
+            "precleaned": article_data.get("precleaned", False)
+        })
+    flush_http_cache()
 
+    return all_news
@@ -0,0 +1,229 @@
+# services/openai_batch_service.py
+import asyncio
+import copy
+import json
+import os
+import time
+from typing import Dict, List, Set
+
+from config.config import DATA_FOLDER
+from utils.json_utils import load_json, save_json
+from services import gpt_cache
+from services.openai_client import async_openai_client
+from services.openai_gpt_processing_service import (
+    MODEL,
+    _generate_new_content_messages,
+    _generate_summary_as_critic_messages,
+    generate_new_content_async,
+    generate_summary_as_critic_async,
+)
+from services.forum_post_service import process_forum_posts, load_forum_history
+
+BATCH_JOBS_FILE = os.path.join(DATA_FOLDER, "batch_jobs.json")
+BATCH_INPUT_FOLDER = os.path.join(DATA_FOLDER, "batches")
+# Batch 工作已結束（不會再有新結果）的狀態
+FINISHED_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+# 同一時間只允許一個協程讀寫 batch_jobs.json；發文期間不持有，避免阻塞建立新工作
+_jobs_lock = asyncio.Lock()
+# 同一時間只允許一次 resume_batches，避免同一個工作被發文兩次
+_resume_lock = asyncio.Lock()
+
+
+def _load_jobs() -> List[dict]:
+    jobs = load_json(BATCH_JOBS_FILE, default_data=[])
+    return jobs if isinstance(jobs, list) else []
+
+
+def _save_jobs(jobs: List[dict]):
+    os.makedirs(DATA_FOLDER, exist_ok=True)
+    save_json(BATCH_JOBS_FILE, jobs)
+
+
+def _batch_requests(items: List[Dict]) -> List[dict]:
+    """每則新聞產生「新內文」與「評論」兩個請求；評論以清理後內文產生，兩者可同時處理。"""
+    requests = []
+    for index, item in enumerate(items):
+        for kind, messages in (
+            ("content", _generate_new_content_messages(item["content"])),
+            ("comment", _generate_summary_as_critic_messages(item["title"], item["content"])),
+        ):
+            requests.append({
+                "custom_id": f"{index}-{kind}",
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {"model": MODEL, "messages": messages},
+            })
+    return requests
+
+
+async def submit_rewrite_batch(items: List[Dict]) -> bool:
+    """
+    將新聞的重寫與評論工作寫成 JSONL，上傳並建立 Batch 工作。
+    工作資訊（含待發文的新聞）存到 data/batch_jobs.json，Bot 重啟後仍能繼續。
+
+    Args:
+        items (List[Dict]): 已清理、去重，尚未重寫的新聞列表。
+
+    Returns:
+        bool: 成功建立工作回傳 True；失敗時回傳 False，由呼叫端改用即時處理。
+    """
+    requests = _batch_requests(items)
+    input_file = os.path.join(BATCH_INPUT_FOLDER, f"rewrite_{int(time.time())}.jsonl")
+    try:
+        os.makedirs(BATCH_INPUT_FOLDER, exist_ok=True)
+        with open(input_file, "w", encoding="utf-8") as f:
+            for request in requests:
+                f.write(json.dumps(request, ensure_ascii=False) + "\n")
+        with open(input_file, "rb") as f:
+            uploaded = await async_openai_client.files.create(file=f, purpose="batch")
+        batch = await async_openai_client.batches.create(
+            input_file_id=uploaded.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h",
+        )
+    except Exception as e:
+        print(f"[openai_batch_service] 建立 Batch 工作時發生錯誤: {e}")
+        return False
+
+    async with _jobs_lock:
+        jobs = await asyncio.to_thread(_load_jobs)
+        jobs.append({
+            "batch_id": batch.id,
+            "input_file": input_file,
+            "created_at": time.time(),
+            # 標題向量不寫入 JSON，發文時會從 Embedding 快取重新取得
+            "items": [{key: value for key, value in item.items() if key != "embed_title"} for item in items],
+        })
+        await asyncio.to_thread(_save_jobs, jobs)
+    print(f"[openai_batch_service] 已建立 Batch 工作 {batch.id}，共 {len(items)} 則新聞。")
+    return True
+
+
+async def rewrite_now(items: List[Dict]):
+    """以即時的 chat completion 產生新內文與評論（Batch 無法使用或失敗時的備援）。"""
+    async def rewrite(item):
+        item["content"], item["comment"] = await asyncio.gather(
+            generate_new_content_async(item["content"]),
+            generate_summary_as_critic_async(item["title"], item["content"]),
+        )
+    await asyncio.gather(*(rewrite(item) for item in items))
+
+
+async def _read_results(batch) -> Dict[str, str]:
+    """下載 Batch 的輸出檔，回傳 custom_id -> 回覆內容。"""
+    results = {}
+    if not batch.output_file_id:
+        return results
+    output = await async_openai_client.files.content(batch.output_file_id)
+    for line in output.text.splitlines():
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+            response = record.get("response") or {}
+            if response.get("status_code") != 200:
+                continue
+            results[record["custom_id"]] = response["body"]["choices"][0]["message"]["content"].strip()
+        except Exception as e:
+            print(f"[openai_batch_service] 無法解析 Batch 結果: {e}")
+    return results
+
+
+async def _finish_job(job: dict, batch, skip: Set[int] = frozenset()) -> List[Dict]:
+    """套用 Batch 結果；沒有結果的新聞改用即時處理。回傳可發文的新聞列表（skip 中的新聞已發文，不再處理）。"""
+    results = await _read_results(batch)
+    # 發文失敗時工作會保留重試，因此不修改工作中原本的新聞
+    items = copy.deepcopy(job["items"])
+    missing = []
+    for index, item in enumerate(items):
+        if index in skip:
+            continue
+        content = results.get(f"{index}-content")
+        comment = results.get(f"{index}-comment")
+        if content is None or comment is None:
+            missing.append(item)
+            continue
+        # 結果同時寫入 GPT 快取，重跑時不必再付費
+        for function, messages, response in (
+            ("generate_new_content", _generate_new_content_messages(item["content"]), content),
+            ("generate_summary_as_critic", _generate_summary_as_critic_messages(item["title"], item["content"]), comment),
+        ):
+            await asyncio.to_thread(gpt_cache.put, gpt_cache.make_key(function, MODEL, messages), function, MODEL, response)
+        item["content"] = content
+        item["comment"] = comment
+
+    if missing:
+        print(f"[openai_batch_service] Batch {job['batch_id']} 有 {len(missing)} 則新聞沒有結果，改用即時處理。")
+        await rewrite_now(missing)
+    return items
+
+
+async def _update_job(batch_id: str, update):
+    """重新讀取 batch_jobs.json，以 update(job) 修改指定的工作後寫回；update 回傳 False 時移除該工作。"""
+    async with _jobs_lock:
+        jobs = await asyncio.to_thread(_load_jobs)
+        kept = [job for job in jobs if job["batch_id"] != batch_id or update(job) is not False]
+        await asyncio.to_thread(_save_jobs, kept)
+
+
+async def _post_job(job: dict, batch, bot, history: Dict[int, Dict]):
+    """
+    逐則發文，每發完一則就把索引記錄到工作的 posted 欄位並寫回檔案。
+    中途失敗時丟出例外，下次只會發出尚未記錄的新聞，不會重複發文。
+    """
+    posted = set(job.get("posted", []))
+    items = await _finish_job(job, batch, posted)
+
+    def mark_posted(index):
+        def update(saved_job):
+            saved_job["posted"] = sorted(set(saved_job.get("posted", [])) | {index})
+        return update
+
+    for index, item in enumerate(items):
+        if index in posted:
+            continue
+        await process_forum_posts([item], bot, history=history)
+        await _update_job(job["batch_id"], mark_posted(index))
+
+
+async def resume_batches(bot):
+    """
+    檢查 data/batch_jobs.json 中尚未完成的 Batch 工作。
+    已結束的工作會套用結果並逐則發文，全部發完後從清單中移除；Bot 重啟後也會從這裡接續，已發出的新聞不會重發。
+
+    Args:
+        bot (discord.Bot): Discord Bot 實例。
+    """
+    async with _resume_lock:
+        async with _jobs_lock:
+            jobs = await asyncio.to_thread(_load_jobs)
+        if not jobs:
+            return
+
+        # 論壇貼文與標題向量只在有工作要發文時抓取一次
+        history = None
+        for job in jobs:
+            try:
+                batch = await async_openai_client.batches.retrieve(job["batch_id"])
+            except Exception as e:
+                print(f"[openai_batch_service] 無法取得 Batch {job['batch_id']} 狀態: {e}")
+                continue
+
+            if batch.status not in FINISHED_STATUSES:
+                print(f"[openai_batch_service] Batch {job['batch_id']} 狀態: {batch.status}")
+                continue
+
+            print(f"[openai_batch_service] Batch {job['batch_id']} 已結束（{batch.status}），開始發文。")
+            try:
+                if history is None:
+                    history = await load_forum_history(bot)
+                await _post_job(job, batch, bot, history)
+            except Exception as e:
+                print(f"[openai_batch_service] 處理 Batch {job['batch_id']} 結果時發生錯誤，稍後重試: {e}")
+                continue
+            await _update_job(job["batch_id"], lambda saved_job: False)
+            try:
+                os.remove(job["input_file"])
+            except OSError:
+                pass
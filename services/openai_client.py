@@ -0,0 +1,37 @@
+# services/openai_client.py
+import httpx
+from openai import OpenAI, AsyncOpenAI, DefaultHttpxClient, DefaultAsyncHttpxClient
+
+from config.config import (
+    OPENAI_API_KEY,
+    OPENAI_BASE_URL,
+    OPENAI_MAX_CONNECTIONS,
+    OPENAI_KEEPALIVE_CONNECTIONS,
+    OPENAI_TIMEOUT,
+    OPENAI_MAX_RETRIES,
+)
+
+# GPT 與 Embedding 共用的連線池設定
+_limits = httpx.Limits(
+    max_connections=OPENAI_MAX_CONNECTIONS,
+    max_keepalive_connections=OPENAI_KEEPALIVE_CONNECTIONS,
+)
+
+# 同步 client（給在執行緒中呼叫的函式使用）
+openai_client = OpenAI(
+    api_key=OPENAI_API_KEY,
+    base_url=OPENAI_BASE_URL,
+    timeout=OPENAI_TIMEOUT,
+    max_retries=OPENAI_MAX_RETRIES,
+    http_client=DefaultHttpxClient(limits=_limits),
+)
+
+# 非同步 client（給事件迴圈中的新聞處理管線使用）
+# 重試由 services.openai_rate_control 處理，以便依速率限制標頭調整並行數
+async_openai_client = AsyncOpenAI(
+    api_key=OPENAI_API_KEY,
+    base_url=OPENAI_BASE_URL,
+    timeout=OPENAI_TIMEOUT,
+    max_retries=0,
+    http_client=DefaultAsyncHttpxClient(limits=_limits),
+)
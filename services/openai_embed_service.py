@@ -1,15 +1,228 @@
 # services/openai_embeded_service.py
 
-from openai import OpenAI
+import asyncio
 import logging
+from typing import List
 import numpy as np
-from config.config import OPENAI_API_KEY, SIMILARITY_THRESHOLD
+from config.config import (
+    SIMILARITY_THRESHOLD,
+    EMBEDDING_BATCH_SIZE,
+    EMBEDDING_BATCH_MAX_TOKENS,
+    EMBEDDING_MAX_INPUT_TOKENS,
+    EMBEDDING_DIMENSIONS,
+    EMBEDDING_DTYPE,
+    EMBEDDING_BACKEND,
+    EMBEDDING_FALLBACK_LOCAL,
+)
+from services.openai_client import openai_client, async_openai_client
+from services.openai_rate_control import rate_controller, OpenAIUnavailableError
+from services.token_budget import count_tokens, trim_to_budget
+from services import embedding_cache
+from services.local_embedder import MODEL_KEY as LOCAL_MODEL_KEY, embed_local
 
-# 設定 OpenAI API Key
-openai_client = OpenAI(api_key=OPENAI_API_KEY)
 MODEL = "text-embedding-3-small"
+# 向量維度；0 代表模型預設維度
+DIMENSIONS = EMBEDDING_DIMENSIONS or 0
 
-def get_text_embedding(text: str, model: str = MODEL) -> list:
+def get_model_key(model: str = MODEL) -> str:
+    """模型與維度組成的識別字串；不同識別字串的向量不能互相比較。"""
+    if EMBEDDING_BACKEND == "local":
+        return LOCAL_MODEL_KEY
+    return f"{model}:{DIMENSIONS}"
+
+def _empty() -> np.ndarray:
+    # 失敗或空白文字的向量；以 len()/size 判斷，不能用 `if not embedding`（多於一個元素的陣列沒有布林值）
+    return np.zeros(0, dtype=EMBEDDING_DTYPE)
+
+def to_vector(values) -> np.ndarray:
+    """將 API 回傳或快取中的向量轉為 EMBEDDING_DTYPE 的單位向量。"""
+    vector = np.asarray(values, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    if not vector.size or norm == 0:
+        return _empty()
+    return (vector / norm).astype(EMBEDDING_DTYPE)
+
+def _local(texts: List[str]) -> List[np.ndarray]:
+    return [vector.astype(EMBEDDING_DTYPE) for vector in embed_local(texts)]
+
+def _with_local_fallback(texts: List[str], embeddings: List[np.ndarray]) -> List[np.ndarray]:
+    """有文字無法取得 OpenAI 向量時，整批改用本機向量，確保同一次呼叫的向量可以互相比較。"""
+    if not EMBEDDING_FALLBACK_LOCAL:
+        return embeddings
+    if any(not embedding.size and text and text.strip() for text, embedding in zip(texts, embeddings)):
+        print(f"[openai_embed_service] 部分文字無法取得 OpenAI 向量，本批 {len(texts)} 筆改用本機向量。")
+        return _local(texts)
+    return embeddings
+
+def align_embeddings(texts: List[str], embeddings: List[np.ndarray]) -> List[np.ndarray]:
+    """
+    確保一組向量可以互相比較：來自不同來源（OpenAI 與本機備援）或不同維度時，全部改以本機向量重新產生。
+
+    Args:
+        texts (List[str]): 產生向量的文字。
+        embeddings (List[np.ndarray]): 與 texts 對應的向量。
+
+    Returns:
+        List[np.ndarray]: 維度一致的向量列表。
+    """
+    if len({len(embedding) for embedding in embeddings if len(embedding)}) <= 1:
+        return embeddings
+    return _local(texts)
+
+def _request_options() -> dict:
+    return {"dimensions": DIMENSIONS} if DIMENSIONS else {}
+
+def _input_text(text: str) -> str:
+    # 過長的文字裁切到單一輸入的上限內
+    if count_tokens(text) > EMBEDDING_MAX_INPUT_TOKENS:
+        return trim_to_budget(text, EMBEDDING_MAX_INPUT_TOKENS, drop_boilerplate=False)
+    return text
+
+def _batch_indices(texts: List[str]) -> List[List[int]]:
+    """
+    將文字分批：每批最多 EMBEDDING_BATCH_SIZE 個、總共不超過 EMBEDDING_BATCH_MAX_TOKENS 個 token。
+    空白的文字不送出（API 不接受），回傳每批文字在 texts 中的索引。
+    """
+    batches = []
+    batch = []
+    batch_tokens = 0
+    for index, text in enumerate(texts):
+        if not text or not text.strip():
+            continue
+        tokens = min(count_tokens(text), EMBEDDING_MAX_INPUT_TOKENS)
+        if batch and (len(batch) >= EMBEDDING_BATCH_SIZE or batch_tokens + tokens > EMBEDDING_BATCH_MAX_TOKENS):
+            batches.append(batch)
+            batch = []
+            batch_tokens = 0
+        batch.append(index)
+        batch_tokens += tokens
+    if batch:
+        batches.append(batch)
+    return batches
+
+def _embed_batch(texts: List[str], batch: List[int], model: str, embeddings: List[np.ndarray]):
+    response = openai_client.embeddings.create(
+        input=[_input_text(texts[index]) for index in batch],
+        model=model,
+        **_request_options()
+    )
+    for data in response.data:
+        embeddings[batch[data.index]] = to_vector(data.embedding)
+
+async def _aembed_batch(texts: List[str], batch: List[int], model: str, embeddings: List[np.ndarray]):
+    response = await rate_controller.call(
+        lambda: async_openai_client.embeddings.with_raw_response.create(
+            input=[_input_text(texts[index]) for index in batch],
+            model=model,
+            **_request_options()
+        )
+    )
+    for data in response.data:
+        embeddings[batch[data.index]] = to_vector(data.embedding)
+
+def _request_embeddings(texts: List[str], model: str) -> List[np.ndarray]:
+    embeddings = [_empty() for _ in texts]
+    for batch in _batch_indices(texts):
+        try:
+            _embed_batch(texts, batch, model, embeddings)
+        except Exception as e:
+            print(f"生成 Embedding 時發生錯誤（{len(batch)} 筆）: {e}")
+            if len(batch) == 1:
+                continue
+            # 整批失敗時逐筆重試，只有出問題的文字對應到空列表
+            for index in batch:
+                try:
+                    _embed_batch(texts, [index], model, embeddings)
+                except Exception as e:
+                    print(f"生成 Embedding 時發生錯誤: {texts[index][:50]}, 錯誤: {e}")
+    return embeddings
+
+async def _request_embeddings_async(texts: List[str], model: str) -> List[np.ndarray]:
+    # 各批次同時送出，並行數與重試由 rate_controller 控制
+    embeddings = [_empty() for _ in texts]
+
+    async def run(batch: List[int]):
+        try:
+            await _aembed_batch(texts, batch, model, embeddings)
+        except OpenAIUnavailableError:
+            raise
+        except Exception as e:
+            print(f"生成 Embedding 時發生錯誤（{len(batch)} 筆）: {e}")
+            if len(batch) == 1:
+                return
+            # 整批失敗時逐筆重試，只有出問題的文字對應到空列表
+            for index in batch:
+                try:
+                    await _aembed_batch(texts, [index], model, embeddings)
+                except OpenAIUnavailableError:
+                    raise
+                except Exception as e:
+                    print(f"生成 Embedding 時發生錯誤: {texts[index][:50]}, 錯誤: {e}")
+
+    await asyncio.gather(*(run(batch) for batch in _batch_indices(texts)))
+    return embeddings
+
+def _read_cache(texts: List[str], model: str):
+    """先查 Embedding 快取；回傳 (已命中的向量列表, 需要向 API 請求的文字)，同一段文字只請求一次。"""
+    embeddings = [_empty() for _ in texts]
+    for index, vector in enumerate(embedding_cache.get_many(model, DIMENSIONS, texts)):
+        if vector is not None:
+            embeddings[index] = to_vector(vector)
+    missing = list(dict.fromkeys(
+        text for text, embedding in zip(texts, embeddings) if not embedding.size and text and text.strip()
+    ))
+    return embeddings, missing
+
+def _fill_missing(texts: List[str], embeddings: List[np.ndarray], missing: List[str], fetched: List[np.ndarray], model: str):
+    """將 API 產生的向量寫入快取，並填回對應位置。"""
+    embedding_cache.put_many(model, DIMENSIONS, missing, fetched)
+    by_text = dict(zip(missing, fetched))
+    for index, text in enumerate(texts):
+        if not embeddings[index].size and text in by_text:
+            embeddings[index] = by_text[text]
+
+def get_text_embeddings(texts: List[str], model: str = MODEL) -> List[np.ndarray]:
+    """
+    將多段文字批次轉換成向量（Embedding）。
+    先查本機快取，只有未命中的文字才依數量與 token 數分批送出。
+    
+    Args:
+        texts (List[str]): 要轉換的文字列表。
+        model (str, optional): 使用的模型名稱。預設為 "text-embedding-3-small"。
+    
+    Returns:
+        List[np.ndarray]: 與 texts 順序相同的單位向量（EMBEDDING_DTYPE）；失敗或空白的文字對應到空陣列。
+    """
+    if EMBEDDING_BACKEND == "local":
+        return _local(texts)
+    embeddings, missing = _read_cache(texts, model)
+    if missing:
+        _fill_missing(texts, embeddings, missing, _request_embeddings(missing, model), model)
+    return _with_local_fallback(texts, embeddings)
+
+async def get_text_embeddings_async(texts: List[str], model: str = MODEL) -> List[np.ndarray]:
+    """
+    get_text_embeddings 的非同步版本。
+    API 無法使用（熔斷中或等待逾時）時，EMBEDDING_FALLBACK_LOCAL 開啟則改用本機向量，否則丟出 OpenAIUnavailableError。
+    """
+    if EMBEDDING_BACKEND == "local":
+        return _local(texts)
+    embeddings, missing = await asyncio.to_thread(_read_cache, texts, model)
+    if missing:
+        if EMBEDDING_FALLBACK_LOCAL and rate_controller.is_open():
+            print(f"[openai_embed_service] OpenAI API 熔斷中，本批 {len(texts)} 筆改用本機向量。")
+            return _local(texts)
+        try:
+            fetched = await _request_embeddings_async(missing, model)
+        except OpenAIUnavailableError as e:
+            if not EMBEDDING_FALLBACK_LOCAL:
+                raise
+            print(f"[openai_embed_service] OpenAI API 無法使用，本批 {len(texts)} 筆改用本機向量: {e}")
+            return _local(texts)
+        await asyncio.to_thread(_fill_missing, texts, embeddings, missing, fetched, model)
+    return _with_local_fallback(texts, embeddings)
+
+def get_text_embedding(text: str, model: str = MODEL) -> np.ndarray:
     """
     將輸入的文字轉換成向量（Embedding）。
     
@@ -18,18 +231,13 @@ def get_text_embedding(text: str, model: str = MODEL) -> list:
         model (str, optional): 使用的模型名稱。預設為 "text-embedding-ada-002"。
     
     Returns:
-        list: 生成的向量。
+        np.ndarray: 生成的單位向量；失敗時為空陣列。
     """
-    try:
-        response = openai_client.embeddings.create(
-            input=text,
-            model=model
-        )
-        embedding = response.data[0].embedding
-        return embedding
-    except Exception as e:
-        print(f"生成 Embedding 時發生錯誤: {e}")
-        return []
+    return get_text_embeddings([text], model)[0]
+
+async def get_text_embedding_async(text: str, model: str = MODEL) -> np.ndarray:
+    """get_text_embedding 的非同步版本；API 無法使用時丟出 OpenAIUnavailableError。"""
+    return (await get_text_embeddings_async([text], model))[0]
 
 def compare_embeddings(embedding1: list, embedding2: list, threshold: float = SIMILARITY_THRESHOLD) -> bool:
     """
@@ -43,7 +251,7 @@ def compare_embeddings(embedding1: list, embedding2: list, threshold: float = SI
     Returns:
         bool: 如果相似度大於閾值，回傳 True；否則回傳 False。
     """
-    if not embedding1 or not embedding2:
+    if len(embedding1) == 0 or len(embedding2) == 0:
         print("其中一個或兩個 Embedding 是空的。")
         return False
     
@@ -1,37 +1,76 @@
 # services/openai_processing_service.py
-from openai import OpenAI
 import os
-from config.config import OPENAI_API_KEY, COMMENTATOR_PROMPT, COMMENTATOR_INDEX, STATUS_PROMPT
+from config.config import COMMENTATOR_PROMPT, COMMENTATOR_INDEX, STATUS_PROMPT, GPT_MODEL, PROMPT_CONTENT_TOKEN_BUDGET
+import asyncio
 import json
-from typing import List
+import re
+from typing import Any, Callable, List, Optional
 import discord
-import tiktoken
+from services.openai_client import openai_client, async_openai_client
+from services.openai_rate_control import rate_controller, OpenAIUnavailableError
+from services import gpt_cache
+from services.token_budget import trim_to_budget, print_token_count
 
-# 設定 OpenAI API Key
-openai_client = OpenAI(api_key=OPENAI_API_KEY)
-MODEL = "gpt-4o-mini"
+MODEL = GPT_MODEL
 
-# Initialize the tokenizer
-enc = tiktoken.encoding_for_model(MODEL)
+def _usage_tokens(converted) -> int:
+    usage = getattr(converted, "usage", None)
+    return getattr(usage, "total_tokens", 0) or 0
 
-def print_token_count(prompt: str, user_content: str):
-    messages = [
-        {"role": "developer", "content": prompt},
-        {"role": "user", "content": user_content}
-    ]
-    token_count = sum(len(enc.encode(message["content"])) for message in messages)
-    print(f"Estimated token count: {token_count}")
+def _chat(function: str, messages: List[dict], parse: Optional[Callable[[str], Any]] = None, **kwargs) -> Any:
+    """
+    以同步 client 呼叫 chat completion，回傳去除空白後的回覆內容。
+    相同的 (函式, 模型, 提示詞, 輸入) 會直接回傳 GPT 快取中的結果。
+    有 parse 時回傳 parse(回覆內容)；解析失敗的回覆不寫入快取，重試時會重新呼叫 API。
+    """
+    key = gpt_cache.make_key(function, MODEL, messages, kwargs)
+    cached = _parse_cached(gpt_cache.get(key), parse)
+    if cached is not None:
+        return cached
+    converted = openai_client.chat.completions.create(
+        model=MODEL,
+        messages=messages,
+        **kwargs
+    )
+    content = converted.choices[0].message.content.strip()
+    result = parse(content) if parse is not None else content
+    gpt_cache.put(key, function, MODEL, content, _usage_tokens(converted))
+    return result
 
-def clean_content(content: str) -> str:
+async def _achat(function: str, messages: List[dict], parse: Optional[Callable[[str], Any]] = None, **kwargs) -> Any:
     """
-    使用 OpenAI GPT-4o mini 模型清理內文，移除與新聞內容無關的部分（如廣告）。
-    
-    Args:
-        content (str): 原始新聞內文。
-    
-    Returns:
-        str: 清理後的內文。
+    以非同步 client 呼叫 chat completion；並行數與重試由 rate_controller 控制。
+    相同的 (函式, 模型, 提示詞, 輸入) 會直接回傳 GPT 快取中的結果；快取讀寫在執行緒中進行，不阻塞事件迴圈。
+    有 parse 時回傳 parse(回覆內容)；解析失敗的回覆不寫入快取，重試時會重新呼叫 API。
+    API 無法使用時丟出 OpenAIUnavailableError，呼叫端不應以未處理的內容代替。
     """
+    key = gpt_cache.make_key(function, MODEL, messages, kwargs)
+    cached = _parse_cached(await asyncio.to_thread(gpt_cache.get, key), parse)
+    if cached is not None:
+        return cached
+    converted = await rate_controller.call(
+        lambda: async_openai_client.chat.completions.with_raw_response.create(
+            model=MODEL,
+            messages=messages,
+            **kwargs
+        )
+    )
+    content = converted.choices[0].message.content.strip()
+    result = parse(content) if parse is not None else content
+    await asyncio.to_thread(gpt_cache.put, key, function, MODEL, content, _usage_tokens(converted))
+    return result
+
+def _parse_cached(cached: Optional[str], parse: Optional[Callable[[str], Any]]) -> Any:
+    """解析快取的回覆；無法解析的舊快取視為未命中。"""
+    if cached is None or parse is None:
+        return cached
+    try:
+        return parse(cached)
+    except Exception:
+        return None
+
+def _clean_content_messages(content: str) -> List[dict]:
+    content = trim_to_budget(content, PROMPT_CONTENT_TOKEN_BUDGET, drop_boilerplate=False)
     prompt = (
         "請將使用者提供的新聞內文中與主題無關的部分（如廣告、無關段落等）移除，"
         "其他部分維持原文。"
@@ -40,34 +79,42 @@ def clean_content(content: str) -> str:
     
     print_token_count(prompt, content)
     
-    try:
-        converted = openai_client.chat.completions.create(
-            model=MODEL,
-            messages=[
-                {"role": "developer", "content": prompt},
-                {
-                    "role": "user",
-                    "content": f"{content}"
-                }
-            ]
-        )
-        cleaned_content = converted.choices[0].message.content.strip()
-        return cleaned_content
-    except Exception as e:
-        print(f"清理內文時發生錯誤: {e}")
-        return content  # 回傳原始內容作為備援
+    return [
+        {"role": "developer", "content": prompt},
+        {
+            "role": "user",
+            "content": f"{content}"
+        }
+    ]
 
-def generate_new_title(original_title: str, content: str) -> str:
+def clean_content(content: str) -> str:
     """
-    使用 OpenAI GPT-4o mini 模型生成新的新聞標題，重點在於資訊豐富而非吸引點擊。
+    使用 OpenAI GPT-4o mini 模型清理內文，移除與新聞內容無關的部分（如廣告）。
     
     Args:
-        original_title (str): 原始新聞標題。
-        content (str): 清理後的新聞內文。
+        content (str): 原始新聞內文。
     
     Returns:
-        str: 生成的新標題。
+        str: 清理後的內文。
     """
+    try:
+        return _chat("clean_content", _clean_content_messages(content))
+    except Exception as e:
+        print(f"清理內文時發生錯誤: {e}")
+        return content  # 回傳原始內容作為備援
+
+async def clean_content_async(content: str) -> str:
+    """clean_content 的非同步版本。"""
+    try:
+        return await _achat("clean_content", _clean_content_messages(content))
+    except OpenAIUnavailableError:
+        raise
+    except Exception as e:
+        print(f"清理內文時發生錯誤: {e}")
+        return content  # 回傳原始內容作為備援
+
+def _generate_new_title_messages(original_title: str, content: str) -> List[dict]:
+    content = trim_to_budget(content, PROMPT_CONTENT_TOKEN_BUDGET, drop_boilerplate=False)
     prompt = (
         "根據以下的新聞標題和內文，生成一個新的標題。"
         "除此之外不要輸出其他内容。"
@@ -83,34 +130,43 @@ def generate_new_title(original_title: str, content: str) -> str:
     
     print_token_count(prompt, user_content)
     
-    try:
-        converted = openai_client.chat.completions.create(
-            model=MODEL,
-            messages=[
-                {"role": "developer", "content": prompt},
-                {
-                    "role": "user",
-                    "content": user_content
-                }
-            ]
-        )
-        new_title = converted.choices[0].message.content.strip()
-        return new_title
-    except Exception as e:
-        print(f"生成新標題時發生錯誤: {e}")
-        return original_title  # 回傳原標題作為備援
+    return [
+        {"role": "developer", "content": prompt},
+        {
+            "role": "user",
+            "content": user_content
+        }
+    ]
 
-def generate_new_content(content: str) -> str:
+def generate_new_title(original_title: str, content: str) -> str:
     """
-    使用 OpenAI GPT-4o mini 模型生成新的新聞內文，重點在於易懂、簡潔、無多餘字詞。
+    使用 OpenAI GPT-4o mini 模型生成新的新聞標題，重點在於資訊豐富而非吸引點擊。
     
     Args:
         original_title (str): 原始新聞標題。
         content (str): 清理後的新聞內文。
     
     Returns:
-        str: 生成的新內文。
+        str: 生成的新標題。
     """
+    try:
+        return _chat("generate_new_title", _generate_new_title_messages(original_title, content))
+    except Exception as e:
+        print(f"生成新標題時發生錯誤: {e}")
+        return original_title  # 回傳原標題作為備援
+
+async def generate_new_title_async(original_title: str, content: str) -> str:
+    """generate_new_title 的非同步版本。"""
+    try:
+        return await _achat("generate_new_title", _generate_new_title_messages(original_title, content))
+    except OpenAIUnavailableError:
+        raise
+    except Exception as e:
+        print(f"生成新標題時發生錯誤: {e}")
+        return original_title  # 回傳原標題作為備援
+
+def _generate_new_content_messages(content: str) -> List[dict]:
+    content = trim_to_budget(content, PROMPT_CONTENT_TOKEN_BUDGET, drop_boilerplate=False)
     prompt = (
         "根據以下的新聞內文，生成一個新的內文。"
         "新內文應該易懂、簡潔，並避免使用多餘的字詞和廢話。"
@@ -120,26 +176,62 @@ def generate_new_content(content: str) -> str:
     
     print_token_count(prompt, content)
     
+    return [
+        {"role": "developer", "content": prompt},
+        {
+            "role": "user",
+            "content": (
+                    "\n\n內文:\n"
+                    f"{content}"
+                )
+        }
+    ]
+
+def generate_new_content(content: str) -> str:
+    """
+    使用 OpenAI GPT-4o mini 模型生成新的新聞內文，重點在於易懂、簡潔、無多餘字詞。
+    
+    Args:
+        original_title (str): 原始新聞標題。
+        content (str): 清理後的新聞內文。
+    
+    Returns:
+        str: 生成的新內文。
+    """
     try:
-        converted = openai_client.chat.completions.create(
-            model=MODEL,
-            messages=[
-                {"role": "developer", "content": prompt},
-                {
-                    "role": "user",
-                    "content": (
-                            "\n\n內文:\n"
-                            f"{content}"
-                        )
-                }
-            ]
-        )
-        new_content = converted.choices[0].message.content.strip()
-        return new_content
+        return _chat("generate_new_content", _generate_new_content_messages(content))
+    except Exception as e:
+        print(f"生成新內文時發生錯誤: {e}")
+        return content  # 回傳原內文作為備援
+
+async def generate_new_content_async(content: str) -> str:
+    """generate_new_content 的非同步版本。"""
+    try:
+        return await _achat("generate_new_content", _generate_new_content_messages(content))
+    except OpenAIUnavailableError:
+        raise
     except Exception as e:
         print(f"生成新內文時發生錯誤: {e}")
         return content  # 回傳原內文作為備援
     
+def _generate_summary_as_critic_messages(title: str, content: str) -> List[dict]:
+    content = trim_to_budget(content, PROMPT_CONTENT_TOKEN_BUDGET, drop_boilerplate=False)
+    prompt = COMMENTATOR_PROMPT[COMMENTATOR_INDEX]
+    
+    user_content = (
+        f"標題:\n{title}\n\n內文:\n{content}"
+    )
+    
+    print_token_count(prompt, user_content)
+
+    return [
+        {"role": "developer", "content": prompt},
+        {
+            "role": "user",
+            "content": user_content
+        }
+    ]
+
 def generate_summary_as_critic(title: str, content: str) -> str:
     """
     使用 OpenAI GPT-4o mini 模型生成評論家的口語描述。
@@ -151,42 +243,24 @@ def generate_summary_as_critic(title: str, content: str) -> str:
     Returns:
         str: 生成的評論家描述。
     """
-    prompt = COMMENTATOR_PROMPT[COMMENTATOR_INDEX]
-    
-    user_content = (
-        f"標題:\n{title}\n\n內文:\n{content}"
-    )
-    
-    print_token_count(prompt, user_content)
+    try:
+        return _chat("generate_summary_as_critic", _generate_summary_as_critic_messages(title, content))
+    except Exception as e:
+        print(f"生成評論家描述時發生錯誤: {e}")
+        return "不予置評"  # 回傳預設描述作為備援
 
+async def generate_summary_as_critic_async(title: str, content: str) -> str:
+    """generate_summary_as_critic 的非同步版本。"""
     try:
-        converted = openai_client.chat.completions.create(
-            model=MODEL,
-            messages=[
-                {"role": "developer", "content": prompt},
-                {
-                    "role": "user",
-                    "content": user_content
-                }
-            ]
-        )
-        summary = converted.choices[0].message.content.strip()
-        return summary
+        return await _achat("generate_summary_as_critic", _generate_summary_as_critic_messages(title, content))
+    except OpenAIUnavailableError:
+        raise
     except Exception as e:
         print(f"生成評論家描述時發生錯誤: {e}")
         return "不予置評"  # 回傳預設描述作為備援
     
-def determine_tags(tags: List[discord.ForumTag], content: str) -> List[str]:
-    """
-    使用 OpenAI GPT-4o mini 模型根據內文生成適合的標籤列表。
-    
-    Args:
-        tags (List[discord.ForumTag]): 可用的標籤列表。
-        content (str): 清理後的新聞內文。
-    
-    Returns:
-        List[str]: 生成的標籤列表。
-    """
+def _determine_tags_messages(tags: List[discord.ForumTag], content: str) -> List[dict]:
+    content = trim_to_budget(content, PROMPT_CONTENT_TOKEN_BUDGET, drop_boilerplate=False)
     prompt = (
         "根據以下的新聞內文，從提供的標籤列表中選擇適合的標籤（不僅限一個）。"
         "返回一個JSON格式的列表，每個元素是一個標籤。"
@@ -202,25 +276,90 @@ def determine_tags(tags: List[discord.ForumTag], content: str) -> List[str]:
     
     print_token_count(prompt, user_content)
     
+    return [
+        {"role": "developer", "content": prompt},
+        {
+            "role": "user",
+            "content": user_content
+        }
+    ]
+
+def _parse_tag_list(converted: str) -> List[str]:
+    # 模型偶爾會用 codeblock 框住或在前後加上說明，只取出其中的 JSON 列表
+    match = re.search(r"\[.*\]", converted, re.DOTALL)
+    selected_tags = json.loads(match.group(0) if match else converted)
+    return [tag for tag in selected_tags if isinstance(tag, str)]
+
+def determine_tags(tags: List[discord.ForumTag], content: str) -> List[str]:
+    """
+    使用 OpenAI GPT-4o mini 模型根據內文生成適合的標籤列表。
+    
+    Args:
+        tags (List[discord.ForumTag]): 可用的標籤列表。
+        content (str): 清理後的新聞內文。
+    
+    Returns:
+        List[str]: 生成的標籤列表。
+    """
     try:
-        response = openai_client.chat.completions.create(
-            model=MODEL,
-            messages=[
-                {"role": "developer", "content": prompt},
-                {
-                    "role": "user",
-                    "content": user_content
-                }
-            ]
-        )
-        converted = response.choices[0].message.content.strip()
-        print(f"生成標籤: {converted}")
-        selected_tags = json.loads(converted)
+        selected_tags = _chat("determine_tags", _determine_tags_messages(tags, content), parse=_parse_tag_list)
+        print(f"生成標籤: {selected_tags}")
+        return selected_tags
+    except Exception as e:
+        print(f"生成標籤時發生錯誤: {e}")
+        return []
+
+async def determine_tags_async(tags: List[discord.ForumTag], content: str) -> List[str]:
+    """determine_tags 的非同步版本。"""
+    try:
+        selected_tags = await _achat("determine_tags", _determine_tags_messages(tags, content), parse=_parse_tag_list)
+        print(f"生成標籤: {selected_tags}")
         return selected_tags
+    except OpenAIUnavailableError:
+        raise
     except Exception as e:
         print(f"生成標籤時發生錯誤: {e}")
         return []
 
+def _generate_discord_status_messages(title: str) -> List[dict]:
+    prompt = STATUS_PROMPT
+    
+    user_content = f"新聞標題:\n{title}"
+    
+    print_token_count(prompt, user_content)
+    
+    return [
+        {"role": "developer", "content": prompt},
+        {
+            "role": "user",
+            "content": f"新聞標題:\n13縣市低溫特報 雲林以北防跌破10°C"
+        },
+        {
+            "role": "assistant",
+            "content": f"好冷"
+        },
+        {
+            "role": "user",
+            "content": f"新聞標題:\n北市中山區民宅凌晨竄火苗　警消獲報急灌救"
+        },
+        {
+            "role": "assistant",
+            "content": f"北市燒起來了（物理）"
+        },
+        {
+            "role": "user",
+            "content": f"新聞標題:\n魔力藍加盟富邦悍將 2024年球季將回歸中華職棒"
+        },
+        {
+            "role": "assistant",
+            "content": f"魔力藍回來了！"
+        },
+        {
+            "role": "user",
+            "content": user_content
+        },
+    ]
+
 def generate_discord_status(title: str) -> str:
     """
     使用 OpenAI GPT-4o mini 模型生成適合寫在 Discord 狀態中的話。
@@ -231,53 +370,136 @@ def generate_discord_status(title: str) -> str:
     Returns:
         str: 生成的 Discord 狀態。
     """
-    prompt = STATUS_PROMPT
-    
-    user_content = f"新聞標題:\n{title}"
-    
-    print_token_count(prompt, user_content)
-    
     try:
-        converted = openai_client.chat.completions.create(
-            model=MODEL,
-            messages=[
-                {"role": "developer", "content": prompt},
-                {
-                    "role": "user",
-                    "content": f"新聞標題:\n13縣市低溫特報 雲林以北防跌破10°C"
-                },
-                {
-                    "role": "assistant",
-                    "content": f"好冷"
-                },
-                {
-                    "role": "user",
-                    "content": f"新聞標題:\n北市中山區民宅凌晨竄火苗　警消獲報急灌救"
-                },
-                {
-                    "role": "assistant",
-                    "content": f"北市燒起來了（物理）"
-                },
-                {
-                    "role": "user",
-                    "content": f"新聞標題:\n魔力藍加盟富邦悍將 2024年球季將回歸中華職棒"
-                },
-                {
-                    "role": "assistant",
-                    "content": f"魔力藍回來了！"
-                },
-                {
-                    "role": "user",
-                    "content": user_content
-                },
-            ]
-        )
-        discord_status = converted.choices[0].message.content.strip()
-        return discord_status
+        return _chat("generate_discord_status", _generate_discord_status_messages(title))
+    except Exception as e:
+        print(f"生成 Discord 狀態時發生錯誤: {e}")
+        return "正在玩 拼命寫稿的機器人生"  # 回傳預設狀態作為備援
+
+async def generate_discord_status_async(title: str) -> str:
+    """generate_discord_status 的非同步版本。"""
+    try:
+        return await _achat("generate_discord_status", _generate_discord_status_messages(title))
+    except OpenAIUnavailableError:
+        raise
     except Exception as e:
         print(f"生成 Discord 狀態時發生錯誤: {e}")
         return "正在玩 拼命寫稿的機器人生"  # 回傳預設狀態作為備援
 
+# 一次完成所有處理步驟時，回傳 JSON 的各欄位
+ARTICLE_FIELDS = ["cleaned_content", "title", "content", "comment", "tags"]
+
+def _article_fields(precleaned: bool) -> List[str]:
+    # 內文已在本機清理乾淨時，不需要 GPT 再回傳一份清理後內文
+    return [field for field in ARTICLE_FIELDS if not (precleaned and field == "cleaned_content")]
+
+def _article_response_format(tag_names: List[str], precleaned: bool = False) -> dict:
+    tag_schema = {"type": "string", "enum": tag_names} if tag_names else {"type": "string"}
+    field_schemas = {
+        "cleaned_content": {"type": "string"},
+        "title": {"type": "string"},
+        "content": {"type": "string"},
+        "comment": {"type": "string"},
+        "tags": {"type": "array", "items": tag_schema},
+    }
+    fields = _article_fields(precleaned)
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": "processed_article",
+            "strict": True,
+            "schema": {
+                "type": "object",
+                "properties": {field: field_schemas[field] for field in fields},
+                "required": fields,
+                "additionalProperties": False,
+            },
+        },
+    }
+
+def _process_article_messages(original_title: str, content: str, tag_names: List[str], precleaned: bool = False) -> List[dict]:
+    content = trim_to_budget(content, PROMPT_CONTENT_TOKEN_BUDGET, drop_boilerplate=False)
+    steps = [] if precleaned else ["cleaned_content：將內文中與主題無關的部分（如廣告、無關段落等）移除，其他部分維持原文。"]
+    steps += [
+        "title：根據原標題和清理後的內文，生成一個新的標題。"
+        "新標題應該能夠提供足夠的資訊，並且避免使用誇張或吸引點擊的詞語。",
+        "content：根據清理後的內文，生成一個新的內文。"
+        "新內文應該易懂、簡潔，並避免使用多餘的字詞和廢話。"
+        "重要的詳細資訊仍然要保留，但是可以用分行或簡化或Discord可以渲染的方式呈現。",
+        "comment：以下列評論家的身分，根據新標題與新內文發表評論。\n"
+        f"{COMMENTATOR_PROMPT[COMMENTATOR_INDEX]}",
+        "tags：從標籤列表中選擇適合的標籤（不僅限一個，沒有適合的可以留空）。",
+    ]
+    prompt = (
+        f"你會收到一則新聞的原標題、{'已清理乾淨的' if precleaned else ''}內文與可用的標籤列表，請依序完成以下工作，並以 JSON 回傳：\n"
+        + "\n".join(f"{index}. {step}" for index, step in enumerate(steps, 1))
+    )
+
+    tag_list_str = json.dumps(tag_names, ensure_ascii=False)
+    user_content = (
+        f"原標題:\n{original_title}\n\n內文:\n{content}\n\n標籤列表:\n{tag_list_str}"
+    )
+
+    print_token_count(prompt, user_content)
+
+    return [
+        {"role": "developer", "content": prompt},
+        {
+            "role": "user",
+            "content": user_content
+        }
+    ]
+
+def _parse_processed_article(converted: str, tag_names: List[str], cleaned_content: Optional[str] = None) -> dict:
+    result = json.loads(converted)
+    if cleaned_content is not None:
+        result["cleaned_content"] = cleaned_content
+    if not all(result.get(field) is not None for field in ARTICLE_FIELDS):
+        raise ValueError(f"回傳的 JSON 缺少欄位: {converted[:200]}")
+    result["tags"] = [tag for tag in result["tags"] if tag in tag_names]
+    return result
+
+def process_article(original_title: str, content: str, tag_names: List[str], precleaned: bool = False) -> Optional[dict]:
+    """
+    以一次結構化輸出的 GPT 呼叫完成清理內文、生成新標題、新內文、評論與標籤，
+    取代 clean_content、generate_new_title、generate_new_content、generate_summary_as_critic 與 determine_tags 各自的呼叫。
+
+    Args:
+        original_title (str): 原始新聞標題。
+        content (str): 原始新聞內文。
+        tag_names (List[str]): 可用的標籤名稱。
+        precleaned (bool, optional): 內文已在本機清理乾淨時為 True；GPT 不再回傳清理後內文，cleaned_content 直接使用 content。
+
+    Returns:
+        Optional[dict]: 含 cleaned_content、title、content、comment、tags 的字典；
+        發生錯誤時回傳 None，由呼叫端改用逐步處理。
+    """
+    try:
+        return _chat(
+            "process_article",
+            _process_article_messages(original_title, content, tag_names, precleaned),
+            parse=lambda converted: _parse_processed_article(converted, tag_names, content if precleaned else None),
+            response_format=_article_response_format(tag_names, precleaned)
+        )
+    except Exception as e:
+        print(f"一次處理新聞時發生錯誤，改用逐步處理: {e}")
+        return None
+
+async def process_article_async(original_title: str, content: str, tag_names: List[str], precleaned: bool = False) -> Optional[dict]:
+    """process_article 的非同步版本。"""
+    try:
+        return await _achat(
+            "process_article",
+            _process_article_messages(original_title, content, tag_names, precleaned),
+            parse=lambda converted: _parse_processed_article(converted, tag_names, content if precleaned else None),
+            response_format=_article_response_format(tag_names, precleaned)
+        )
+    except OpenAIUnavailableError:
+        raise
+    except Exception as e:
+        print(f"一次處理新聞時發生錯誤，改用逐步處理: {e}")
+        return None
+
 def process_news_file(input_file: str, output_file: str):
     """
     讀取新聞文件，清理每一項的內文，並將結果保存到新的文件中。
@@ -0,0 +1,232 @@
+# services/openai_rate_control.py
+import asyncio
+import random
+import re
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+import openai
+
+from config.config import (
+    OPENAI_CONCURRENCY,
+    OPENAI_MIN_CONCURRENCY,
+    OPENAI_RATE_HEADROOM,
+    OPENAI_BACKOFF_BASE,
+    OPENAI_MAX_BACKOFF,
+    OPENAI_CIRCUIT_FAILURES,
+    OPENAI_CIRCUIT_COOLDOWN,
+    OPENAI_MAX_WAIT,
+)
+
+# 可重試的狀態碼
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+class OpenAIUnavailableError(Exception):
+    """OpenAI API 暫時無法使用（熔斷中或等待超過 OPENAI_MAX_WAIT），呼叫端不應以未處理的內容代替。"""
+
+
+def _parse_duration(value: Optional[str]) -> Optional[float]:
+    """解析 OpenAI 的重置時間標頭，例如 "1s"、"6m0s"、"20ms"；純數字視為秒數。"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_RE.findall(value)
+    if not parts:
+        return None
+    return sum(float(number) * _DURATION_UNITS[unit] for number, unit in parts)
+
+
+def _retry_after_seconds(headers) -> Optional[float]:
+    """依 retry-after-ms、retry-after、x-ratelimit-reset-* 的順序取得需等待的秒數。"""
+    if headers is None:
+        return None
+    if headers.get("retry-after-ms"):
+        try:
+            return float(headers["retry-after-ms"]) / 1000
+        except ValueError:
+            pass
+    for name in ("retry-after", "x-ratelimit-reset-requests", "x-ratelimit-reset-tokens"):
+        seconds = _parse_duration(headers.get(name))
+        if seconds is not None:
+            return seconds
+    return None
+
+
+def _backoff_seconds(attempt: int) -> float:
+    """第 attempt 次重試前的等待秒數：指數退避加上隨機抖動。"""
+    delay = min(OPENAI_MAX_BACKOFF, OPENAI_BACKOFF_BASE * (2 ** attempt))
+    return delay * random.uniform(0.5, 1.0)
+
+
+class RateController:
+    """
+    OpenAI 非同步請求的自適應並行控制（AIMD）與熔斷器。
+    - 成功且速率限制標頭仍有餘裕時，並行上限緩慢增加（每輪約 +1）
+    - 遇到 429 時並行上限減半，並依標頭暫停所有請求到額度重置
+    - 連續 OPENAI_CIRCUIT_FAILURES 次 5xx 或連線錯誤時熔斷：暫停所有請求 OPENAI_CIRCUIT_COOLDOWN 秒，
+      之後只放行一個請求試探，成功才恢復
+    請求在暫停或熔斷期間會等待（管線隨之暫停），超過 OPENAI_MAX_WAIT 秒仍無法完成才丟出 OpenAIUnavailableError。
+    """
+
+    def __init__(self, max_concurrency: int = OPENAI_CONCURRENCY, min_concurrency: int = OPENAI_MIN_CONCURRENCY):
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.limit = float(max_concurrency)
+        self._in_flight = 0
+        self._condition: Optional[asyncio.Condition] = None
+        # 在此時間點之前不發出請求（速率限制重置或熔斷冷卻）
+        self._paused_until = 0.0
+        self._failures = 0
+        self._circuit_open = False
+        self._cooldown = OPENAI_CIRCUIT_COOLDOWN
+        # 上次降低並行上限的時間；在此之前發出的請求收到 429 不再重複降低
+        self._last_decrease = 0.0
+        self.stats = {"requests": 0, "retries": 0, "rate_limited": 0, "circuit_opens": 0}
+
+    def _get_condition(self) -> asyncio.Condition:
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    def _allowed(self) -> int:
+        # 熔斷後的試探期只放行一個請求
+        return 1 if self._circuit_open else max(self.min_concurrency, int(self.limit))
+
+    async def _acquire(self, deadline: float):
+        condition = self._get_condition()
+        async with condition:
+            while True:
+                now = time.monotonic()
+                if now >= deadline:
+                    raise OpenAIUnavailableError("等待 OpenAI API 恢復逾時")
+                wait_seconds = self._paused_until - now
+                if wait_seconds <= 0 and self._in_flight < self._allowed():
+                    self._in_flight += 1
+                    return
+                timeout = min(deadline - now, wait_seconds) if wait_seconds > 0 else deadline - now
+                try:
+                    await asyncio.wait_for(condition.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def _release(self):
+        condition = self._get_condition()
+        async with condition:
+            self._in_flight -= 1
+            condition.notify_all()
+
+    def _pause(self, seconds: float):
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def _close_circuit(self):
+        if self._circuit_open:
+            print("[openai_rate_control] OpenAI API 已恢復，解除熔斷。")
+        self._failures = 0
+        self._circuit_open = False
+        self._cooldown = OPENAI_CIRCUIT_COOLDOWN
+
+    def _on_success(self, headers):
+        self._close_circuit()
+        headroom = 1.0
+        for kind in ("requests", "tokens"):
+            try:
+                remaining = float(headers.get(f"x-ratelimit-remaining-{kind}"))
+                limit = float(headers.get(f"x-ratelimit-limit-{kind}"))
+            except (TypeError, ValueError):
+                continue
+            if limit > 0:
+                headroom = min(headroom, remaining / limit)
+        if headroom <= 0:
+            # 額度已用完，等到重置再發出下一個請求
+            self._pause(_retry_after_seconds(headers) or OPENAI_BACKOFF_BASE)
+        elif headroom >= OPENAI_RATE_HEADROOM:
+            self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+
+    def _on_rate_limited(self, headers, started: float):
+        self.stats["rate_limited"] += 1
+        delay = _retry_after_seconds(headers)
+        self._pause(min(OPENAI_MAX_BACKOFF, delay) if delay is not None else _backoff_seconds(0))
+        if started >= self._last_decrease:
+            self._last_decrease = time.monotonic()
+            self.limit = max(self.min_concurrency, self.limit / 2)
+            print(f"[openai_rate_control] 觸發速率限制，並行上限降為 {int(self.limit)}。")
+
+    def _on_failure(self, attempt: int):
+        self._failures += 1
+        if self._circuit_open or self._failures >= OPENAI_CIRCUIT_FAILURES:
+            if not self._circuit_open:
+                self.stats["circuit_opens"] += 1
+            else:
+                # 試探失敗，延長冷卻時間
+                self._cooldown = min(self._cooldown * 2, OPENAI_MAX_WAIT)
+            self._circuit_open = True
+            self._pause(self._cooldown)
+            print(f"[openai_rate_control] OpenAI API 連續失敗 {self._failures} 次，暫停 {self._cooldown:.0f} 秒。")
+        else:
+            self._pause(_backoff_seconds(attempt))
+
+    async def call(self, request: Callable[[], Awaitable]):
+        """
+        在並行限制下執行 OpenAI 請求，遇到 429、5xx 或連線錯誤時退避重試。
+
+        Args:
+            request (Callable[[], Awaitable]): 回傳 with_raw_response 原始回應的協程函式。
+
+        Returns:
+            Any: 解析後的回應物件。
+
+        Raises:
+            OpenAIUnavailableError: 超過 OPENAI_MAX_WAIT 秒仍無法完成時。
+            openai.APIStatusError: 不可重試的錯誤（例如 400）。
+        """
+        deadline = time.monotonic() + OPENAI_MAX_WAIT
+        attempt = 0
+        while True:
+            await self._acquire(deadline)
+            started = time.monotonic()
+            self.stats["requests"] += 1
+            try:
+                raw = await request()
+            except openai.APIStatusError as e:
+                if e.status_code not in RETRY_STATUS_CODES:
+                    # API 有回應，只是請求本身有問題
+                    self._close_circuit()
+                    raise
+                if e.status_code == 429:
+                    self._on_rate_limited(e.response.headers, started)
+                else:
+                    self._on_failure(attempt)
+            except openai.APIConnectionError:
+                self._on_failure(attempt)
+            else:
+                self._on_success(raw.headers)
+                return raw.parse()
+            finally:
+                await self._release()
+            self.stats["retries"] += 1
+            attempt += 1
+
+    def is_open(self) -> bool:
+        """熔斷中（API 被視為無法使用）時回傳 True。"""
+        return self._circuit_open
+
+    def get_stats(self) -> Dict[str, float]:
+        """
+        取得控制器的統計數據。
+
+        Returns:
+            Dict[str, float]: 包含 requests、retries、rate_limited、circuit_opens 與目前並行上限 concurrency 的字典。
+        """
+        return {**self.stats, "concurrency": int(self.limit)}
+
+
+# GPT 與 Embedding 共用的控制器
+rate_controller = RateController()
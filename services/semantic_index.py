@@ -0,0 +1,184 @@
+# services/semantic_index.py
+import os
+import threading
+import time
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from config.config import (
+    DATA_FOLDER,
+    NEWS_MEMORY,
+    SEMANTIC_INDEX_THRESHOLD,
+    SEMANTIC_INDEX_BACKEND,
+    SEMANTIC_INDEX_ANN_MIN_SIZE,
+    LOCAL_EMBEDDING_DIMENSIONS,
+    LOCAL_SEMANTIC_INDEX_THRESHOLD,
+)
+from services.news_source.seen_index import title_hash
+from services.similarity_engine import normalize_matrix
+from services.local_embedder import vector_matches_model
+
+try:
+    import hnswlib
+    HNSWLIB_AVAILABLE = True
+except ImportError:
+    HNSWLIB_AVAILABLE = False
+
+SEMANTIC_INDEX_FILE = os.path.join(DATA_FOLDER, "semantic_index.npz")
+
+
+class SemanticIndex:
+    """
+    跨次執行的標題向量索引，用於在呼叫 GPT 之前略過先前已處理過的同一則新聞（不同媒體或改過標題）。
+    向量以正規化的 float32 矩陣常駐記憶體，並存成 .npz 檔；超過 NEWS_MEMORY 天的項目會被淘汰。
+    預設以 NumPy 暴力搜尋；SEMANTIC_INDEX_BACKEND 為 "hnswlib" 且已安裝時，項目較多時改用近似最近鄰搜尋。
+    """
+
+    def __init__(self, filepath: str = SEMANTIC_INDEX_FILE, retention_days: int = NEWS_MEMORY):
+        self.filepath = filepath
+        self.retention = retention_days * 24 * 60 * 60
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._model = ""
+        self._keys: List[str] = []
+        self._timestamps = np.zeros(0, dtype=np.float64)
+        self._vectors = np.zeros((0, 0), dtype=np.float32)
+        self._ann = None
+
+    def _load(self, model: str):
+        if not self._loaded:
+            self._loaded = True
+            if os.path.exists(self.filepath):
+                try:
+                    with np.load(self.filepath) as data:
+                        self._model = str(data["model"])
+                        self._keys = data["keys"].tolist()
+                        self._timestamps = data["timestamps"].astype(np.float64)
+                        self._vectors = data["vectors"].astype(np.float32)
+                except Exception as e:
+                    print(f"[semantic_index] 讀取 {self.filepath} 發生錯誤，重新建立索引: {e}")
+        if self._model != model:
+            # Embedding 模型或維度改變後，舊向量無法比較
+            if self._keys:
+                print(f"[semantic_index] Embedding 模型由 {self._model} 改為 {model}，清空索引。")
+            self._model = model
+            self._set([], np.zeros(0, dtype=np.float64), np.zeros((0, 0), dtype=np.float32))
+
+    def _set(self, keys: List[str], timestamps: np.ndarray, vectors: np.ndarray):
+        self._keys = keys
+        self._timestamps = timestamps
+        self._vectors = vectors
+        self._ann = None
+
+    def _save(self):
+        try:
+            os.makedirs(os.path.dirname(self.filepath) or ".", exist_ok=True)
+            # np.savez 會自動補上 .npz 副檔名，先寫入暫存檔再取代
+            temp_path = self.filepath + ".tmp.npz"
+            np.savez(
+                temp_path,
+                model=np.array(self._model),
+                keys=np.array(self._keys, dtype=str),
+                timestamps=self._timestamps,
+                vectors=self._vectors,
+            )
+            os.replace(temp_path, self.filepath)
+        except Exception as e:
+            print(f"[semantic_index] 寫入 {self.filepath} 發生錯誤: {e}")
+
+    def _get_ann(self):
+        """項目夠多且可用 hnswlib 時，建立（或沿用）近似最近鄰索引。"""
+        if SEMANTIC_INDEX_BACKEND != "hnswlib" or not HNSWLIB_AVAILABLE or len(self._keys) < SEMANTIC_INDEX_ANN_MIN_SIZE:
+            return None
+        if self._ann is None:
+            ann = hnswlib.Index(space="ip", dim=self._vectors.shape[1])
+            ann.init_index(max_elements=len(self._keys), ef_construction=200, M=16)
+            ann.add_items(self._vectors, np.arange(len(self._keys)))
+            ann.set_ef(50)
+            self._ann = ann
+        return self._ann
+
+    def search(self, model: str, embeddings: Sequence, threshold: Optional[float] = None) -> List[Optional[int]]:
+        """
+        查詢每個向量在索引中最相似的項目。
+
+        Args:
+            model (str): 產生向量的模型（含維度），與索引不同時視為沒有相似項目。
+            embeddings (Sequence): 要查詢的向量列表。
+            threshold (Optional[float], optional): 相似度閾值。預設為 SEMANTIC_INDEX_THRESHOLD（本機向量為 LOCAL_SEMANTIC_INDEX_THRESHOLD）。
+
+        Returns:
+            List[Optional[int]]: 與 embeddings 順序相同；有相似度大於閾值的項目時為該項目的索引位置，否則為 None。
+        """
+        results: List[Optional[int]] = [None] * len(embeddings)
+        if not len(embeddings):
+            return results
+        queries = normalize_matrix(embeddings)
+        if threshold is None:
+            threshold = LOCAL_SEMANTIC_INDEX_THRESHOLD if queries.shape[1] == LOCAL_EMBEDDING_DIMENSIONS else SEMANTIC_INDEX_THRESHOLD
+        with self._lock:
+            self._load(model)
+            if not self._keys or queries.shape[1] != self._vectors.shape[1]:
+                return results
+            ann = self._get_ann()
+            if ann is not None:
+                labels, distances = ann.knn_query(queries, k=1)
+                best = labels[:, 0]
+                # 內積空間的距離為 1 - 內積
+                scores = 1 - distances[:, 0]
+            else:
+                similarities = queries @ self._vectors.T
+                best = np.argmax(similarities, axis=1)
+                scores = similarities[np.arange(len(best)), best]
+        for index, (position, score) in enumerate(zip(best.tolist(), scores.tolist())):
+            if score > threshold:
+                results[index] = position
+        return results
+
+    def add(self, model: str, titles: Sequence[str], embeddings: Sequence):
+        """
+        將新聞標題的向量加入索引並寫入檔案；同一標題只保留最新的一筆，空向量不加入。
+
+        Args:
+            model (str): 產生向量的模型（含維度）。
+            titles (Sequence[str]): 新聞標題。
+            embeddings (Sequence): 與 titles 對應的向量。
+        """
+        pairs = [(title, embedding) for title, embedding in zip(titles, embeddings) if title and len(embedding)]
+        if not pairs:
+            return
+        vectors = normalize_matrix([embedding for _, embedding in pairs])
+        keys = [title_hash(title) for title, _ in pairs]
+        with self._lock:
+            self._load(model)
+            mismatched = self._keys and vectors.shape[1] != self._vectors.shape[1]
+            if mismatched or not vector_matches_model(model, vectors.shape[1]):
+                # 例如 OpenAI 無法使用時改用本機向量，這些向量無法與索引比較
+                print("[semantic_index] 向量維度與索引不同，本次不加入索引。")
+                return
+            now = time.time()
+            replaced = set(keys)
+            keep = [index for index, key in enumerate(self._keys) if key not in replaced]
+            self._set(
+                [self._keys[index] for index in keep] + keys,
+                np.concatenate([self._timestamps[keep], np.full(len(keys), now)]),
+                np.vstack([self._vectors[keep].reshape(len(keep), vectors.shape[1]), vectors]),
+            )
+            self._save()
+
+    def prune(self):
+        """淘汰超過保留期限的項目，並寫回檔案。"""
+        cutoff = time.time() - self.retention
+        with self._lock:
+            if not self._loaded:
+                return
+            keep = np.nonzero(self._timestamps >= cutoff)[0]
+            if len(keep) == len(self._keys):
+                return
+            self._set([self._keys[index] for index in keep], self._timestamps[keep], self._vectors[keep])
+            self._save()
+
+
+# 所有新聞共用的索引
+semantic_index = SemanticIndex()
@@ -0,0 +1,144 @@
+# services/similarity_engine.py
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config.config import SIMILARITY_THRESHOLD, LOCAL_EMBEDDING_DIMENSIONS, LOCAL_SIMILARITY_THRESHOLD
+
+
+class UnionFind:
+    """並查集：以路徑壓縮與按大小合併，將相似的項目併成群組。"""
+
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+        self.size = [1] * size
+
+    def find(self, index: int) -> int:
+        root = index
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[index] != root:
+            self.parent[index], index = root, self.parent[index]
+        return root
+
+    def union(self, a: int, b: int):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a == root_b:
+            return
+        if self.size[root_a] < self.size[root_b]:
+            root_a, root_b = root_b, root_a
+        self.parent[root_b] = root_a
+        self.size[root_a] += self.size[root_b]
+
+    def groups(self) -> List[List[int]]:
+        """回傳所有群組；群組內與群組之間都依最小索引排序。"""
+        groups = {}
+        for index in range(len(self.parent)):
+            groups.setdefault(self.find(index), []).append(index)
+        return sorted(groups.values(), key=lambda group: group[0])
+
+
+def threshold_for(dimensions: int, threshold: Optional[float] = None) -> float:
+    """
+    取得相似度閾值：有指定時直接使用，否則依向量來源決定（本機向量的相似度分布與 OpenAI 不同）。
+
+    Args:
+        dimensions (int): 向量維度；等於 LOCAL_EMBEDDING_DIMENSIONS 時視為本機向量。
+        threshold (Optional[float], optional): 指定的閾值。
+
+    Returns:
+        float: 相似度閾值。
+    """
+    if threshold is not None:
+        return threshold
+    return LOCAL_SIMILARITY_THRESHOLD if dimensions == LOCAL_EMBEDDING_DIMENSIONS else SIMILARITY_THRESHOLD
+
+
+def normalize_matrix(embeddings: Sequence) -> np.ndarray:
+    """
+    將向量疊成 float32 矩陣並正規化為單位向量。
+
+    Args:
+        embeddings (Sequence): 向量列表；空向量、零向量或維度與其他向量不同者視為無效。
+
+    Returns:
+        np.ndarray: (len(embeddings), 維度) 的矩陣；無效向量的列全為 0，與任何向量的相似度都是 0。
+    """
+    arrays = [np.asarray(embedding, dtype=np.float32).ravel() for embedding in embeddings]
+    sizes = [array.size for array in arrays if array.size]
+    if not sizes:
+        return np.zeros((len(arrays), 0), dtype=np.float32)
+    # 以最常見的維度為準
+    dimensions = max(set(sizes), key=sizes.count)
+    matrix = np.zeros((len(arrays), dimensions), dtype=np.float32)
+    for row, array in enumerate(arrays):
+        if array.size == dimensions:
+            matrix[row] = array
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
+
+
+def similarity_matrix(a: np.ndarray, b: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    以一次矩陣乘法計算兩組單位向量之間的餘弦相似度。
+
+    Args:
+        a (np.ndarray): normalize_matrix 的結果。
+        b (Optional[np.ndarray], optional): 另一組單位向量；省略時計算 a 與自己的相似度。
+
+    Returns:
+        np.ndarray: (len(a), len(b)) 的相似度矩陣；維度不同時全為 0。
+    """
+    if b is None:
+        b = a
+    if a.shape[1] != b.shape[1] or a.shape[1] == 0:
+        return np.zeros((a.shape[0], b.shape[0]), dtype=np.float32)
+    return a @ b.T
+
+
+def cluster(embeddings: Sequence, threshold: Optional[float] = None, pairs: Optional[Iterable[Tuple[int, int]]] = None) -> List[List[int]]:
+    """
+    將相似度大於閾值的向量分成群組（相似關係可傳遞：A 像 B、B 像 C 時三者同一組）。
+
+    Args:
+        embeddings (Sequence): 向量列表。
+        threshold (Optional[float], optional): 相似度閾值。預設依向量來源使用 SIMILARITY_THRESHOLD 或 LOCAL_SIMILARITY_THRESHOLD。
+        pairs (Optional[Iterable[Tuple[int, int]]], optional): 其他方式判斷為相同的配對（例如內文指紋相似），也會併成同一組。
+
+    Returns:
+        List[List[int]]: 各群組的索引列表，依最小索引排序；沒有相似項目的向量自成一組。
+    """
+    matrix = normalize_matrix(embeddings)
+    union_find = UnionFind(len(matrix))
+    threshold = threshold_for(matrix.shape[1], threshold)
+    rows, cols = np.nonzero(np.triu(similarity_matrix(matrix) > threshold, k=1))
+    for row, col in zip(rows.tolist(), cols.tolist()):
+        union_find.union(row, col)
+    for row, col in pairs or []:
+        union_find.union(row, col)
+    return union_find.groups()
+
+
+def match(queries: Sequence, candidates: Sequence, threshold: Optional[float] = None) -> List[List[int]]:
+    """
+    找出每個查詢向量相似度大於閾值的候選向量。
+
+    Args:
+        queries (Sequence): 查詢向量列表。
+        candidates (Sequence): 候選向量列表。
+        threshold (Optional[float], optional): 相似度閾值。預設依向量來源使用 SIMILARITY_THRESHOLD 或 LOCAL_SIMILARITY_THRESHOLD。
+
+    Returns:
+        List[List[int]]: 與 queries 順序相同，各查詢相似的候選索引（依相似度由高到低）。
+    """
+    if not len(queries) or not len(candidates):
+        return [[] for _ in range(len(queries))]
+    query_matrix = normalize_matrix(queries)
+    similarities = similarity_matrix(query_matrix, normalize_matrix(candidates))
+    threshold = threshold_for(query_matrix.shape[1], threshold)
+    results = []
+    for row in similarities:
+        indices = np.nonzero(row > threshold)[0]
+        results.append(indices[np.argsort(row[indices])[::-1]].tolist())
+    return results
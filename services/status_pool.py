@@ -0,0 +1,95 @@
+# services/status_pool.py
+import asyncio
+import os
+import random
+from typing import List, Optional
+
+from config.config import DATA_FOLDER, STATUS_POOL_SIZE
+from utils.json_utils import load_json, save_json
+from services.openai_gpt_processing_service import generate_discord_status_async
+
+STATUS_POOL_FILE = os.path.join(DATA_FOLDER, "status_pool.json")
+NEWS_MEMORY_FILE = os.path.join(DATA_FOLDER, "news_memory.json")
+
+# 預先產生的狀態與下一個要使用的位置；兩者一起保存，重啟後不會重複使用已顯示過的狀態
+_pool: List[str] = []
+_position = 0
+_loaded = False
+
+
+async def load_status_pool():
+    """
+    從 data/status_pool.json 載入狀態池與使用位置；沒有已保存的狀態時，以 news_memory.json 中的標題產生一批。
+    """
+    global _pool, _position, _loaded
+    if _loaded:
+        return
+    _loaded = True
+    saved = await asyncio.to_thread(load_json, STATUS_POOL_FILE, {})
+    # 舊版只保存狀態列表，視為都尚未使用
+    if isinstance(saved, list):
+        saved = {"statuses": saved}
+    pool = saved.get("statuses", []) if isinstance(saved, dict) else []
+    if isinstance(pool, list) and pool:
+        _pool = [status for status in pool if isinstance(status, str)]
+        position = saved.get("position", 0)
+        _position = position if isinstance(position, int) and position >= 0 else 0
+        return
+    news_memory = await asyncio.to_thread(load_json, NEWS_MEMORY_FILE, [])
+    if isinstance(news_memory, list):
+        await refresh_status_pool([news["title"] for news in news_memory if news.get("title")])
+
+
+def _remaining() -> List[str]:
+    """尚未使用過的狀態。"""
+    return _pool[_position:]
+
+
+async def _save_pool():
+    os.makedirs(DATA_FOLDER, exist_ok=True)
+    await asyncio.to_thread(save_json, STATUS_POOL_FILE, {"statuses": list(_pool), "position": _position})
+
+
+async def refresh_status_pool(titles: List[str]):
+    """
+    未使用的狀態少於 STATUS_POOL_SIZE 時，以新聞標題產生新的 Discord 狀態補足並保存；
+    狀態仍足夠到下次新聞處理時不呼叫 GPT。沒有標題時保留原本的狀態池。
+
+    Args:
+        titles (List[str]): 新聞標題（合併過的標題只取第一行）。
+    """
+    global _pool, _position
+    remaining = _remaining()
+    needed = STATUS_POOL_SIZE - len(remaining)
+    if needed <= 0:
+        return
+    titles = list(dict.fromkeys(title.split("\n")[0] for title in titles if title))
+    if not titles:
+        return
+    chosen = random.sample(titles, min(needed, len(titles)))
+    statuses = await asyncio.gather(*(generate_discord_status_async(title) for title in chosen), return_exceptions=True)
+    statuses = [status for status in statuses if isinstance(status, str) and status]
+    if not statuses:
+        return
+    # 較新的狀態先使用
+    _pool = statuses + remaining
+    _position = 0
+    await _save_pool()
+    print(f"[status_pool] 已產生 {len(statuses)} 則 Discord 狀態，目前共 {len(_pool)} 則未使用。")
+
+
+async def next_status() -> Optional[str]:
+    """
+    輪流取出狀態池中的下一則狀態（不讀檔、不呼叫 API）；都用過後從頭重複使用，直到下次補充。
+    使用位置會寫回 data/status_pool.json，Bot 重啟後從下一則接續。
+
+    Returns:
+        Optional[str]: 狀態；狀態池是空的時回傳 None。
+    """
+    global _position
+    if not _pool:
+        return None
+    status = _pool[_position % len(_pool)]
+    _position += 1
+    await _save_pool()
+    return status
@@ -0,0 +1,172 @@
+# services/tag_classifier.py
+import asyncio
+import hashlib
+import os
+from typing import Dict, List, Optional, Tuple
+
+import discord
+import numpy as np
+
+from config.config import (
+    DATA_FOLDER,
+    NCBC_TAG_DESCRIPTIONS,
+    TAG_SIMILARITY_THRESHOLD,
+    TAG_CONFIDENT_SIMILARITY,
+    LOCAL_TAG_SIMILARITY_THRESHOLD,
+    LOCAL_TAG_CONFIDENT_SIMILARITY,
+    TAG_MAX_COUNT,
+    TAG_ARTICLE_TOKEN_BUDGET,
+    LOCAL_EMBEDDING_DIMENSIONS,
+)
+from utils.json_utils import load_json, save_json
+from services.openai_embed_service import get_model_key, get_text_embedding_async, get_text_embeddings_async
+from services.openai_gpt_processing_service import determine_tags_async
+from services.local_embedder import MODEL_KEY as LOCAL_MODEL_KEY, embed_local, vector_matches_model
+from services.token_budget import trim_to_budget
+
+TAG_EMBEDDINGS_FILE = os.path.join(DATA_FOLDER, "tag_embeddings.json")
+# 與最相似標籤的差距在此值以內的標籤才一起選上，避免選到太多只是勉強相關的標籤
+RELATIVE_MARGIN = 0.05
+
+# 「標籤名稱：說明」的雜湊 -> 單位向量
+_tag_vectors: Dict[str, np.ndarray] = {}
+_loaded = False
+_lock = asyncio.Lock()
+
+
+def _tag_text(name: str) -> str:
+    description = NCBC_TAG_DESCRIPTIONS.get(name)
+    return f"{name}：{description}" if description else name
+
+
+def _tag_key(name: str, model: str) -> str:
+    return hashlib.sha1(f"{model}\n{_tag_text(name)}".encode("utf-8")).hexdigest()[:16]
+
+
+def _normalize(vector) -> Optional[np.ndarray]:
+    array = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(array)
+    return array / norm if array.size and norm > 0 else None
+
+
+async def _get_tag_matrix(tag_names: List[str], model: str) -> Optional[np.ndarray]:
+    """
+    取得各標籤的單位向量矩陣（列順序同 tag_names）；向量只在標籤名稱、說明或模型改變時才重新產生。
+    model 為 OpenAI 模型卻只取得本機備援向量時不快取，回傳 None。
+    """
+    global _loaded
+    async with _lock:
+        if not _loaded:
+            cached = await asyncio.to_thread(load_json, TAG_EMBEDDINGS_FILE)
+            if isinstance(cached, dict):
+                for key, vector in cached.items():
+                    normalized = _normalize(vector)
+                    if normalized is not None:
+                        _tag_vectors[key] = normalized
+            _loaded = True
+
+        # 舊版可能以 OpenAI 模型的鍵存了本機備援向量，維度不符的一併重新產生
+        missing = [
+            name for name in tag_names
+            if _tag_key(name, model) not in _tag_vectors or not vector_matches_model(model, _tag_vectors[_tag_key(name, model)].shape[0])
+        ]
+        if missing:
+            texts = [_tag_text(name) for name in missing]
+            if model == LOCAL_MODEL_KEY:
+                embeddings = await asyncio.to_thread(embed_local, texts)
+            else:
+                embeddings = await get_text_embeddings_async(texts)
+            vectors = [_normalize(embedding) for embedding in embeddings]
+            if any(vector is None or not vector_matches_model(model, vector.shape[0]) for vector in vectors):
+                print("[tag_classifier] 無法取得標籤的 OpenAI 向量，本次不快取。")
+                return None
+            for name, vector in zip(missing, vectors):
+                _tag_vectors[_tag_key(name, model)] = vector
+            os.makedirs(DATA_FOLDER, exist_ok=True)
+            data = {key: vector.tolist() for key, vector in _tag_vectors.items()}
+            await asyncio.to_thread(save_json, TAG_EMBEDDINGS_FILE, data)
+
+    return np.stack([_tag_vectors[_tag_key(name, model)] for name in tag_names])
+
+
+def tag_thresholds(dimensions: int) -> Tuple[float, float]:
+    """
+    依向量來源取得 (選上標籤的閾值, 有把握的閾值)；本機向量的相似度分布與 OpenAI 不同。
+
+    Args:
+        dimensions (int): 向量維度；等於 LOCAL_EMBEDDING_DIMENSIONS 時視為本機向量。
+
+    Returns:
+        Tuple[float, float]: (TAG_SIMILARITY_THRESHOLD, TAG_CONFIDENT_SIMILARITY) 或本機向量的對應設定。
+    """
+    if dimensions == LOCAL_EMBEDDING_DIMENSIONS:
+        return LOCAL_TAG_SIMILARITY_THRESHOLD, LOCAL_TAG_CONFIDENT_SIMILARITY
+    return TAG_SIMILARITY_THRESHOLD, TAG_CONFIDENT_SIMILARITY
+
+
+def choose_tags(similarities: np.ndarray, tag_names: List[str], threshold: float, confident: float) -> Optional[List[str]]:
+    """
+    依新聞與各標籤的相似度選出標籤。
+
+    Args:
+        similarities (np.ndarray): 與 tag_names 順序相同的相似度。
+        tag_names (List[str]): 標籤名稱。
+        threshold (float): 相似度達此值的標籤才會被選上。
+        confident (float): 最相似的標籤低於此值時視為沒把握。
+
+    Returns:
+        Optional[List[str]]: 選出的標籤；沒把握時回傳 None。
+    """
+    order = np.argsort(similarities)[::-1]
+    best = float(similarities[order[0]])
+    if best < confident:
+        return None
+    return [
+        tag_names[index] for index in order[:TAG_MAX_COUNT]
+        if similarities[index] >= threshold and similarities[index] >= best - RELATIVE_MARGIN
+    ]
+
+
+async def classify_tags(title: str, content: str, tag_names: List[str]) -> Optional[List[str]]:
+    """
+    以 Embedding 相似度為新聞選擇標籤，不呼叫 GPT。
+
+    Args:
+        title (str): 新聞標題。
+        content (str): 新聞內文。
+        tag_names (List[str]): 可用的標籤名稱。
+
+    Returns:
+        Optional[List[str]]: 選出的標籤；沒把握（最相似的標籤低於 tag_thresholds 的閾值）或無法產生向量時回傳 None。
+    """
+    if not tag_names:
+        return []
+    article = _normalize(await get_text_embedding_async(trim_to_budget(f"{title}\n{content}", TAG_ARTICLE_TOKEN_BUDGET, drop_boilerplate=False)))
+    if article is None:
+        return None
+    # OpenAI 無法使用時文章向量會是本機備援向量，標籤也改用本機向量比較
+    model = LOCAL_MODEL_KEY if article.shape[0] == LOCAL_EMBEDDING_DIMENSIONS else get_model_key()
+    matrix = await _get_tag_matrix(tag_names, model)
+    if matrix is None or matrix.shape[1] != article.shape[0]:
+        return None
+    return choose_tags(matrix @ article, tag_names, *tag_thresholds(article.shape[0]))
+
+
+async def select_tags(tags: List[discord.ForumTag], title: str, content: str) -> List[str]:
+    """
+    選擇論壇貼文的標籤：優先使用 Embedding 分類，沒把握時才以 GPT（determine_tags）選擇。
+
+    Args:
+        tags (List[discord.ForumTag]): 可用的標籤列表。
+        title (str): 新聞標題。
+        content (str): 新聞內文。
+
+    Returns:
+        List[str]: 選出的標籤名稱。
+    """
+    tag_names = [tag.name for tag in tags]
+    selected = await classify_tags(title, content, tag_names)
+    if selected is not None:
+        print(f"以 Embedding 選擇標籤: {selected}")
+        return selected
+    return await determine_tags_async(tags, content)
@@ -0,0 +1,113 @@
+# services/token_budget.py
+import re
+import threading
+from functools import lru_cache
+from typing import List, Optional
+
+import tiktoken
+
+from config.config import GPT_MODEL, ARTICLE_TOKEN_BUDGET
+
+# 明顯與新聞主體無關的段落（延伸閱讀、訂閱、版權宣告等）
+BOILERPLATE_PATTERNS = [
+    re.compile(pattern) for pattern in (
+        r"^(延伸閱讀|相關新聞|更多新聞|更多報導|推薦閱讀|熱門新聞|看更多|點我看|點擊看)",
+        r"(訂閱|追蹤|按讚|加入).{0,12}(頻道|粉絲團|粉專|LINE|Line|YouTube|IG|Instagram|Google News)",
+        r"(版權所有|不得轉載|未經授權|All rights reserved|©|Copyright)",
+        r"^(責任編輯|編輯|核稿編輯|資料來源)[：:]",
+        r"^(廣告|贊助|Advertisement)$",
+        r"(下載|打開).{0,6}(APP|App|app)",
+        r"^[（(]?(圖|照片|圖片|影片|攝影)[／/：:]",
+    )
+]
+
+_encoder = None
+_encoder_lock = threading.Lock()
+
+
+def get_encoder():
+    """取得 GPT_MODEL 對應的 tiktoken 編碼器（第一次使用時才載入）。"""
+    global _encoder
+    with _encoder_lock:
+        if _encoder is None:
+            _encoder = tiktoken.encoding_for_model(GPT_MODEL)
+        return _encoder
+
+
+def count_tokens(text: str) -> int:
+    """
+    計算文字的 token 數。
+
+    Args:
+        text (str): 要計算的文字。
+
+    Returns:
+        int: token 數。
+    """
+    return len(get_encoder().encode(text))
+
+
+@lru_cache(maxsize=64)
+def count_prompt_tokens(prompt: str) -> int:
+    """
+    計算固定提示詞的 token 數；同一段提示詞只會計算一次。
+
+    Args:
+        prompt (str): 提示詞。
+
+    Returns:
+        int: token 數。
+    """
+    return count_tokens(prompt)
+
+
+def is_boilerplate(paragraph: str) -> bool:
+    """判斷段落是否為明顯的樣板內容（延伸閱讀、訂閱、版權宣告等）。"""
+    return any(pattern.search(paragraph) for pattern in BOILERPLATE_PATTERNS)
+
+
+def _split_paragraphs(text: str) -> List[str]:
+    return [paragraph.strip() for paragraph in text.split("\n") if paragraph.strip()]
+
+
+def trim_to_budget(text: str, max_tokens: Optional[int] = None, drop_boilerplate: bool = True) -> str:
+    """
+    將內文裁切到 token 上限內。
+    - 先移除明顯的樣板段落（drop_boilerplate 時）
+    - 依段落順序保留完整段落，直到下一段會超過上限
+    - 第一段本身就超過上限時，才在 token 邊界截斷
+
+    Args:
+        text (str): 原始內文（以換行分段）。
+        max_tokens (Optional[int], optional): token 上限。預設為 config 中的 ARTICLE_TOKEN_BUDGET。
+        drop_boilerplate (bool, optional): 是否移除樣板段落。只有抓取文章時需要；
+            已清理或由 GPT 產生的內文只裁切長度，避免誤刪提到「延伸閱讀」、版權等字眼的正文段落。
+
+    Returns:
+        str: 裁切後的內文。
+    """
+    if max_tokens is None:
+        max_tokens = ARTICLE_TOKEN_BUDGET
+    paragraphs = _split_paragraphs(text)
+    if drop_boilerplate:
+        paragraphs = [paragraph for paragraph in paragraphs if not is_boilerplate(paragraph)]
+
+    encoder = get_encoder()
+    kept = []
+    used = 0
+    for paragraph in paragraphs:
+        # 段落之間的換行也算一個 token
+        tokens = len(encoder.encode(paragraph)) + (1 if kept else 0)
+        if used + tokens > max_tokens:
+            if not kept:
+                kept.append(encoder.decode(encoder.encode(paragraph)[:max_tokens]))
+            break
+        kept.append(paragraph)
+        used += tokens
+    return "\n".join(kept)
+
+
+def print_token_count(prompt: str, user_content: str):
+    """印出一次呼叫的預估輸入 token 數（提示詞的 token 數會快取）。"""
+    token_count = count_prompt_tokens(prompt) + count_tokens(user_content)
+    print(f"Estimated token count: {token_count}")
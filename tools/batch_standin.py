@@ -0,0 +1,184 @@
+# tools/batch_standin.py
+"""
+本機的 OpenAI Batch API 替代服務，不需網路與費用即可測試 USE_BATCH_REWRITE 的流程
+（上傳 JSONL、建立工作、輪詢狀態、下載結果、重啟後接續發文）。
+
+用法（於專案根目錄）：
+    python tools/batch_standin.py [--port 8765] [--delay 60]
+
+再以 OPENAI_BASE_URL=http://127.0.0.1:8765/v1 啟動 Bot。
+支援的端點：
+- POST /v1/files、GET /v1/files/{id}/content
+- POST /v1/batches、GET /v1/batches/{id}：建立後 delay 秒內為 in_progress，之後為 completed
+- POST /v1/chat/completions：即時處理的備援
+
+每個 chat completion 請求都回傳固定格式的假回覆（含最後一則訊息的開頭），方便確認結果對應到哪一則新聞。
+Embedding 不在此模擬，測試時請搭配 EMBEDDING_BACKEND = "local"。
+工作與檔案只存在記憶體中，重啟此服務後會遺失。
+"""
+import argparse
+import json
+import threading
+import time
+import uuid
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_lock = threading.Lock()
+# 檔案 ID -> {"filename", "purpose", "data", "created_at"}
+_files = {}
+# Batch ID -> 工作資訊
+_batches = {}
+_delay = 60
+
+
+def _new_id(prefix: str) -> str:
+    return f"{prefix}-{uuid.uuid4().hex[:24]}"
+
+
+def _fake_completion(body: dict) -> dict:
+    """以最後一則訊息的開頭組成假回覆。"""
+    messages = body.get("messages") or [{}]
+    last = str(messages[-1].get("content", "")).replace("\n", " ").strip()
+    content = f"[stand-in] {last[:60]}"
+    return {
+        "id": _new_id("chatcmpl"),
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", ""),
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+    }
+
+
+def _file_object(file_id: str, entry: dict) -> dict:
+    return {
+        "id": file_id,
+        "object": "file",
+        "bytes": len(entry["data"]),
+        "created_at": entry["created_at"],
+        "filename": entry["filename"],
+        "purpose": entry["purpose"],
+        "status": "processed",
+    }
+
+
+def _complete(batch: dict):
+    """依輸入檔產生輸出檔，並將工作標記為 completed。"""
+    output = []
+    for line in _files[batch["input_file_id"]]["data"].decode("utf-8").splitlines():
+        if not line.strip():
+            continue
+        request = json.loads(line)
+        output.append(json.dumps({
+            "id": _new_id("batch_req"),
+            "custom_id": request["custom_id"],
+            "response": {"status_code": 200, "request_id": _new_id("req"), "body": _fake_completion(request["body"])},
+            "error": None,
+        }, ensure_ascii=False))
+    output_id = _new_id("file")
+    _files[output_id] = {
+        "filename": f"{batch['id']}_output.jsonl",
+        "purpose": "batch_output",
+        "data": ("\n".join(output) + "\n").encode("utf-8"),
+        "created_at": int(time.time()),
+    }
+    batch.update({
+        "status": "completed",
+        "output_file_id": output_id,
+        "completed_at": int(time.time()),
+        "request_counts": {"total": len(output), "completed": len(output), "failed": 0},
+    })
+
+
+class Handler(BaseHTTPRequestHandler):
+    def _send_json(self, status: int, data: dict):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _not_found(self):
+        self._send_json(404, {"error": {"message": f"找不到 {self.path}", "type": "invalid_request_error"}})
+
+    def _read_body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def do_POST(self):
+        if self.path == "/v1/files":
+            # multipart/form-data：以 email 解析器取出 file 與 purpose 欄位
+            raw = f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode("utf-8") + self._read_body()
+            fields = {}
+            for part in BytesParser(policy=HTTP).parsebytes(raw).iter_parts():
+                fields[part.get_param("name", header="content-disposition")] = (part.get_filename(), part.get_payload(decode=True))
+            file_id = _new_id("file")
+            entry = {
+                "filename": fields.get("file", ("input.jsonl", b""))[0] or "input.jsonl",
+                "purpose": (fields.get("purpose", (None, b"batch"))[1] or b"batch").decode("utf-8"),
+                "data": fields.get("file", (None, b""))[1] or b"",
+                "created_at": int(time.time()),
+            }
+            with _lock:
+                _files[file_id] = entry
+            self._send_json(200, _file_object(file_id, entry))
+        elif self.path == "/v1/batches":
+            body = json.loads(self._read_body() or b"{}")
+            with _lock:
+                if body.get("input_file_id") not in _files:
+                    self._send_json(400, {"error": {"message": "input_file_id 不存在", "type": "invalid_request_error"}})
+                    return
+                batch = {
+                    "id": _new_id("batch"),
+                    "object": "batch",
+                    "endpoint": body.get("endpoint", "/v1/chat/completions"),
+                    "input_file_id": body["input_file_id"],
+                    "completion_window": body.get("completion_window", "24h"),
+                    "status": "in_progress",
+                    "output_file_id": None,
+                    "error_file_id": None,
+                    "created_at": int(time.time()),
+                }
+                _batches[batch["id"]] = batch
+            print(f"[batch_standin] 建立 {batch['id']}，{_delay} 秒後完成。")
+            self._send_json(200, batch)
+        elif self.path == "/v1/chat/completions":
+            self._send_json(200, _fake_completion(json.loads(self._read_body() or b"{}")))
+        else:
+            self._not_found()
+
+    def do_GET(self):
+        parts = self.path.strip("/").split("/")
+        with _lock:
+            if len(parts) == 3 and parts[:2] == ["v1", "batches"] and parts[2] in _batches:
+                batch = _batches[parts[2]]
+                if batch["status"] == "in_progress" and time.time() - batch["created_at"] >= _delay:
+                    _complete(batch)
+                self._send_json(200, batch)
+            elif len(parts) == 4 and parts[:2] == ["v1", "files"] and parts[3] == "content" and parts[2] in _files:
+                data = _files[parts[2]]["data"]
+                self.send_response(200)
+                self.send_header("Content-Type", "application/octet-stream")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+            else:
+                self._not_found()
+
+
+def main():
+    global _delay
+    parser = argparse.ArgumentParser(description="本機的 OpenAI Batch API 替代服務")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--delay", type=int, default=60, help="Batch 工作建立後幾秒才完成")
+    args = parser.parse_args()
+    _delay = args.delay
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), Handler)
+    print(f"[batch_standin] 在 http://127.0.0.1:{args.port}/v1 等待請求。")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()